@@ -1,5 +1,9 @@
 // Dashboard Charts Manager - Creates and updates all charts
 
+// Pixels per point below which a pyramid chart moves to a coarser level
+const MIN_POINT_SPACING = 4;
+const PYRAMID_AXIS_LABELS = { month: 'Jaar-Maand', quarter: 'Jaar-Kwartaal', year: 'Jaar' };
+
 class ChartsManager {
     constructor(dataLoader) {
         this.dataLoader = dataLoader;
@@ -127,21 +131,56 @@ class ChartsManager {
     createTrendAbsoluteChart(data, selectedProvinces) {
         const csvKey = '12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv';
         console.log('Creating trend absolute chart, data:', data[csvKey], 'provinces:', selectedProvinces);
-        const chartData = this.prepareLineChartData(
-            data[csvKey], 
-            selectedProvinces, 
-            'Jaar-Maand', 
-            'Aantal faillissementen (12-maands som)'
-        );
-        
         const ctx = document.getElementById('trend-absolute-chart');
+
+        // From the time pyramid when it is loaded: months, quarters or years, whichever fits the width
+        let xLabel = 'Jaar-Maand';
+        let chartData;
+        if (this.dataLoader.pyramid) {
+            const level = this.dataLoader.pyramidLevel(Math.floor(ctx.clientWidth / MIN_POINT_SPACING));
+            xLabel = PYRAMID_AXIS_LABELS[level];
+            chartData = this.preparePyramidTrendData(level, selectedProvinces);
+        } else {
+            chartData = this.prepareLineChartData(
+                data[csvKey], 
+                selectedProvinces, 
+                'Jaar-Maand', 
+                'Aantal faillissementen (12-maands som)'
+            );
+        }
+        
         this.charts['trend-absolute'] = new Chart(ctx, {
             type: 'line',
             data: chartData,
-            options: this.getLineChartOptions('12-maandelijkse trend (absolute)', 'Jaar-Maand', 'Aantal', true)
+            options: this.getLineChartOptions('12-maandelijkse trend (absolute)', xLabel, 'Aantal', true)
         });
     }
 
+    // 12-month sums of construction bankruptcies at the end of every period of a pyramid level:
+    // the 12-month and 4-quarter rolling sums, or the calendar-year totals
+    preparePyramidTrendData(level, selectedProvinces) {
+        const datasets = [];
+        
+        for (const province of selectedProvinces) {
+            const series = this.dataLoader.pyramidSeries(level, province, 'construction', level !== 'year');
+            const points = series.filter(point => point.value !== null && !point.partial);
+            if (points.length === 0) continue;
+            
+            datasets.push({
+                label: province,
+                data: points.map(point => ({ x: point.period, y: point.value })),
+                borderColor: this.dataLoader.getProvinceColor(province),
+                backgroundColor: this.dataLoader.getProvinceColor(province) + '20',
+                borderWidth: 2,
+                tension: 0.1,
+                pointRadius: level === 'month' ? 2 : 3,
+                pointHoverRadius: 5
+            });
+        }
+        
+        return { datasets };
+    }
+
     createStartersIndexChart(data, selectedProvinces) {
         const csvKey = 'Nieuwe starters (index 2008 = 100).csv';
         const chartData = this.prepareMultiLineChartData(
@@ -364,6 +403,72 @@ class ChartsManager {
         };
     }
 
+    // Correlation of leader series (rows) with follower series (columns) `lag` months later,
+    // as a table with cells coloured from blue (-1) to red (+1)
+    renderLeadLagHeatmap(data, lag, leaderSector, followerSector) {
+        const container = document.getElementById('lead-lag-heatmap');
+        if (!container) return;
+
+        const matrix = data.correlations[lag];
+        const rows = [], columns = [];
+        data.series.forEach((series, i) => {
+            if (series.sector === leaderSector) rows.push(i);
+            if (series.sector === followerSector) columns.push(i);
+        });
+
+        const table = document.createElement('table');
+        table.className = 'heatmap';
+        const head = table.createTHead().insertRow();
+        head.appendChild(document.createElement('th'));
+        columns.forEach(j => {
+            const th = document.createElement('th');
+            th.textContent = data.series[j].geo;
+            head.appendChild(th);
+        });
+
+        const body = table.createTBody();
+        rows.forEach(i => {
+            const tr = body.insertRow();
+            const th = document.createElement('th');
+            th.textContent = data.series[i].geo;
+            tr.appendChild(th);
+            columns.forEach(j => {
+                const td = tr.insertCell();
+                const value = matrix[i][j];
+                if (value === null) {
+                    td.textContent = '-';
+                    return;
+                }
+                const r = value / data.scale;
+                const alpha = Math.min(1, Math.abs(r)).toFixed(2);
+                td.style.background = r >= 0 ? `rgba(200, 40, 40, ${alpha})` : `rgba(40, 80, 200, ${alpha})`;
+                td.textContent = r.toFixed(2);
+                td.title = `${data.series[i].geo} → ${data.series[j].geo}, ${lag} maanden later; `
+                    + `sterkste verband na ${data.peak_lag[i][j]} maanden (${(data.peak[i][j] / data.scale).toFixed(2)})`;
+            });
+        });
+
+        container.replaceChildren(table);
+    }
+
+    // Static SVGs of one geography's default view, rendered by scripts/prerender_svg.py;
+    // shown while the CSVs load and hidden once the interactive charts are drawn
+    showPrerendered(view) {
+        document.querySelectorAll('.chart-prerender').forEach(img => {
+            if (!view) {
+                img.hidden = true;
+                return;
+            }
+            const src = `./data/svg/${encodeURIComponent(view)}/${img.dataset.chart}.svg`;
+            if (img.getAttribute('src') !== src) img.src = src;
+            img.hidden = false;
+        });
+    }
+
+    hidePrerendered() {
+        document.querySelectorAll('.chart-prerender').forEach(img => { img.hidden = true; });
+    }
+
     destroyAllCharts() {
         Object.values(this.charts).forEach(chart => {
             if (chart) chart.destroy();
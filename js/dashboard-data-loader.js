@@ -7,24 +7,15 @@ class DataLoader {
             'Waals-Brabant', 'Henegouwen', 'Luik', 'Luxemburg', 'Namen', 'Brussels'
         ];
         
-        this.csvFiles = [
-            'Overlevingskans na 1 jaar.csv',
-            'Overlevingskans na 3 jaar.csv',
-            'Nieuwe starters bouwsector.csv',
-            'Faillissementen bouwsector.csv',
-            '12-maandelijkse trend faillissementen (index 2008 = 100).csv',
-            '12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv',
-            'Nieuwe starters (index 2008 = 100).csv',
-            'Jaarlijkse cijfers bouwsector (sinds 2016).csv'
-        ];
-        
-        // Map standard CSV names to regional CSV names for Vlaanderen
-        this.regionalFileMap = {
-            'Nieuwe starters bouwsector.csv': 'Nieuwe starters Vlaamse bouwsector.csv',
-            'Faillissementen bouwsector.csv': 'Faillissementen Vlaamse bouwsector.csv',
-            '12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv': '12-maandelijkse trend faillissementen Vlaamse bouwsector (absolute cijfers).csv',
-            'Jaarlijkse cijfers bouwsector (sinds 2016).csv': 'Jaarlijkse cijfers Vlaanderen bouwsector (sinds 2016).csv'
-        };
+        // Dataset list and file locations come from data/data-grafieken/manifest.json
+        // (written by the Python pipeline); see loadManifest()
+        this.manifest = null;
+        this.csvFiles = [];
+        this.regionalFileMap = {};
+
+        // Content-hashed files never change, so they are kept in the Cache API
+        this.cacheName = 'starters-stoppers-data';
+        this.textCache = new Map();
         
         // Files that use "Gewest" column and can be filtered
         this.gewestFiles = [
@@ -53,40 +44,126 @@ class DataLoader {
         ];
         
         this.data = {};
+        this.pyramid = null;
+        this.leadLag = null;
+    }
+
+    async loadManifest() {
+        if (this.manifest) return this.manifest;
+
+        // The manifest itself must always be revalidated
+        const response = await fetch('./data/data-grafieken/manifest.json', { cache: 'no-cache' });
+        if (!response.ok) {
+            throw new Error(`Failed to load manifest.json: ${response.status}`);
+        }
+        this.manifest = await response.json();
+
+        this.csvFiles = Object.keys(this.manifest.datasets);
+        this.regionalFileMap = {};
+        for (const [csvFile, dataset] of Object.entries(this.manifest.datasets)) {
+            if (dataset.regional && dataset.regional['Vlaanderen']) {
+                this.regionalFileMap[csvFile] = dataset.regional['Vlaanderen'].file;
+            }
+        }
+
+        this.pruneCache();
+        return this.manifest;
+    }
+
+    // Path of a dataset for a province folder, or of its root-level file
+    datasetPath(csvFile, folder = null) {
+        const dataset = this.manifest.datasets[csvFile];
+        const entry = folder ? dataset && dataset.geographies[folder] : dataset && dataset.root;
+        return entry ? `./data/data-grafieken/${entry.file}` : null;
+    }
+
+    // Remove cached files that the current manifest no longer references
+    async pruneCache() {
+        if (typeof caches === 'undefined') return;
+        try {
+            const live = new Set();
+            const collect = entry => live.add(new URL(`./data/data-grafieken/${entry.file}`, location.href).href);
+            Object.values(this.manifest.datasets).forEach(dataset => {
+                Object.values(dataset.geographies).forEach(collect);
+                if (dataset.root) collect(dataset.root);
+                Object.values(dataset.regional || {}).forEach(collect);
+            });
+            Object.values(this.manifest.files || {}).forEach(collect);
+
+            const cache = await caches.open(this.cacheName);
+            for (const request of await cache.keys()) {
+                if (!live.has(request.url)) {
+                    await cache.delete(request);
+                }
+            }
+        } catch (error) {
+            console.warn('Could not prune data cache:', error);
+        }
+    }
+
+    // Fetch a content-hashed file once; unchanged hashes are served from the cache
+    async fetchText(path) {
+        if (this.textCache.has(path)) return this.textCache.get(path);
+
+        let cache = null;
+        if (typeof caches !== 'undefined') {
+            try {
+                cache = await caches.open(this.cacheName);
+                const cached = await cache.match(path);
+                if (cached) {
+                    const text = await cached.text();
+                    this.textCache.set(path, text);
+                    return text;
+                }
+            } catch (error) {
+                cache = null;
+            }
+        }
+
+        const response = await fetch(path);
+        if (!response.ok) {
+            console.error(`Failed to load ${path}: ${response.status}`);
+            return null;
+        }
+        if (cache) {
+            await cache.put(path, response.clone());
+        }
+        const text = await response.text();
+        this.textCache.set(path, text);
+        return text;
     }
 
     async loadAllData(selectedProvinces, regions = []) {
+        await this.loadManifest();
         const promises = [];
         
         // Load provincial data
         for (const province of selectedProvinces) {
             for (const csvFile of this.csvFiles) {
-                const path = `./data/data-grafieken/${province}/${csvFile}`;
-                promises.push(this.loadCSV(path, province, csvFile));
+                const path = this.datasetPath(csvFile, province);
+                if (path) promises.push(this.loadCSV(path, province, csvFile));
             }
         }
         
         // Load regional data from root directory
         for (const region of regions) {
             for (const csvFile of this.csvFiles) {
-                if (this.gewestFiles.includes(csvFile)) {
+                const rootPath = this.datasetPath(csvFile);
+                if (this.gewestFiles.includes(csvFile) && rootPath) {
                     // Load from root file and filter by Gewest
-                    const path = `./data/data-grafieken/${csvFile}`;
-                    promises.push(this.loadGewestCSV(path, region, csvFile));
-                } else if (csvFile === '12-maandelijkse trend faillissementen (index 2008 = 100).csv') {
+                    promises.push(this.loadGewestCSV(rootPath, region, csvFile));
+                } else if (csvFile === '12-maandelijkse trend faillissementen (index 2008 = 100).csv' && rootPath) {
                     // Special handling for multi-column regional file
-                    const path = `./data/data-grafieken/${csvFile}`;
-                    promises.push(this.loadTrendIndexCSV(path, region, csvFile));
+                    promises.push(this.loadTrendIndexCSV(rootPath, region, csvFile));
                 } else if (region === 'Vlaanderen' && this.regionalFileMap[csvFile]) {
                     // Use regional file name for Vlaanderen
-                    const regionalFile = this.regionalFileMap[csvFile];
-                    const path = `./data/data-grafieken/${regionalFile}`;
+                    const path = `./data/data-grafieken/${this.regionalFileMap[csvFile]}`;
                     promises.push(this.loadRegionalCSV(path, 'Vlaanderen', csvFile));
                 } else if (region === 'Brussel') {
                     // Load from Brussels folder
                     // Note: Brussels folder is named "Brussels" but we store it as "Brussel" to match region name
-                    const path = `./data/data-grafieken/Brussels/${csvFile}`;
-                    promises.push(this.loadCSV(path, 'Brussel', csvFile));
+                    const path = this.datasetPath(csvFile, 'Brussels');
+                    if (path) promises.push(this.loadCSV(path, 'Brussel', csvFile));
                 }
             }
         }
@@ -98,8 +175,8 @@ class DataLoader {
                 // (If it is in selectedProvinces, it's already being loaded in the first loop)
                 if (!selectedProvinces.includes(prov)) {
                     for (const csvFile of this.filesToAggregate) {
-                        const path = `./data/data-grafieken/${prov}/${csvFile}`;
-                        promises.push(this.loadCSV(path, prov, csvFile));
+                        const path = this.datasetPath(csvFile, prov);
+                        if (path) promises.push(this.loadCSV(path, prov, csvFile));
                     }
                 }
             }
@@ -117,13 +194,8 @@ class DataLoader {
 
     async loadCSV(path, province, csvFile) {
         try {
-            const response = await fetch(path);
-            if (!response.ok) {
-                console.error(`Failed to load ${path}: ${response.status}`);
-                return;
-            }
-            
-            const text = await response.text();
+            const text = await this.fetchText(path);
+            if (text === null) return;
             const parsed = this.parseCSV(text);
             
             // Store data by CSV file name
@@ -139,13 +211,8 @@ class DataLoader {
 
     async loadRegionalCSV(path, region, csvFile) {
         try {
-            const response = await fetch(path);
-            if (!response.ok) {
-                console.error(`Failed to load ${path}: ${response.status}`);
-                return;
-            }
-            
-            const text = await response.text();
+            const text = await this.fetchText(path);
+            if (text === null) return;
             const parsed = this.parseCSV(text);
             
             // Add Provincie column to regional data
@@ -167,13 +234,8 @@ class DataLoader {
 
     async loadGewestCSV(path, region, csvFile) {
         try {
-            const response = await fetch(path);
-            if (!response.ok) {
-                console.error(`Failed to load ${path}: ${response.status}`);
-                return;
-            }
-            
-            const text = await response.text();
+            const text = await this.fetchText(path);
+            if (text === null) return;
             const parsed = this.parseCSV(text);
             
             // Filter by Gewest and rename column to Provincie
@@ -203,13 +265,8 @@ class DataLoader {
 
     async loadTrendIndexCSV(path, region, csvFile) {
         try {
-            const response = await fetch(path);
-            if (!response.ok) {
-                console.error(`Failed to load ${path}: ${response.status}`);
-                return;
-            }
-            
-            const text = await response.text();
+            const text = await this.fetchText(path);
+            if (text === null) return;
             const parsed = this.parseCSV(text);
             
             // Extract columns for this region
@@ -235,6 +292,58 @@ class DataLoader {
         }
     }
 
+    // Month / quarter / year bankruptcy pyramid (faillissementen_piramide.json)
+    async loadPyramid() {
+        if (this.pyramid) return this.pyramid;
+        await this.loadManifest();
+
+        const entry = this.manifest.files && this.manifest.files['faillissementen_piramide.json'];
+        if (!entry) return null;
+        const text = await this.fetchText(`./data/data-grafieken/${entry.file}`);
+        this.pyramid = text === null ? null : JSON.parse(text);
+        return this.pyramid;
+    }
+
+    // Finest level with at most maxPoints periods, so wide ranges never need downsampling
+    pyramidLevel(maxPoints) {
+        const levels = ['month', 'quarter', 'year'];
+        return levels.find(level => this.pyramid.levels[level].periods <= maxPoints) || 'year';
+    }
+
+    // [{period, value}] for a geography name and sector ('construction' / 'non_construction');
+    // rolling sums are null where the window lacks full periods
+    pyramidSeries(level, geo, sector, rolling = false) {
+        const info = this.pyramid.levels[level];
+        const values = ((rolling ? info.rolling : info.totals)[geo] || {})[sector] || [];
+
+        let year = parseInt(info.start.slice(0, 4), 10);
+        let sub = level === 'month' ? parseInt(info.start.slice(5), 10) - 1
+            : level === 'quarter' ? parseInt(info.start.slice(6), 10) - 1 : 0;
+        const perYear = level === 'month' ? 12 : level === 'quarter' ? 4 : 1;
+
+        return values.map((value, i) => {
+            const period = level === 'month' ? `${year}-${String(sub + 1).padStart(2, '0')}`
+                : level === 'quarter' ? `${year}-Q${sub + 1}` : `${year}`;
+            if (++sub === perYear) {
+                sub = 0;
+                year++;
+            }
+            return { period, value, partial: info.partial.includes(i) };
+        });
+    }
+
+    // Geography x geography x lag correlations (faillissementen_voorlopers.json)
+    async loadLeadLag() {
+        if (this.leadLag) return this.leadLag;
+        await this.loadManifest();
+
+        const entry = this.manifest.files && this.manifest.files['faillissementen_voorlopers.json'];
+        if (!entry) return null;
+        const text = await this.fetchText(`./data/data-grafieken/${entry.file}`);
+        this.leadLag = text === null ? null : JSON.parse(text);
+        return this.leadLag;
+    }
+
     parseCSV(text) {
         const lines = text.trim().split('\n');
         if (lines.length < 2) return [];
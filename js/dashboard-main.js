@@ -23,10 +23,29 @@ class Dashboard {
         this.selectedProvinces = ['Vlaanderen'];
         this.useRegionAverages = true;
         await this.loadAndRender();
+
+        // The lead/lag heatmap covers all geographies, independent of the selection
+        await this.setupLeadLag();
         
         console.log('Dashboard initialized successfully');
     }
 
+    async setupLeadLag() {
+        const data = await this.dataLoader.loadLeadLag();
+        const leader = document.getElementById('lead-lag-leader');
+        const follower = document.getElementById('lead-lag-follower');
+        const lag = document.getElementById('lead-lag-lag');
+        if (!data || !leader || !follower || !lag) return;
+
+        lag.max = data.lags.length - 1;
+        const render = () => {
+            document.getElementById('lead-lag-value').textContent = lag.value;
+            this.chartsManager.renderLeadLagHeatmap(data, parseInt(lag.value, 10), leader.value, follower.value);
+        };
+        [leader, follower, lag].forEach(control => control.addEventListener('input', render));
+        render();
+    }
+
     setupControls() {
         // Get all province buttons
         this.provinceButtons = document.querySelectorAll('.btn-province');
@@ -144,8 +163,9 @@ class Dashboard {
         }
 
         try {
-            // Show loading state
+            // Show loading state, with the prerendered charts of a single geography
             this.showLoading();
+            this.chartsManager.showPrerendered(this.prerenderedView());
 
             // Separate regions and provinces
             const regions = this.selectedProvinces.filter(p => ['Vlaanderen', 'Wallonië', 'Brussel'].includes(p));
@@ -153,6 +173,9 @@ class Dashboard {
             
             // Load all data (both provincial and regional)
             await this.dataLoader.loadAllData([...new Set(provinces)], regions);
+            // The 12-month trend is drawn from the time pyramid (cached after the first load);
+            // without it the chart falls back to its CSV
+            await this.dataLoader.loadPyramid().catch(error => console.error('Error loading pyramid:', error));
 
             // Build currentData - use loaded data directly
             this.currentData = {};
@@ -176,6 +199,7 @@ class Dashboard {
 
             // Render charts
             this.chartsManager.createAllCharts(this.currentData, this.selectedProvinces);
+            this.chartsManager.hidePrerendered();
 
             // Render tables
             this.renderAllTables();
@@ -191,10 +215,10 @@ class Dashboard {
 
     renderAllTables() {
         this.renderTable('Overlevingskans na 1 jaar.csv', 'survival-1year-table', 
-            ['Provincie', 'Jaar', 'Bouwsector (%)']);
+            ['Provincie', 'Jaar', 'Bouwsector (%)', 'Ondergrens 95% (%)', 'Bovengrens 95% (%)']);
         
         this.renderTable('Overlevingskans na 3 jaar.csv', 'survival-3year-table', 
-            ['Provincie', 'Jaar', 'Bouwsector (%)']);
+            ['Provincie', 'Jaar', 'Bouwsector (%)', 'Ondergrens 95% (%)', 'Bovengrens 95% (%)']);
         
         this.renderTable('Nieuwe starters bouwsector.csv', 'starters-table', 
             ['Provincie', 'Jaar', 'Aantal nieuwe starters']);
@@ -267,6 +291,15 @@ class Dashboard {
         });
     }
 
+    prerenderedView() {
+        // Prerendered SVGs exist per province folder and for Vlaanderen (data/svg/<view>/)
+        if (this.selectedProvinces.length !== 1) return null;
+        const geography = this.selectedProvinces[0];
+        if (geography === 'Brussel') return 'Brussels';
+        if (geography === 'Vlaanderen' || this.dataLoader.provinces.includes(geography)) return geography;
+        return null;
+    }
+
     showLoading() {
         // Add a simple loading indicator
         document.body.style.cursor = 'wait';
@@ -281,7 +314,7 @@ class Dashboard {
         this.chartsManager.destroyAllCharts();
 
         // Clear all tables
-        const tables = document.querySelectorAll('table tbody');
+        const tables = document.querySelectorAll('.table-container table tbody');
         tables.forEach(tbody => {
             tbody.innerHTML = '<tr><td colspan="10" style="text-align: center; padding: 20px; color: #999;">Selecteer provincies om data te tonen</td></tr>';
         });
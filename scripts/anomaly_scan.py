@@ -0,0 +1,128 @@
+"""
+Anomaly scan over every monthly bankruptcy series.
+Computes trailing-window z-scores and robust (median/MAD) scores for all
+geography x sector series at once. The series are laid out time-major, so each
+month is one batched operation over all series rather than a loop per series.
+For the robust scores every series keeps its trailing window sorted: each
+month one value is inserted and the oldest removed by bisection, and the MAD
+is read from the sorted window without sorting the deviations.
+"""
+import json
+import math
+from bisect import bisect_left, insort
+from operator import add, mul, sub
+
+from prefix_index import SECTORS, compact_number
+
+# Trailing window (months, current month excluded) used as the reference
+WINDOW = 24
+
+# |z| and |robust score| above these are flagged
+Z_THRESHOLD = 3.0
+ROBUST_THRESHOLD = 3.5
+
+# Scales the MAD to a standard deviation for normally distributed data
+MAD_SCALE = 0.6745
+
+
+def monthly_matrix(index, geos):
+    """Time-major monthly values: rows[t][j] is month t of series keys[j]"""
+    keys = [(geo, sector) for geo in geos for sector in SECTORS]
+    cumulative = list(zip(*(index.cumsums[geo][sector] for geo, sector in keys)))
+    rows = [list(map(sub, cumulative[t + 1], cumulative[t])) for t in range(len(cumulative) - 1)]
+    return keys, cumulative, rows
+
+
+def _zscores(value, window_sum, window_sumsq):
+    """Batched z-score of one month against the trailing window, for all series"""
+    mean = [s / WINDOW for s in window_sum]
+    variance = map(sub, (q / WINDOW for q in window_sumsq), map(mul, mean, mean))
+    std = [math.sqrt(v) if v > 0 else 0.0 for v in variance]
+    return [(x - m) / s if s else 0.0 for x, m, s in zip(value, mean, std)]
+
+
+def _median_sorted(values):
+    """Median of an already sorted sequence"""
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def _mad_sorted(values, median):
+    """Median absolute deviation of a sorted sequence from its median
+
+    The deviations grow outwards from the median on both sides, so the
+    smallest ones are merged from the middle until the middle one is reached.
+    """
+    n = len(values)
+    lo = bisect_left(values, median) - 1
+    hi = lo + 1
+    deviations = []
+    for _ in range(n // 2 + 1):
+        if hi < n and (lo < 0 or values[hi] - median <= median - values[lo]):
+            deviations.append(values[hi] - median)
+            hi += 1
+        else:
+            deviations.append(median - values[lo])
+            lo -= 1
+    return deviations[-1] if n % 2 else (deviations[-2] + deviations[-1]) / 2
+
+
+def _robust_scores(value, windows):
+    """Batched median/MAD score of one month against the sorted trailing window of every series"""
+    scores = []
+    for x, window in zip(value, windows):
+        median = _median_sorted(window)
+        mad = _mad_sorted(window, median)
+        scores.append(MAD_SCALE * (x - median) / mad if mad else 0.0)
+    return scores
+
+
+def scan_anomalies(index, geos):
+    """Flag months that deviate from their trailing window, per (geo, sector)"""
+    keys, cumulative, rows = monthly_matrix(index, geos)
+    if len(rows) <= WINDOW:
+        return keys, []
+
+    # Cumulative sum of squares, same layout as the cumulative sums
+    cumulative_sq = [[0] * len(keys)]
+    for row in rows:
+        cumulative_sq.append(list(map(add, cumulative_sq[-1], map(mul, row, row))))
+
+    # Sorted trailing window per series, moved along one month at a time
+    windows = [sorted(history) for history in zip(*rows[:WINDOW])]
+
+    flagged = []
+    for t in range(WINDOW, len(rows)):
+        window_sum = map(sub, cumulative[t], cumulative[t - WINDOW])
+        window_sumsq = map(sub, cumulative_sq[t], cumulative_sq[t - WINDOW])
+        z = _zscores(rows[t], window_sum, window_sumsq)
+        robust = _robust_scores(rows[t], windows)
+        for j, (z_score, r_score) in enumerate(zip(z, robust)):
+            if abs(z_score) >= Z_THRESHOLD or abs(r_score) >= ROBUST_THRESHOLD:
+                flagged.append((j, t, rows[t][j], z_score, r_score))
+        for window, oldest, newest in zip(windows, rows[t - WINDOW], rows[t]):
+            del window[bisect_left(window, oldest)]
+            insort(window, newest)
+    return keys, flagged
+
+
+def write_anomalies(path, index, geo_names):
+    """Run the scan and write the flagged points as compact JSON"""
+    keys, flagged = scan_anomalies(index, list(geo_names))
+
+    series = {}
+    for j, t, value, z_score, r_score in flagged:
+        geo, sector = keys[j]
+        series.setdefault(geo_names[geo], {}).setdefault(sector, []).append(
+            [index.months[t], compact_number(value), round(z_score, 2), round(r_score, 2)]
+        )
+
+    payload = {
+        "window": WINDOW,
+        "thresholds": {"z": Z_THRESHOLD, "robust": ROBUST_THRESHOLD},
+        "columns": ["Jaar-Maand", "Aantal", "z", "robuust"],
+        "series": series,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    return len(flagged)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of the scan counters against the scans themselves.
+Scans each raw file twice per round, once with the counters on (the reject
+counts per reason, the accepted count and the missing and unreadable values
+parse_number records) and once with them off (rejected=None, no stats), and
+reports the measured ratio of the fastest rounds. A small file is scanned
+several times per sample so that timer noise does not decide. Exits with 1 when the
+overhead is above MAX_OVERHEAD.
+"""
+import math
+import sys
+import time
+
+from extract_chart_data_per_province import DATA_DIR, geography_filter, parse_number
+from pushdown_scan import read_header, scan
+from scan_stats import ScanStats
+from source_adapters import PROVINCE_COLUMN, REGION_COLUMN, SOURCES
+
+# Counters must stay below this share of the scan time
+MAX_OVERHEAD = 0.03
+
+# Rounds alternate the two variants; the fastest of each is compared
+ROUNDS = 7
+
+# Each sample repeats the scan until it takes at least this long
+MIN_SAMPLE_SECONDS = 0.5
+
+
+def scan_query(source):
+    """Path, columns and pushed-down filters of the extractor's scan of a source"""
+    path = DATA_DIR / source.member
+    header = read_header(path)
+    measure_columns = [measure.column for measure in source.measures]
+    columns = (PROVINCE_COLUMN, REGION_COLUMN) + tuple(measure_columns)
+    where = [geography_filter()] + [(dim.column_in(header), bool, dim.required)
+                                    for dim in source.dims if dim.required]
+    return path, columns, where, measure_columns
+
+
+def counted_scan(path, columns, where, measure_columns, name):
+    """CPU seconds of a scan with the counters on"""
+    start = time.process_time()
+    stats = ScanStats(name)
+    accepted = 0
+    # Parsed values are cached as in the extractor; missing markers and
+    # unreadable values are not, so parse_number counts every one of them
+    parsed = {'0': 0.0}
+    cached = parsed.get
+    for _, _, *raw in scan(path, columns, where, stats.rejected):
+        totals = list(map(cached, raw))
+        if None in totals:
+            for i, (value, column) in enumerate(zip(raw, measure_columns)):
+                if totals[i] is None:
+                    totals[i] = parse_number(value, column, stats)
+                    if totals[i]:
+                        parsed[value] = totals[i]
+        accepted += 1
+    stats.accepted = accepted
+    return time.process_time() - start, stats
+
+
+def plain_scan(path, columns, where, measure_columns, name):
+    """CPU seconds of the same scan with the counters off"""
+    start = time.process_time()
+    parsed = {'0': 0.0}
+    cached = parsed.get
+    for _, _, *raw in scan(path, columns, where):
+        totals = list(map(cached, raw))
+        if None in totals:
+            for i, value in enumerate(raw):
+                if totals[i] is None:
+                    totals[i] = parse_number(value)
+                    if totals[i]:
+                        parsed[value] = totals[i]
+    return time.process_time() - start, None
+
+
+def sample(scan_variant, query, name, passes):
+    """Mean CPU seconds per scan over `passes` scans, and the stats of the last"""
+    seconds = 0.0
+    for _ in range(passes):
+        elapsed, stats = scan_variant(*query, name)
+        seconds += elapsed
+    return seconds / passes, stats
+
+
+def main():
+    worst = 0.0
+    for source in SOURCES:
+        query = scan_query(source)
+        if not query[0].exists():
+            print(f"✗ {query[0].name} not found in {DATA_DIR}")
+            return 1
+        passes = max(1, math.ceil(MIN_SAMPLE_SECONDS / max(plain_scan(*query, source.name)[0], 1e-6)))
+        counted = plain = float("inf")
+        for _ in range(ROUNDS):
+            seconds, stats = sample(counted_scan, query, source.name, passes)
+            counted = min(counted, seconds)
+            plain = min(plain, sample(plain_scan, query, source.name, passes)[0])
+        share = counted / plain - 1 if plain else 0.0
+        worst = max(worst, share)
+        print(f"  {source.name:<10} {stats.rows:>9} rows  counters off {plain:6.3f}s  "
+              f"on {counted:6.3f}s  ({share:+.1%})")
+
+    if worst > MAX_OVERHEAD:
+        print(f"✗ Counter overhead {worst:.1%} is above {MAX_OVERHEAD:.0%}")
+        return 1
+    print(f"✓ Counter overhead {worst:.1%} is below {MAX_OVERHEAD:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark handing the cubes to a worker process through shared memory against
+pickling their dicts.
+Both cubes are built once and published with shared_cube.py. A spawned child
+then either attaches to the segment or unpickles (cells, values, labels) the
+way a multiprocessing worker receives its arguments, and computes the same
+marginal. Reported per cube: the time to get the cube, the time of the
+marginal, the Python heap the child allocated for it (tracemalloc peak) and
+the size of the segment against the size of the pickle.
+"""
+import multiprocessing as mp
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from shared_cube import SharedCube
+
+MARGINAL = {"survival": ("geo", "year"), "bankruptcy": ("geo", "nace")}
+
+
+def _attach_worker(name, dims, results):
+    tracemalloc.start()
+    started = time.perf_counter()
+    cube = SharedCube.attach(name)
+    ready = time.perf_counter()
+    marginal = cube.marginal(dims)
+    done = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    cube.close()
+    results.put((ready - started, done - ready, peak, len(marginal)))
+
+
+def _pickle_worker(path, dims, results):
+    from sparse_cube import SparseCube
+
+    data = Path(path).read_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    cells, cube_dims, measures, values, labels = pickle.loads(data)
+    ready = time.perf_counter()
+    # Same work as SparseCube.marginal() on the unpickled dict
+    cube = SparseCube(cube_dims, measures)
+    cube.cells, cube.values, cube.labels = cells, values, labels
+    marginal = cube.marginal(dims)
+    done = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    results.put((ready - started, done - ready, peak, len(marginal)))
+
+
+def run_child(ctx, target, *args):
+    results = ctx.Queue()
+    process = ctx.Process(target=target, args=args + (results,))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    from extract_chart_data_per_province import build_bankruptcy_cube, build_survival_cube
+
+    print("Building cubes...")
+    cubes = {"survival": build_survival_cube()[0], "bankruptcy": build_bankruptcy_cube()[0]}
+    ctx = mp.get_context("spawn")
+
+    print(f"\n{'cube':<11}{'cells':>8}  {'method':<8}{'size':>9}{'get':>10}{'marginal':>10}{'child heap':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, cube in cubes.items():
+            dims = MARGINAL[label]
+            pickle_path = Path(tmp) / f"{label}.pickle"
+            pickle_path.write_bytes(pickle.dumps(
+                (cube.cells, cube.dims, cube.measures, cube.values, cube.labels),
+                protocol=pickle.HIGHEST_PROTOCOL))
+
+            with SharedCube.publish(cube) as shared:
+                rows = (
+                    ("shm", shared.shm.size, run_child(ctx, _attach_worker, shared.name, dims)),
+                    ("pickle", pickle_path.stat().st_size, run_child(ctx, _pickle_worker, str(pickle_path), dims)),
+                )
+            for method, size, (get, marginal, peak, groups) in rows:
+                print(f"{label:<11}{len(cube):>8}  {method:<8}{size / 1e6:>7.1f}MB{get * 1000:>8.1f}ms"
+                      f"{marginal * 1000:>8.1f}ms{peak / 1e6:>10.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Dependency-tracked build graph for the generated outputs.
+Nodes are source files, in-memory aggregates and output files. Every node has
+a fingerprint derived from its dependencies (sources: content hash) and from
+the code it runs: the script modules it declares plus the local modules those
+import. A run only rebuilds outputs whose sources or code changed, or whose
+files were removed or edited, plus the aggregates those outputs need. An
+aggregate declared with a kept copy is saved after it is computed and loaded
+instead of recomputed while its fingerprint is unchanged, so an output that
+joins two sources does not rescan the one that did not change. Independent nodes
+run in parallel; what a node prints is buffered and written as one block when
+it finishes, so the log of parallel steps does not interleave. The
+fingerprints of the last build are kept in a state file; the output paths in
+it are relative to the output folder.
+"""
+import ast
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from checkpoints import file_fingerprint, files_fingerprint
+
+SOURCE, AGGREGATE, OUTPUT = "source", "aggregate", "output"
+
+
+class Node:
+    """One build step: a source file, an in-memory aggregate or a set of output files"""
+
+    def __init__(self, name, kind, deps=(), run=None, path=None, code=(), keep=None):
+        self.name = name
+        self.kind = kind
+        self.deps = tuple(deps)
+        # run(values) gets {dep name: value} and returns the node's value;
+        # output nodes return the list of files they wrote. An output dep that
+        # is not rebuilt in this run has the value None
+        self.run = run
+        self.path = path
+        # Script files the node runs; their content is part of its fingerprint
+        self.code = tuple(sorted(set(code)))
+        # Aggregates only: (path, save(value, path) -> saved?, load(path) -> value)
+        self.keep = keep
+
+
+def local_imports(paths):
+    """The given module files plus the modules of the same directory they import, transitively
+
+    Only module-level imports count; an import inside a function (e.g. a
+    command-line main()) is not code the build step runs.
+    """
+    found = set()
+    stack = [Path(path) for path in paths]
+    while stack:
+        path = stack.pop()
+        if path in found or not path.is_file():
+            continue
+        found.add(path)
+        for statement in ast.parse(path.read_text(encoding='utf-8')).body:
+            if isinstance(statement, ast.Import):
+                names = [alias.name for alias in statement.names]
+            elif isinstance(statement, ast.ImportFrom) and statement.module and not statement.level:
+                names = [statement.module]
+            else:
+                continue
+            stack.extend(path.parent / f"{name.split('.')[0]}.py" for name in names)
+    return sorted(found)
+
+
+class _NodeOutput(io.TextIOBase):
+    """Stand-in for sys.stdout while nodes run: a worker thread writes to the buffer of its node"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.stream).write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def run(self, run, inputs, buffer):
+        self.local.buffer = buffer
+        try:
+            return run(inputs)
+        finally:
+            self.local.buffer = None
+
+
+class BuildGraph:
+    """Nodes plus the state of the previous build"""
+
+    def __init__(self, state_path, base, salt=""):
+        self.state_path = Path(state_path)
+        self.base = Path(base)
+        self.salt = salt
+        self.nodes = {}
+        self.state = {}
+        # Aggregates the last plan() loads from their kept copy
+        self.kept = set()
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f).get("nodes", {})
+
+    def source(self, name, path):
+        self.nodes[name] = Node(name, SOURCE, path=Path(path))
+
+    def aggregate(self, name, deps, run, code=(), keep=None):
+        self._add(Node(name, AGGREGATE, deps, run, code=code, keep=keep))
+
+    def output(self, name, deps, run, code=()):
+        self._add(Node(name, OUTPUT, deps, run, code=code))
+
+    def _add(self, node):
+        missing = [d for d in node.deps if d not in self.nodes]
+        if missing:
+            raise KeyError(f"{node.name} depends on unknown nodes: {', '.join(missing)}")
+        self.nodes[node.name] = node
+
+    def fingerprints(self):
+        """Fingerprint and transitive source fingerprints of every node (insertion order is topological)"""
+        fingerprints, sources = {}, {}
+        # Many nodes run the same modules; each set is hashed once
+        code = {}
+        for name, node in self.nodes.items():
+            if node.kind == SOURCE:
+                fingerprints[name] = file_fingerprint(node.path) or "missing"
+                sources[name] = {name: fingerprints[name]}
+                continue
+            if node.code not in code:
+                code[node.code] = files_fingerprint(node.code)
+            digest = hashlib.sha256(f"{self.salt}|{name}|{code[node.code]}".encode('utf-8'))
+            sources[name] = {}
+            for dep in node.deps:
+                digest.update(f"|{dep}={fingerprints[dep]}".encode('utf-8'))
+                sources[name].update(sources[dep])
+            fingerprints[name] = digest.hexdigest()
+        return fingerprints, sources
+
+    def _relative(self, path):
+        return Path(os.path.relpath(path, self.base)).as_posix()
+
+    def _stale_reason(self, node, fingerprint, sources, planned):
+        previous = self.state.get(node.name)
+        if previous is None:
+            return "never built"
+        rebuilt = [dep for dep in node.deps if dep in planned and self.nodes[dep].kind == OUTPUT]
+        if rebuilt:
+            return f"{rebuilt[0]} is rebuilt" + (f" (+{len(rebuilt) - 1} more)" if len(rebuilt) > 1 else "")
+        if previous.get("fingerprint") != fingerprint:
+            changed = sorted(s for s, fp in sources.items() if previous.get("sources", {}).get(s) != fp)
+            return f"{', '.join(changed)} changed" if changed else "code changed"
+        for path, digest in previous.get("outputs", {}).items():
+            if file_fingerprint(self.base / path) != digest:
+                return f"{path} missing or modified"
+        return None
+
+    def _kept_copy_is_current(self, node, fingerprint):
+        previous = self.state.get(node.name)
+        if node.keep is None or previous is None or previous.get("fingerprint") != fingerprint:
+            return False
+        path = node.keep[0]
+        return file_fingerprint(path) == previous.get("outputs", {}).get(self._relative(path))
+
+    def plan(self, force=False):
+        """Ordered {node name: reason} of everything that has to run"""
+        fingerprints, sources = self.fingerprints()
+        planned = {}
+        for name, node in self.nodes.items():
+            if node.kind != OUTPUT:
+                continue
+            reason = "forced" if force else self._stale_reason(node, fingerprints[name], sources[name], planned)
+            if reason:
+                planned[name] = reason
+
+        # Aggregates are only computed when a planned output needs them, and
+        # loaded instead when their kept copy has the current fingerprint
+        needed = {}
+        self.kept = set()
+        stack = [(dep, name) for name in planned for dep in self.nodes[name].deps]
+        while stack:
+            name, user = stack.pop()
+            node = self.nodes[name]
+            if node.kind == AGGREGATE and name not in needed:
+                if not force and self._kept_copy_is_current(node, fingerprints[name]):
+                    needed[name] = f"needed by {user}, loaded from its kept copy"
+                    self.kept.add(name)
+                    continue
+                needed[name] = f"needed by {user}"
+                stack.extend((dep, name) for dep in node.deps)
+        planned.update(needed)
+        return {name: planned[name] for name in self.nodes if name in planned}
+
+    def run(self, plan, jobs=None):
+        """Run the planned nodes, independent ones in parallel; returns their values"""
+        fingerprints, sources = self.fingerprints()
+        values = {name: node.path for name, node in self.nodes.items() if node.kind == SOURCE}
+        pending = dict(plan)
+        running = {}
+        buffers = {}
+        error = None
+
+        output = _NodeOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                while (pending or running) and error is None:
+                    for name in list(pending):
+                        deps = self.nodes[name].deps
+                        node = self.nodes[name]
+                        if name in self.kept:
+                            run, inputs = (lambda _, load=node.keep[2], path=node.keep[0]: load(path)), {}
+                        elif all(dep in values or dep not in plan for dep in node.deps):
+                            run, inputs = node.run, {dep: values.get(dep) for dep in node.deps}
+                        else:
+                            continue
+                        buffers[name] = io.StringIO()
+                        running[executor.submit(output.run, run, inputs, buffers[name])] = name
+                        del pending[name]
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    error = self._collect(done, running, buffers, values, fingerprints, sources, output) or error
+            # Nodes still running at a failure have finished with the executor
+            self._collect(list(running), running, buffers, values, fingerprints, sources, output)
+            # Outputs finished before a failure are kept, so a rerun resumes
+            self.save()
+        finally:
+            sys.stdout = output.stream
+
+        if error is not None:
+            raise error
+        return values
+
+    def _collect(self, done, running, buffers, values, fingerprints, sources, output):
+        """Record finished nodes and write their buffered log; returns the first error"""
+        error = None
+        for future in done:
+            name = running.pop(future)
+            output.stream.write(buffers.pop(name).getvalue())
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            values[name] = future.result()
+            node = self.nodes[name]
+            written = (values[name] or []) if node.kind == OUTPUT else []
+            if node.keep is not None and name not in self.kept:
+                path, save, _ = node.keep
+                if not save(values[name], path):
+                    self.state.pop(name, None)
+                    continue
+                written = [path]
+            if node.kind == OUTPUT or node.keep is not None:
+                self.state[name] = {
+                    "fingerprint": fingerprints[name],
+                    "sources": sources[name],
+                    "outputs": {self._relative(p): file_fingerprint(p) for p in written},
+                }
+        return error
+
+    def save(self):
+        state = {name: entry for name, entry in self.state.items() if name in self.nodes}
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump({"nodes": state}, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
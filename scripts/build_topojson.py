@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Build a quantized, simplified TopoJSON map with the pipeline metrics joined in.
+Takes a local GeoJSON boundary file (municipalities and/or provinces keyed by
+NIS code), extracts shared borders as arcs, simplifies every arc once so
+neighbours stay aligned, and writes delta-encoded integer coordinates.
+
+The extractor's build graph rebuilds data/kaarten/<name>.topojson for every
+data/kaarten/<name>.geojson whenever the boundaries or the joined metrics
+change; the CLI converts any other boundary file. No page loads the TopoJSON
+yet: the legacy map code (js/app.js, js/map.js) still fetches GeoJSON.
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+from prefix_index import PrefixSumIndex
+
+SCRIPT_DIR = Path(__file__).parent
+DASHBOARD_DIR = SCRIPT_DIR.parent
+DATA_DIR = DASHBOARD_DIR / "data"
+GRAPH_DIR = DATA_DIR / "data-grafieken"
+# Boundary files picked up by the build graph; the maps are written next to them
+MAP_DIR = DATA_DIR / "kaarten"
+
+QUANTIZATION = 100000
+TOLERANCE = 2.0
+
+# Properties that may hold the NIS code or the display name of a feature
+ID_PROPERTIES = ('CD_REFNIS', 'CD_MUNTY_REFNIS', 'NISCode', 'niscode', 'nis_code', 'NIS', 'code')
+NAME_PROPERTIES = ('name', 'NAAM', 'naam', 'TX_MUNTY_DESCR_NL', 'municipality')
+
+# Province NIS codes -> folder names in data/data-grafieken/
+PROVINCE_FOLDERS = {
+    "10000": "Antwerpen",
+    "20001": "Vlaams-Brabant",
+    "20002": "Waals-Brabant",
+    "30000": "West-Vlaanderen",
+    "40000": "Oost-Vlaanderen",
+    "50000": "Henegouwen",
+    "60000": "Luik",
+    "70000": "Limburg",
+    "80000": "Luxemburg",
+    "90000": "Namen",
+    "04000": "Brussels",
+}
+
+
+# ---------------------------------------------------------------------------
+# Topology
+# ---------------------------------------------------------------------------
+
+def quantize_rings(features, quantization):
+    """Quantize all rings to an integer grid; returns rings per feature and the transform
+
+    Features without rings get no polygons; without any ring at all the
+    transform is the identity.
+    """
+    xs, ys = [], []
+    for feature in features:
+        for polygon in _polygons(feature["geometry"]):
+            for ring in polygon:
+                xs.extend(p[0] for p in ring)
+                ys.extend(p[1] for p in ring)
+    if not xs:
+        return [[] for _ in features], {"scale": [1, 1], "translate": [0, 0]}
+    x0, y0 = min(xs), min(ys)
+    kx = (max(xs) - x0) / (quantization - 1) or 1
+    ky = (max(ys) - y0) / (quantization - 1) or 1
+
+    quantized = []
+    for feature in features:
+        polygons = []
+        for polygon in _polygons(feature["geometry"]):
+            rings = []
+            for ring in polygon:
+                points = []
+                for x, y in ring:
+                    point = (round((x - x0) / kx), round((y - y0) / ky))
+                    if not points or points[-1] != point:
+                        points.append(point)
+                if len(points) > 1 and points[0] == points[-1]:
+                    points.pop()
+                if len(points) >= 3:
+                    rings.append(points)
+            if rings:
+                polygons.append(rings)
+        quantized.append(polygons)
+    return quantized, {"scale": [kx, ky], "translate": [x0, y0]}
+
+
+def _polygons(geometry):
+    """Polygon coordinates of a Polygon or MultiPolygon geometry"""
+    if geometry is None:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def find_junctions(rings):
+    """Points where the set of neighbouring points differs between rings"""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring)
+        for i, point in enumerate(ring):
+            pair = frozenset((ring[i - 1], ring[(i + 1) % n]))
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+def _canonical_ring(ring):
+    """Rotate a closed ring to start at its smallest point"""
+    start = ring.index(min(ring))
+    return ring[start:] + ring[:start]
+
+
+class ArcStore:
+    """Deduplicated arcs; shared borders are stored once and referenced reversed"""
+
+    def __init__(self):
+        self.arcs = []
+        self.lookup = {}
+
+    def add(self, points):
+        key = tuple(points)
+        if key in self.lookup:
+            return self.lookup[key]
+        reverse = tuple(reversed(points))
+        if reverse in self.lookup:
+            return ~self.lookup[reverse]
+        self.arcs.append(list(points))
+        self.lookup[key] = len(self.arcs) - 1
+        return len(self.arcs) - 1
+
+    def add_ring(self, ring):
+        """Store a ring without junctions as one closed arc"""
+        forward = _canonical_ring(ring)
+        backward = _canonical_ring(list(reversed(ring)))
+        key, reverse_key = tuple(forward + forward[:1]), tuple(backward + backward[:1])
+        if key in self.lookup:
+            return self.lookup[key]
+        if reverse_key in self.lookup:
+            return ~self.lookup[reverse_key]
+        self.arcs.append(list(key))
+        self.lookup[key] = len(self.arcs) - 1
+        return len(self.arcs) - 1
+
+
+def cut_ring(ring, junctions, store):
+    """Split a ring at its junctions into arc references"""
+    cuts = [i for i, point in enumerate(ring) if point in junctions]
+    if not cuts:
+        return [store.add_ring(ring)]
+
+    rotated = ring[cuts[0]:] + ring[:cuts[0]]
+    rotated.append(rotated[0])
+    arcs, start = [], 0
+    for i in range(1, len(rotated)):
+        if rotated[i] in junctions:
+            arcs.append(store.add(rotated[start:i + 1]))
+            start = i
+    return arcs
+
+
+# ---------------------------------------------------------------------------
+# Simplification and encoding
+# ---------------------------------------------------------------------------
+
+def _distance_sq(point, a, b):
+    """Squared distance from point to segment a-b"""
+    (px, py), (ax, ay), (bx, by) = point, a, b
+    dx, dy = bx - ax, by - ay
+    if dx == 0 and dy == 0:
+        return (px - ax) ** 2 + (py - ay) ** 2
+    t = max(0, min(1, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)))
+    return (px - ax - t * dx) ** 2 + (py - ay - t * dy) ** 2
+
+
+def simplify_arc(points, tolerance):
+    """Douglas-Peucker on one arc; endpoints (junctions) are always kept"""
+    if tolerance <= 0 or len(points) <= 2:
+        return points
+    closed = points[0] == points[-1]
+    if closed:
+        # Anchor closed rings on the point farthest from the start so they keep an area
+        far = max(range(1, len(points) - 1), key=lambda i: _distance_sq(points[i], points[0], points[0]))
+        head = simplify_arc(points[:far + 1], tolerance)
+        tail = simplify_arc(points[far:], tolerance)
+        result = head + tail[1:]
+        if len(result) < 4:
+            # Never collapse a ring below a triangle
+            keep = sorted({0, far // 2, far, (far + len(points) - 1) // 2, len(points) - 1})
+            result = [points[i] for i in keep]
+        return result
+
+    tolerance_sq = tolerance * tolerance
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        index, max_sq = None, tolerance_sq
+        for i in range(first + 1, last):
+            d = _distance_sq(points[i], points[first], points[last])
+            if d > max_sq:
+                index, max_sq = i, d
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def delta_encode(points):
+    """TopoJSON delta encoding of a quantized arc"""
+    encoded, px, py = [], 0, 0
+    for x, y in points:
+        encoded.append([x - px, y - py])
+        px, py = x, y
+    return encoded
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _rate(value):
+    """Survival percentage from a summary CSV cell ('-' means not available)"""
+    return float(value) if value not in ('', '-') else None
+
+
+def _read_csv(path):
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def _latest_rate(rows, column):
+    """(year, rate) of the latest row with a value in column, or (None, None)"""
+    for row in sorted(rows, key=lambda r: int(r['Jaar']), reverse=True):
+        rate = _rate(row[column])
+        if rate is not None:
+            return int(row['Jaar']), rate
+    return None, None
+
+
+def load_province_metrics(graph_dir=GRAPH_DIR):
+    """Latest yearly summary and last 12 months of bankruptcies per province folder
+
+    The survival rates of the youngest cohorts are not known yet ('-'), so
+    each rate comes from the latest year that has one, with that year.
+    """
+    index_file = graph_dir / "faillissementen_prefixsommen.json"
+    index = PrefixSumIndex.load(index_file) if index_file.exists() else None
+
+    metrics = {}
+    for code, folder in PROVINCE_FOLDERS.items():
+        rows = _read_csv(graph_dir / folder / 'Jaarlijkse cijfers bouwsector (sinds 2016).csv')
+        values = {}
+        if rows:
+            latest = max(rows, key=lambda r: int(r['Jaar']))
+            year_1, rate_1 = _latest_rate(rows, '1-jarige overlevingskans (%)')
+            year_3, rate_3 = _latest_rate(rows, '3-jarige overlevingskans (%)')
+            values = {
+                "jaar": int(latest['Jaar']),
+                "starters": int(latest['Nieuwe starters']),
+                "overleving_1j": rate_1,
+                "overleving_1j_jaar": year_1,
+                "overleving_3j": rate_3,
+                "overleving_3j_jaar": year_3,
+                "faillissementen": int(latest['Jaarlijkse faillissementen']),
+            }
+        if index is not None and code in index.cumsums:
+            values["faillissementen_12m"] = index.window(code, "construction", index.last_month)
+        metrics[code] = values
+    return metrics
+
+
+def load_municipality_metrics(graph_dir=GRAPH_DIR):
+    """Latest year and totals of bankruptcies per municipality"""
+    path = graph_dir / "faillissementen_per_gemeente.json"
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        payload = json.load(f)
+    years = payload["years"]
+    metrics = {}
+    for code, sectors in payload["gemeenten"].items():
+        metrics[code] = {
+            "jaar": years[-1],
+            "faillissementen_bouw": sectors["construction"][-1],
+            "faillissementen_niet_bouw": sectors["non_construction"][-1],
+            "faillissementen_bouw_totaal": sum(sectors["construction"]),
+        }
+    return metrics
+
+
+def _feature_id(properties, id_property):
+    keys = (id_property,) if id_property else ID_PROPERTIES
+    for key in keys:
+        if properties.get(key) not in (None, ''):
+            return str(properties[key]).zfill(5)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def build_topology(geojson, object_name, quantization, tolerance, id_property=None, graph_dir=GRAPH_DIR):
+    """Convert a GeoJSON FeatureCollection into a TopoJSON topology with metrics from graph_dir"""
+    features = [f for f in geojson.get("features", []) if f.get("geometry")]
+    rings_per_feature, transform = quantize_rings(features, quantization)
+
+    all_rings = [ring for polygons in rings_per_feature for polygon in polygons for ring in polygon]
+    junctions = find_junctions(all_rings)
+    store = ArcStore()
+
+    province_metrics = load_province_metrics(graph_dir)
+    municipality_metrics = load_municipality_metrics(graph_dir)
+
+    geometries = []
+    for feature, polygons in zip(features, rings_per_feature):
+        arcs = [[cut_ring(ring, junctions, store) for ring in polygon] for polygon in polygons]
+        properties = feature.get("properties") or {}
+        code = _feature_id(properties, id_property)
+        joined = {"id": code}
+        name = next((properties[k] for k in NAME_PROPERTIES if properties.get(k)), None)
+        if name:
+            joined["naam"] = name
+        joined.update(province_metrics.get(code) or municipality_metrics.get(code) or {})
+
+        geometry = {"properties": joined}
+        if code:
+            geometry["id"] = code
+        if not arcs:
+            # No rings (e.g. a point or an empty geometry): a null geometry keeps the metrics
+            geometry["type"] = None
+        elif len(arcs) == 1:
+            geometry.update(type="Polygon", arcs=arcs[0])
+        else:
+            geometry.update(type="MultiPolygon", arcs=arcs)
+        geometries.append(geometry)
+
+    arcs = [delta_encode(simplify_arc(arc, tolerance)) for arc in store.arcs]
+    return {
+        "type": "Topology",
+        "transform": transform,
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": arcs,
+    }
+
+
+def write_topology(boundaries, output, object_name=None, quantization=QUANTIZATION, tolerance=TOLERANCE,
+                   id_property=None, graph_dir=GRAPH_DIR):
+    """Convert a boundary file into a TopoJSON file; returns the topology"""
+    with open(boundaries, 'r', encoding='utf-8') as f:
+        geojson = json.load(f)
+
+    object_name = object_name or Path(boundaries).stem
+    topology = build_topology(geojson, object_name, quantization, tolerance, id_property, graph_dir)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(topology, f, ensure_ascii=False, separators=(',', ':'))
+
+    size_before = Path(boundaries).stat().st_size
+    size_after = Path(output).stat().st_size
+    print(f"✓ Wrote {Path(output).name}: {len(topology['objects'][object_name]['geometries'])} features, "
+          f"{len(topology['arcs'])} arcs")
+    print(f"  Payload: {size_before / 1024:.1f} KB → {size_after / 1024:.1f} KB "
+          f"({100 * size_after / max(size_before, 1):.1f}% of the GeoJSON)")
+    return topology
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a simplified TopoJSON map with pipeline metrics")
+    parser.add_argument("boundaries", type=Path, help="Local GeoJSON boundary file")
+    parser.add_argument("-o", "--output", type=Path, help="Output .topojson (default: next to the input)")
+    parser.add_argument("--object", default=None, help="TopoJSON object name (default: input file stem)")
+    parser.add_argument("--quantization", type=int, default=QUANTIZATION, help="Grid size per axis (default: 1e5)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Simplification tolerance in quantized units (default: 2, 0 = off)")
+    parser.add_argument("--id-property", default=None, help="Feature property holding the NIS code")
+    args = parser.parse_args()
+
+    if not args.boundaries.exists():
+        print(f"✗ Boundary file not found: {args.boundaries}")
+        sys.exit(1)
+
+    write_topology(args.boundaries, args.output or args.boundaries.with_suffix('.topojson'), args.object,
+                   args.quantization, args.tolerance, args.id_property)
+
+
+if __name__ == "__main__":
+    main()
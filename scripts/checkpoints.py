@@ -0,0 +1,99 @@
+"""
+Stage checkpoints for the update run.
+After a stage completes, a JSON checkpoint records the fingerprints of its
+inputs and outputs. A later run skips the stage when its inputs are unchanged
+and its outputs are still there, so a failed run resumes at the stage that
+failed (or whose inputs changed) instead of starting over.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+DASHBOARD_DIR = Path(__file__).parent.parent
+DATA_DIR = DASHBOARD_DIR / "data"
+CHECKPOINT_DIR = DATA_DIR / ".checkpoints"
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path):
+    """SHA-256 of a file's content, None when it does not exist"""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def files_fingerprint(paths):
+    """One fingerprint over several files (names and contents)"""
+    digest = hashlib.sha256()
+    for path in sorted(Path(p) for p in paths):
+        digest.update(path.name.encode('utf-8'))
+        digest.update((file_fingerprint(path) or '-').encode('ascii'))
+    return digest.hexdigest()
+
+
+def _relative(path):
+    """Repository-relative path, so checkpoints survive a different checkout location"""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(DASHBOARD_DIR.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def _checkpoint_path(stage, checkpoint_dir):
+    return Path(checkpoint_dir) / f"{stage}.json"
+
+
+def load_checkpoint(stage, checkpoint_dir=CHECKPOINT_DIR):
+    """Last checkpoint of a stage, or None"""
+    path = _checkpoint_path(stage, checkpoint_dir)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(stage, status, inputs, outputs, checkpoint_dir=CHECKPOINT_DIR, error=None):
+    """Record a stage run; outputs are fingerprinted now"""
+    Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
+    checkpoint = {
+        "stage": stage,
+        "status": status,
+        "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "inputs": inputs,
+        "outputs": {_relative(path): file_fingerprint(path) for path in outputs},
+    }
+    if error:
+        checkpoint["error"] = error
+    with open(_checkpoint_path(stage, checkpoint_dir), 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+        f.write("\n")
+    return checkpoint
+
+
+def stale_reason(stage, inputs, checkpoint_dir=CHECKPOINT_DIR):
+    """Why a stage has to run, or None when its checkpoint is still valid"""
+    checkpoint = load_checkpoint(stage, checkpoint_dir)
+    if checkpoint is None:
+        return "no checkpoint"
+    if checkpoint.get("status") != "completed":
+        return f"last run {checkpoint.get('status', 'incomplete')}"
+    if any(value is None for value in inputs.values()):
+        return "input fingerprint unavailable"
+    changed = sorted(name for name in inputs if checkpoint.get("inputs", {}).get(name) != inputs[name])
+    if changed:
+        return f"inputs changed: {', '.join(changed)}"
+    for path, fingerprint in checkpoint.get("outputs", {}).items():
+        if file_fingerprint(DASHBOARD_DIR / path) != fingerprint:
+            return f"output missing or modified: {Path(path).name}"
+    return None
@@ -0,0 +1,193 @@
+"""
+Construction-sector analyses formerly produced by the pandas scripts in
+scripts/archive/ (attrition per operating year, breakdown by company size, the
+tidy table and the economic-cycle table). They are computed from the survival
+cube and the bankruptcy prefix-sum index of the main pipeline, so they run on
+every update without loading the raw files into memory a second time.
+
+Terminology (as in the archived scripts):
+- "Faillissementen" (TF_BANKRUPTCIES): legal bankruptcies
+- "Stopzettingen" (TF_VAT_SURVIVALS): all exits (bankruptcies, voluntary
+  stops, mergers, liquidations), i.e. registrations minus survivors
+"""
+import csv
+
+# Attrition horizons available in TF_VAT_SURVIVALS (survivors after 1..5 years)
+HORIZONS = (1, 2, 3, 4, 5)
+
+# Display names of the CD_CLS_WRKR size classes, falling back to TX_CLS_WRKR_NL
+WORKER_CLASSES = {
+    '01': '0-4 werknemers',
+    '02': '5-9 werknemers',
+    '03': '10-49 werknemers',
+    '04': '50+ werknemers',
+}
+
+ATTRITION_FILE = "stopzettingen_per_werkingsjaar.csv"
+SIZE_FILE = "stopzettingen_per_omvang.csv"
+TIDY_FILE = "bouwsector_tidy_data.csv"
+CYCLE_FILE = "economische_cyclus_analyse.csv"
+
+
+def worker_class_name(code, labels):
+    """Readable name of a worker size class"""
+    return WORKER_CLASSES.get(code) or labels.get(code) or f"Onbekend ({code})"
+
+
+def _region_of(regions):
+    """Map every geography code to its region name"""
+    return {code: region for region, members in regions.items() for code in members}
+
+
+def construction_cohorts(survival_cube, regions, nace):
+    """Construction survival counts per (region, cohort year, size class)"""
+    region_of = _region_of(regions)
+    cohorts = {}
+    for (geo, year, nace_code, size_class), totals in survival_cube.marginal(
+            ("geo", "year", "nace", "size_class")).items():
+        region = region_of.get(geo)
+        if nace_code != nace or region is None:
+            continue
+        cell = cohorts.setdefault((region, year, size_class), [0] * len(totals))
+        for i, value in enumerate(totals):
+            cell[i] += value
+    return cohorts
+
+
+def attrition_rows(cohorts, regions):
+    """Exits in each operating year per region and cohort, as counts and % of starters"""
+    per_region = {}
+    for (region, year, _), totals in cohorts.items():
+        cell = per_region.setdefault((region, year), [0] * len(totals))
+        for i, value in enumerate(totals):
+            cell[i] += value
+
+    rows = []
+    for region in regions:
+        for year in sorted(y for r, y in per_region if r == region):
+            totals = per_region[(region, year)]
+            starters = totals[0]
+            row = {'Gewest': region, 'Cohort': year, 'Aantal_Starters': int(starters)}
+            for n in HORIZONS:
+                # Survivors are 0 for horizons after the last observed year; at
+                # region level a real zero does not occur
+                if totals[n] == 0:
+                    row[f'Stopzettingen_Jaar_{n}'] = ''
+                    row[f'Percentage_Jaar_{n}'] = ''
+                    continue
+                exits = totals[n - 1] - totals[n]
+                row[f'Stopzettingen_Jaar_{n}'] = int(exits)
+                row[f'Percentage_Jaar_{n}'] = round(exits / starters * 100, 1) if starters > 0 else 0
+            rows.append(row)
+    return rows
+
+
+def size_rows(cohorts, labels, regions):
+    """Exits in the first year per region, cohort and size class (pivoted)"""
+    classes = sorted({size_class for _, _, size_class in cohorts})
+    names = [worker_class_name(code, labels) for code in classes]
+    rows = []
+    for region in regions:
+        years = sorted({year for r, year, _ in cohorts if r == region})
+        for year in years:
+            row = {'Gewest': region, 'Cohort': year}
+            for code, name in zip(classes, names):
+                totals = cohorts.get((region, year, code))
+                row[name] = int(totals[0] - totals[1]) if totals else 0
+            rows.append(row)
+    return ['Gewest', 'Cohort'] + names, rows
+
+
+def yearly_construction(index, regions, undated=None):
+    """Construction and total bankruptcies per region and calendar year
+
+    undated: {region: {year: {sector: count}}} of the rows without a month,
+    which the monthly index leaves out.
+    """
+    undated = undated or {}
+    yearly = {}
+    for year in index.years():
+        yearly[year] = {}
+        for region in regions:
+            extra = undated.get(region, {}).get(year, {})
+            construction = index.yearly(region, "construction", year) + extra.get("construction", 0)
+            non_construction = index.yearly(region, "non_construction", year) + extra.get("non_construction", 0)
+            yearly[year][region] = (construction, construction + non_construction)
+    return yearly
+
+
+def tidy_rows(cohorts, labels, yearly, regions):
+    """Long table: starters/exits per size class plus legal bankruptcies per year"""
+    rows = []
+    for (region, year, size_class), totals in cohorts.items():
+        if totals[0] > 0 or totals[0] - totals[1] > 0:
+            rows.append({
+                'jaar': int(year),
+                'gewest': region,
+                'grootte': worker_class_name(size_class, labels),
+                'aantal_starters': int(totals[0]),
+                'aantal_stopzettingen': int(totals[0] - totals[1]),
+                'aantal_faillissementen_juridisch': '',
+            })
+    for year, per_region in yearly.items():
+        for region in regions:
+            construction, _ = per_region[region]
+            if construction:
+                rows.append({
+                    'jaar': year,
+                    'gewest': region,
+                    'grootte': 'Alle groottes',
+                    'aantal_starters': '',
+                    'aantal_stopzettingen': '',
+                    'aantal_faillissementen_juridisch': int(construction),
+                })
+    rows.sort(key=lambda row: (row['jaar'], row['gewest'], row['grootte']))
+    return rows
+
+
+def cycle_rows(yearly, regions):
+    """Yearly construction and total bankruptcies per region (economic cycle)"""
+    rows = []
+    for year, per_region in yearly.items():
+        if not any(total for _, total in per_region.values()):
+            continue
+        row = {'Jaar': year}
+        for region in regions:
+            row[f'{region}_Bouw'] = int(per_region[region][0])
+        row['Totaal_Bouw'] = sum(row[f'{region}_Bouw'] for region in regions)
+        for region in regions:
+            row[f'{region}_Totaal'] = int(per_region[region][1])
+        rows.append(row)
+    return rows
+
+
+def _write(path, fieldnames, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"   Created: {path.name} ({len(rows)} records)")
+
+
+def write_cohort_analyses(output_dir, survival_cube, bankruptcy_index, regions, nace="F", undated=None):
+    """Write the four analysis CSVs to output_dir; undated as in yearly_construction()"""
+    labels = survival_cube.labels.get("size_class", {})
+    cohorts = construction_cohorts(survival_cube, regions, nace)
+
+    attrition = attrition_rows(cohorts, regions)
+    fieldnames = ['Gewest', 'Cohort', 'Aantal_Starters']
+    for n in HORIZONS:
+        fieldnames += [f'Stopzettingen_Jaar_{n}', f'Percentage_Jaar_{n}']
+    _write(output_dir / ATTRITION_FILE, fieldnames, attrition)
+
+    size_fields, by_size = size_rows(cohorts, labels, regions)
+    _write(output_dir / SIZE_FILE, size_fields, by_size)
+
+    yearly = yearly_construction(bankruptcy_index, regions, undated)
+    _write(output_dir / TIDY_FILE,
+           ['jaar', 'gewest', 'grootte', 'aantal_starters', 'aantal_stopzettingen',
+            'aantal_faillissementen_juridisch'],
+           tidy_rows(cohorts, labels, yearly, regions))
+
+    cycle_fields = ['Jaar'] + [f'{r}_Bouw' for r in regions] + ['Totaal_Bouw'] + [f'{r}_Totaal' for r in regions]
+    _write(output_dir / CYCLE_FILE, cycle_fields, cycle_rows(yearly, regions))
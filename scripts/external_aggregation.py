@@ -0,0 +1,125 @@
+"""
+Memory-bounded aggregation with disk spill.
+Sums value vectors per key in a dict until the memory budget is reached, then
+flushes the partial aggregates as a sorted run to a temp file. Reading the
+result merges all runs (k-way) so it works for any number of keys.
+"""
+import heapq
+import json
+import os
+import sys
+import tempfile
+from itertools import groupby
+
+# Rough overhead of one dict slot plus the value list, on top of the objects
+DICT_ENTRY_OVERHEAD = 104
+
+
+def _entry_size(key, values):
+    """Approximate bytes held by one aggregate entry"""
+    return (sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key)
+            + sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+            + DICT_ENTRY_OVERHEAD)
+
+
+def _read_run(path):
+    """Stream (key, values) pairs from a spilled run file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            key, values = json.loads(line)
+            yield tuple(key), values
+
+
+def _merge_sorted(streams):
+    """Merge sorted (key, values) streams, summing values of equal keys"""
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    for key, group in groupby(merged, key=lambda item: item[0]):
+        totals = None
+        for _, values in group:
+            if totals is None:
+                totals = list(values)
+            else:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        yield key, totals
+
+
+class SpillingAggregator:
+    """Sum value vectors per key within a memory budget (bytes, None = unbounded)"""
+
+    def __init__(self, memory_budget=None, fan_in=64, temp_dir=None):
+        self.memory_budget = memory_budget
+        self.fan_in = fan_in
+        self.data = {}
+        self.runs = []
+        self.spills = 0
+        self.max_entries = None
+        self._run_counter = 0
+        self._tmp = None
+        self._temp_dir = temp_dir
+
+    def add(self, key, values):
+        """Add a value vector to the running total of key"""
+        totals = self.data.get(key)
+        if totals is None:
+            if self.max_entries is None and self.memory_budget is not None:
+                self.max_entries = max(1, self.memory_budget // _entry_size(key, values))
+            self.data[key] = list(values)
+            if self.max_entries is not None and len(self.data) >= self.max_entries:
+                self._spill()
+        else:
+            for i, value in enumerate(values):
+                totals[i] += value
+
+    def _new_run_path(self):
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="aggregate-spill-", dir=self._temp_dir)
+        self._run_counter += 1
+        return os.path.join(self._tmp.name, f"run-{self._run_counter:05d}.jsonl")
+
+    def _write_run(self, items):
+        path = self._new_run_path()
+        with open(path, 'w', encoding='utf-8') as f:
+            for key, values in items:
+                f.write(json.dumps([key, values], separators=(',', ':')))
+                f.write('\n')
+        return path
+
+    def _spill(self):
+        """Flush the in-memory aggregates as one sorted run"""
+        self.runs.append(self._write_run(sorted(self.data.items())))
+        self.data = {}
+        self.spills += 1
+
+    def _compact_runs(self):
+        """Merge runs in batches until they fit in a single k-way merge"""
+        while len(self.runs) > self.fan_in:
+            batch, self.runs = self.runs[:self.fan_in], self.runs[self.fan_in:]
+            self.runs.append(self._write_run(_merge_sorted(_read_run(p) for p in batch)))
+            for path in batch:
+                os.remove(path)
+
+    def items(self):
+        """Yield (key, totals) in key order, merging spilled runs"""
+        if not self.runs:
+            yield from ((key, values) for key, values in sorted(self.data.items()))
+            return
+
+        if self.data:
+            self._spill()
+        self._compact_runs()
+        yield from _merge_sorted([_read_run(path) for path in self.runs])
+
+    def close(self):
+        """Remove spill files"""
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+        self.runs = []
+        self.data = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
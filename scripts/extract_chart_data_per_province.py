@@ -2,12 +2,36 @@
 Extract data from each chart per PROVINCE and save as separate CSV files.
 Creates a subfolder for each province in data/data-grafieken/
 """
+import argparse
 import json
 import csv
 import os
+import time
 from pathlib import Path
 from collections import defaultdict
 
+from anomaly_scan import write_anomalies
+from build_graph import OUTPUT, BuildGraph, local_imports
+from build_topojson import MAP_DIR as BOUNDARY_DIR, write_topology
+from cohort_analyses import ATTRITION_FILE, CYCLE_FILE, SIZE_FILE, TIDY_FILE, write_cohort_analyses
+from external_aggregation import SpillingAggregator
+from invariants import InvariantError, check_calendar, check_region_totals
+from lead_lag import write_lead_lag
+from manifest import MANIFEST_NAME, write_manifest
+from net_formation import align, write_net_formation
+from prefix_index import PrefixSumIndex, compact_number
+from prerender_svg import CHARTS as SVG_CHARTS, DEFAULT_VIEW, default_view_sources, write_chart_svg
+from pushdown_scan import read_header, scan
+from release_diff import REPORT_FILE as RELEASE_DIFF_FILE, diff_source, write_report
+from scan_stats import ScanStats, write_run_report
+from seasonal_adjustment import by_geography, seasonally_adjust, write_seasonal_adjustment
+from source_adapters import BANKRUPTCIES, PROVINCE_COLUMN, REGION_COLUMN, SOURCES, SURVIVALS
+from sparse_cube import SparseCube
+from stratified_sample import StratifiedSample, add_groups, error_table, median_margin, write_sample_errors
+from survival_intervals import survival_intervals
+from tidy_export import TIDY_NAME, write_tidy_export
+from time_pyramid import write_pyramid
+
 # Get script directory and set paths relative to dashboard root
 SCRIPT_DIR = Path(__file__).parent
 DASHBOARD_DIR = SCRIPT_DIR.parent
@@ -33,21 +57,107 @@ PROVINCES = {
 # Brussels has no provinces, we'll create a separate folder for it
 BRUSSELS_REGION = "04000"
 
+# Regions as groups of the geographies above (used for group totals)
+REGIONS = {
+    "Vlaanderen": ["10000", "20001", "30000", "40000", "70000"],
+    "Wallonië": ["20002", "50000", "60000", "80000", "90000"],
+    "Brussel": [BRUSSELS_REGION],
+}
+
+# CD_RGN_REFNIS codes of the regions above
+REGION_CODES = {"02000": "Vlaanderen", "03000": "Wallonië", BRUSSELS_REGION: "Brussel"}
+
 # NACE code for construction
 NACE_CONSTRUCTION = "F"
 
+# Persisted prefix-sum index of the monthly bankruptcy series
+PREFIX_INDEX_FILE = base_output_dir / "faillissementen_prefixsommen.json"
+
+# Flagged months of the anomaly scan; published for review, no chart loads it yet
+ANOMALIES_FILE = base_output_dir / "faillissementen_anomalieen.json"
+
+# Seasonally adjusted monthly series and seasonal components
+SEASONAL_FILE = base_output_dir / "faillissementen_seizoensgecorrigeerd.json"
+
+# Geography x geography x lag correlations of the monthly series, for the heatmap
+LEAD_LAG_FILE = base_output_dir / "faillissementen_voorlopers.json"
+
+# Starters, young-firm exits, net formation and exit rates per geography and sector;
+# a pipeline output, no chart loads it yet
+NET_FORMATION_FILE = base_output_dir / "starters_stoppers_netto.json"
+
+# Month / quarter / year totals and rolling sums for the dashboard zoom levels
+PYRAMID_FILE = base_output_dir / "faillissementen_piramide.json"
+
+# Yearly bankruptcies per municipality, joined into the TopoJSON maps; no page loads either yet
+MUNICIPALITY_FILE = base_output_dir / "faillissementen_per_gemeente.json"
+
+# Static first-paint SVGs of the charts, per geography (data/svg/<geography>/<chart>.svg)
+SVG_DIR = DATA_DIR / "svg"
 
-def parse_number(value):
-    """Parse number from string, handling empty values"""
+# TopoJSON maps of the boundary files in data/kaarten/<name>.geojson, written next to them
+# (pipeline output; the legacy map code still fetches the GeoJSON)
+MAP_DIR = BOUNDARY_DIR
+
+# Columnar tidy table per cube for analysts; not committed, uploaded as a workflow artifact
+EXPORT_DIR = DATA_DIR / "export"
+
+# Cubes of the last build, loaded instead of rescanned while their raw file and
+# code are unchanged (kept with the Actions cache, not committed)
+KEPT_CUBE_DIR = DATA_DIR / ".cache" / "build"
+
+# Fingerprints of the last build, used to rebuild only stale outputs; kept with
+# the cubes it describes, outside the published data-grafieken folder
+BUILD_STATE_FILE = KEPT_CUBE_DIR / "build_state.json"
+
+# Reject counters and parse failures of the last run; kept out of git
+RUN_REPORT_FILE = DATA_DIR / "run_report.json"
+
+# Outputs of --sample previews (same layout as data/), kept out of git
+PREVIEW_DIR = DATA_DIR / "preview"
+
+# Estimates with 95% bounds per output cell of a --sample preview
+SAMPLE_ERRORS_FILE = PREVIEW_DIR / "sample_errors.json"
+
+
+def parse_number(value, column=None, stats=None):
+    """Parse number from string, handling empty values
+    
+    With stats, missing markers and unreadable values are counted per column.
+    """
     if not value or value == "" or value == "?" or value == "??.??":
+        if stats is not None:
+            stats.missing[column] += 1
         return 0
     try:
         cleaned = str(value).strip().replace(".", "").replace(",", ".")
         return float(cleaned)
-    except:
+    except ValueError:
+        if stats is not None:
+            stats.parse_failure(column, value)
         return 0
 
 
+def use_output_dir(root):
+    """Write every output below root instead of data/; the raw files are still read from data/"""
+    global base_output_dir, PREFIX_INDEX_FILE, ANOMALIES_FILE, SEASONAL_FILE, LEAD_LAG_FILE, NET_FORMATION_FILE
+    global PYRAMID_FILE, MUNICIPALITY_FILE, SVG_DIR, MAP_DIR, EXPORT_DIR, BUILD_STATE_FILE, RUN_REPORT_FILE
+    base_output_dir = root / base_output_dir.name
+    PREFIX_INDEX_FILE = base_output_dir / PREFIX_INDEX_FILE.name
+    ANOMALIES_FILE = base_output_dir / ANOMALIES_FILE.name
+    SEASONAL_FILE = base_output_dir / SEASONAL_FILE.name
+    LEAD_LAG_FILE = base_output_dir / LEAD_LAG_FILE.name
+    NET_FORMATION_FILE = base_output_dir / NET_FORMATION_FILE.name
+    PYRAMID_FILE = base_output_dir / PYRAMID_FILE.name
+    MUNICIPALITY_FILE = base_output_dir / MUNICIPALITY_FILE.name
+    SVG_DIR = root / SVG_DIR.name
+    MAP_DIR = root / MAP_DIR.name
+    EXPORT_DIR = root / EXPORT_DIR.name
+    BUILD_STATE_FILE = root / ".cache" / KEPT_CUBE_DIR.name / BUILD_STATE_FILE.name
+    RUN_REPORT_FILE = root / RUN_REPORT_FILE.name
+    base_output_dir.mkdir(parents=True, exist_ok=True)
+
+
 def create_province_folders():
     """Create folders for each province"""
     folders = []
@@ -64,220 +174,720 @@ def create_province_folders():
     return folders
 
 
-def process_survival_data_by_province():
-    """Process TF_VAT_SURVIVALS.txt and aggregate by province"""
-    print("Processing survival data by province...")
+def geography_filter():
+    """Pushdown filter on the province column: our provinces, or empty for Brussels"""
+    return (PROVINCE_COLUMN, set(PROVINCES) | {BRUSSELS_REGION, ''}, 'unknown_province')
+
+
+def geography_code(province, region, rejected):
+    """Province code of a row, Brussels region code for Brussels, None otherwise"""
+    province = province.strip()
+    
+    # Handle Brussels (no province code)
+    if not province or province == '':
+        if region.strip() == BRUSSELS_REGION:
+            return BRUSSELS_REGION
+        rejected['no_province_outside_brussels'] += 1
+        return None
+    
+    # Skip if province not in our list
+    if province not in PROVINCES and province != BRUSSELS_REGION:
+        rejected['unknown_province'] += 1
+        return None
+    return province
+
+
+def sector_of(nace_code):
+    """Map a NACE section to the construction/non_construction split of the charts"""
+    return "construction" if nace_code == NACE_CONSTRUCTION else "non_construction"
+
+
+def sample_stratum(values):
+    """Stratum of a (geography, NACE section, year) for --sample"""
+    geo, nace, year = values
+    return geo, sector_of(nace), year
+
+
+def sector_cell(values):
+    """Output cell of (geography, period..., NACE section) values: the section becomes its sector"""
+    return (*values[:-1], sector_of(values[-1]))
+
+
+def build_cube(source, memory_budget=None, sample=None):
+    """Read the raw file of a source adapter into a sparse cube over all of its dimensions
+
+    With a StratifiedSample only its kept rows are aggregated, and the cube is
+    scaled up to estimates of the full totals after the invariant checks.
+    """
+    print(f"Processing {source.name} data (sparse cube{', sampled' if sample else ''})...")
+    
+    data_file = DATA_DIR / source.member
+    cube = SparseCube(source.cube_dims, source.cube_measures)
+    stats = ScanStats(source.name)
+    rejected = stats.rejected
+    accepted = 0
+    
+    # Partial sums per cube cell; spills to disk above the budget
+    aggregator = SpillingAggregator(memory_budget)
+    # First measure per region code over every line the scan passes, and over
+    # the lines rejected after it; the province sums are checked against them
+    region_totals = defaultdict(float)
+    rejected_totals = defaultdict(float)
+    
+    # Only the used columns are decoded; other provinces are dropped before that
+    header = read_header(data_file)
+    dims = source.dims
+    labelled = [(i, dim.name) for i, dim in enumerate(dims) if dim.label]
+    measure_columns = [measure.column for measure in source.measures]
+    columns = ((PROVINCE_COLUMN, REGION_COLUMN) + tuple(dim.column_in(header) for dim in dims)
+               + tuple(dims[i].label for i, _ in labelled) + tuple(measure_columns))
+    
+    # Required dimensions are pushed down into the scan with the geography filter
+    where = [geography_filter()] + [(dim.column_in(header), bool, dim.required) for dim in dims if dim.required]
+    transforms = [(i, dim.transform) for i, dim in enumerate(dims) if dim.transform]
+    nonzero = [(i, measure.nonzero) for i, measure in enumerate(source.measures) if measure.nonzero]
+    labels_at = len(dims)
+    measures_at = labels_at + len(labelled)
+    row_check = source.row_check
+    # Parsed measure values; the raw strings repeat a lot. Missing markers and
+    # unreadable values are not cached, so parse_number counts every one of them
+    parsed = {'0': 0.0}
+    cached = parsed.get
+    
+    start = time.perf_counter()
+    rows = scan(data_file, columns, where, rejected)
+    if sample is not None:
+        # Stratum values by position in the scanned tuple; the geography is the
+        # province code, or the region code for Brussels (as geography_code() maps it)
+        at = [2 + next(i for i, dim in enumerate(dims) if dim.name == name) for name in sample.stratum_dims[1:]]
+        rows = sample.select(rows, lambda row: (row[0].strip() or row[1].strip(), *(row[i].strip() for i in at)))
+    for province, region, *fields in rows:
+        # Counted before the row rules, as the scan yields it; the tallied lines
+        # are those that passed the pushed-down filters, so no line is split wider
+        code = region.strip()
+        first = cached(fields[measures_at])
+        if first is None:
+            first = parse_number(fields[measures_at])
+        region_totals[code] += first
+        geo = geography_code(province, region, rejected)
+        if geo is None:
+            rejected_totals[code] += first
+            continue
+        
+        raw = fields[measures_at:]
+        totals = list(map(cached, raw))
+        if None in totals:
+            for i, (value, column) in enumerate(zip(raw, measure_columns)):
+                if totals[i] is None:
+                    totals[i] = parse_number(value, column, stats)
+                    if totals[i]:
+                        parsed[value] = totals[i]
+        for i, reason in nonzero:
+            if not totals[i]:
+                rejected[reason] += 1
+                rejected_totals[code] += first
+                break
+        else:
+            keys = list(map(str.strip, fields[:labels_at]))
+            for i, transform in transforms:
+                keys[i] = transform(keys[i])
+            for (i, name), label in zip(labelled, fields[labels_at:measures_at]):
+                cube.set_label(name, keys[i], label.strip())
+            if row_check is not None:
+                row_check(stats, geo, keys, totals)
+            accepted += 1
+            aggregator.add((geo, *keys), totals)
+            if sample is not None:
+                sample.record((geo, *keys), totals)
     
-    data_file = DATA_DIR / 'TF_VAT_SURVIVALS.txt'
+    stats.accepted = accepted
+    stats.seconds = time.perf_counter() - start
     
+    with aggregator:
+        if not aggregator.spills or sample is not None:
+            for coords, totals in aggregator.items():
+                cube.add(coords, totals)
+        else:
+            # The cells did not fit in the budget: the merged runs are only summed
+            # into the marginals the outputs read, so memory stays bounded by those
+            cube.add_streamed(aggregator.items(), source.marginals)
+        report_spills(source.name, aggregator)
+    
+    # Aggregate invariants, on the cube instead of a second read. A sample
+    # drops rows without rejecting them and can miss whole months, so the
+    # region totals and the calendar are only checked on full runs
+    if sample is None:
+        geo_totals = {geo: totals[0] for (geo,), totals in cube.marginal(("geo",)).items()}
+        check_region_totals(stats, source.measures[0].name, region_totals, rejected_totals, geo_totals,
+                            REGION_CODES, REGIONS)
+    if sample is None and len(source.calendar) == 1:
+        check_calendar(stats, [(year, '') for (year,) in cube.marginal(source.calendar)], "cohort", per_year=1)
+    elif sample is None:
+        # Rows without a month are kept for the yearly totals and are no period of their own
+        check_calendar(stats, [period for period in cube.marginal(source.calendar) if all(period)], "month")
+    stats.print_summary()
+    
+    if sample is not None:
+        sample.scale(cube)
+        kept, read = sum(sample.kept.values()), sum(sample.rows.values())
+        print(f"   {source.name} sample: {kept} of {read} rows in {len(sample.rows)} strata, scaled up per stratum")
+    if cube.streamed:
+        print(f"   {source.name} cube: kept marginals over {', '.join('/'.join(dims) for dims in source.marginals)} "
+              f"({len(cube)} cells in the largest)")
+    else:
+        print(f"   {source.name} cube: {len(cube)} non-empty cells")
+    return cube, stats
+
+
+def build_survival_cube(memory_budget=None):
+    """Read TF_VAT_SURVIVALS.txt into a sparse cube over all of its dimensions"""
+    return build_cube(SURVIVALS, memory_budget)
+
+
+def survival_by_province(cube):
+    """Province x cohort year x sector marginal of the survival cube"""
     # Structure: {province: {year: {construction/non_construction: [registrations, surv_1, surv_3]}}}
     province_data = defaultdict(lambda: defaultdict(lambda: {
         "construction": [0, 0, 0],
         "non_construction": [0, 0, 0]
     }))
     
-    with open(data_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f, delimiter='|')
-        
-        for row in reader:
-            year = row.get('CD_YEAR', row.get('\ufeffCD_YEAR', '')).strip()
-            province = row.get('CD_PROV_REFNIS', '').strip()
-            nace_lvl1 = row.get('CD_NACE_LVL1', '').strip()
-            
-            if not year or not nace_lvl1:
-                continue
-            
-            # Handle Brussels (no province code)
-            if not province or province == '':
-                region = row.get('CD_RGN_REFNIS', '').strip()
-                if region == BRUSSELS_REGION:
-                    province = BRUSSELS_REGION
-                else:
-                    continue
-            
-            # Skip if province not in our list
-            if province not in PROVINCES and province != BRUSSELS_REGION:
-                continue
-            
-            # Check if construction sector
-            is_construction = (nace_lvl1 == NACE_CONSTRUCTION)
-            
-            # Parse metrics
-            first_reg = parse_number(row.get('MS_CNT_FIRST_REGISTRATIONS', '0'))
-            surv_1 = parse_number(row.get('MS_CNT_SURV_YEAR_1', '0'))
-            surv_3 = parse_number(row.get('MS_CNT_SURV_YEAR_3', '0'))
-            
-            if first_reg == 0:
-                continue
-            
-            # Aggregate
-            sector_key = "construction" if is_construction else "non_construction"
-            province_data[province][year][sector_key][0] += first_reg
-            province_data[province][year][sector_key][1] += surv_1
-            province_data[province][year][sector_key][2] += surv_3
+    for (province, year, nace), totals in sorted(cube.marginal(("geo", "year", "nace")).items()):
+        first_reg, surv_1, _, surv_3 = totals[:4]
+        sector = province_data[province][year][sector_of(nace)]
+        sector[0] += first_reg
+        sector[1] += surv_1
+        sector[2] += surv_3
     
     return province_data
 
 
-def process_bankruptcy_trend_by_province():
-    """Process bankruptcy trend data by province from TF_BANKRUPTCIES.txt"""
-    print("Processing bankruptcies by province (yearly aggregation)...")
-    
-    data_file = DATA_DIR / 'TF_BANKRUPTCIES.txt'
-    
+def build_bankruptcy_cube(memory_budget=None):
+    """Read TF_BANKRUPTCIES.txt into a sparse cube over all of its dimensions"""
+    return build_cube(BANKRUPTCIES, memory_budget)
+
+
+def bankruptcy_by_province(cube):
+    """Province x month x sector marginal of the bankruptcy cube"""
     # Structure: {province: {year_month: {construction/non_construction: count}}}
     province_data = defaultdict(lambda: defaultdict(lambda: {
         "construction": 0,
         "non_construction": 0
     }))
     
-    with open(data_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f, delimiter='|')
-        
-        for row in reader:
-            year = row.get('CD_YEAR', '').strip()
-            month = row.get('CD_MONTH', '').strip()
-            province = row.get('CD_PROV_REFNIS', '').strip()
-            nace_section = row.get('TX_NACE_REV2_SECTION', '').strip()
-            bankruptcies = parse_number(row.get('MS_COUNTOF_BANKRUPTCIES', '0'))
-            
-            if not year or not month or bankruptcies == 0:
-                continue
-            
-            # Handle Brussels
-            if not province or province == '':
-                region = row.get('CD_RGN_REFNIS', '').strip()
-                if region == BRUSSELS_REGION:
-                    province = BRUSSELS_REGION
-                else:
-                    continue
-            
-            if province not in PROVINCES and province != BRUSSELS_REGION:
-                continue
-            
-            # Check if construction
-            is_construction = (nace_section == NACE_CONSTRUCTION)
-            
-            year_month = f"{year}-{month.zfill(2)}"
-            sector_key = "construction" if is_construction else "non_construction"
-            province_data[province][year_month][sector_key] += bankruptcies
+    for (province, year, month, nace), totals in sorted(cube.marginal(("geo", "year", "month", "nace")).items()):
+        if month:
+            province_data[province][f"{year}-{month}"][sector_of(nace)] += totals[0]
     
     return province_data
 
 
-def calculate_12month_rolling(monthly_data):
-    """Calculate 12-month rolling sum"""
-    sorted_dates = sorted(monthly_data.keys())
+def bankruptcy_without_month(cube):
+    """Geography x year x sector bankruptcies of the rows without a month, including region groups
+
+    They are left out of the monthly series and the prefix-sum index, but
+    count in the yearly totals and the year level of the time pyramid.
+    """
+    # Structure: {geography: {year: {construction/non_construction: count}}}
+    undated = defaultdict(lambda: defaultdict(lambda: {
+        "construction": 0,
+        "non_construction": 0
+    }))
+    groups = dict(REGIONS, **{"België": [code for members in REGIONS.values() for code in members]})
+    for (geo, year, month, nace), totals in cube.marginal(("geo", "year", "month", "nace")).items():
+        if month:
+            continue
+        sector = sector_of(nace)
+        for name in [geo] + [name for name, members in groups.items() if geo in members]:
+            undated[name][int(year)][sector] += totals[0]
+    return undated
+
+
+def bankruptcy_by_municipality(cube):
+    """Municipality x year x sector marginal of the bankruptcy cube"""
+    # Structure: {municipality: {year: {construction/non_construction: count}}}
+    municipality_data = defaultdict(lambda: defaultdict(lambda: {
+        "construction": 0,
+        "non_construction": 0
+    }))
+    
+    for (municipality, year, nace), totals in sorted(cube.marginal(("municipality", "year", "nace")).items()):
+        if municipality:
+            municipality_data[municipality][year][sector_of(nace)] += totals[0]
+    
+    return municipality_data
+
+
+def write_municipality_bankruptcies(path, municipality_data):
+    """Write yearly bankruptcies per municipality as year-aligned arrays"""
+    years = sorted({year for series in municipality_data.values() for year in series})
+    payload = {
+        "years": [int(year) for year in years],
+        "gemeenten": {
+            municipality: {
+                sector: [compact_number(series[year][sector]) if year in series else 0 for year in years]
+                for sector in ("construction", "non_construction")
+            }
+            for municipality, series in sorted(municipality_data.items())
+        }
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, separators=(',', ':'))
+
+
+def report_spills(name, aggregator):
+    """Print how often an aggregation spilled to disk"""
+    if aggregator.spills:
+        print(f"   {name} aggregation spilled {aggregator.spills} sorted runs to disk "
+              f"(budget {aggregator.memory_budget / (1024 * 1024):.1f} MB)")
+
+
+def build_bankruptcy_index(bankruptcy_monthly):
+    """Build the prefix-sum index over the monthly bankruptcies, including region groups"""
+    index = PrefixSumIndex.from_monthly(bankruptcy_monthly)
+    for region_name, members in REGIONS.items():
+        index.add_group(region_name, members)
+    index.add_group("België", [code for members in REGIONS.values() for code in members])
+    return index
+
+
+def build_aligned_series(survival_cube, bankruptcy_cube):
+    """Both cubes on shared (geography, sector, year) indices, including region groups"""
+    aligned = align(survival_cube, bankruptcy_cube, sector_of)
+    for region_name, members in REGIONS.items():
+        aligned.add_group(region_name, members)
+    aligned.add_group("België", [code for members in REGIONS.values() for code in members])
+    return aligned
+
+
+def geography_names():
+    """Display names of all geographies in the bankruptcy index, keyed by index key"""
+    names = dict(PROVINCES)
+    names[BRUSSELS_REGION] = "Brussels"
+    names.update({name: name for name in REGIONS})
+    names["België"] = "België"
+    return names
+
+
+def calculate_12month_rolling(index, geo):
+    """Calculate 12-month rolling sum from the prefix-sum index"""
     rolling_data = {}
     
-    for i, date in enumerate(sorted_dates):
-        if i < 11:  # Need at least 12 months
+    for date in index.months:
+        construction_sum = index.window(geo, "construction", date)
+        if construction_sum is None:  # Need at least 12 months
             continue
         
-        # Sum last 12 months
-        last_12 = sorted_dates[i-11:i+1]
-        construction_sum = sum(monthly_data[d]["construction"] for d in last_12)
-        non_construction_sum = sum(monthly_data[d]["non_construction"] for d in last_12)
-        
         rolling_data[date] = {
             "construction": construction_sum,
-            "non_construction": non_construction_sum
+            "non_construction": index.window(geo, "non_construction", date)
         }
     
     return rolling_data
 
 
-def process_bankruptcy_yearly_by_province():
-    """Process yearly bankruptcy data by province"""
-    print("Processing yearly bankruptcy data by province...")
+def bankruptcy_yearly_from_index(index, geo, undated=None):
+    """Yearly bankruptcy totals for one geography from the prefix-sum index
+
+    undated: {year: {sector: count}} of the geography's rows without a month.
+    """
+    undated = undated or {}
+    yearly_data = {}
     
-    data_file = DATA_DIR / 'TF_BANKRUPTCIES.txt'
+    for year in sorted(set(index.years()) | set(undated)):
+        extra = undated.get(year, {})
+        construction = index.yearly(geo, "construction", year) + extra.get("construction", 0)
+        non_construction = index.yearly(geo, "non_construction", year) + extra.get("non_construction", 0)
+        if construction or non_construction:
+            yearly_data[str(year)] = {
+                "construction": construction,
+                "non_construction": non_construction
+            }
     
-    # Structure: {province: {year: {construction/non_construction: count}}}
-    province_data = defaultdict(lambda: defaultdict(lambda: {
-        "construction": 0,
-        "non_construction": 0
-    }))
+    return yearly_data
+
+
+# Per-province chart files: (file name, aggregates used, writer)
+PROVINCE_CHARTS = [
+    ('Overlevingskans na 1 jaar.csv', ('survival_data', 'intervals'),
+     lambda v, code, name, folder: create_survival_1year_csv(
+         folder, v['survival_data'].get(code, {}), v['intervals'].get(code, {}), name)),
+    ('Overlevingskans na 3 jaar.csv', ('survival_data', 'intervals'),
+     lambda v, code, name, folder: create_survival_3year_csv(
+         folder, v['survival_data'].get(code, {}), v['intervals'].get(code, {}), name)),
+    ('Nieuwe starters bouwsector.csv', ('survival_data',),
+     lambda v, code, name, folder: create_starters_csv(folder, v['survival_data'].get(code, {}), name)),
+    ('Faillissementen bouwsector.csv', ('bankruptcy_yearly',),
+     lambda v, code, name, folder: create_bankruptcies_yearly_csv(folder, v['bankruptcy_yearly'][code], name)),
+    ('12-maandelijkse trend faillissementen (index 2008 = 100).csv', ('bankruptcy_index',),
+     lambda v, code, name, folder: create_bankruptcy_trend_index_csv(folder, v['bankruptcy_index'], code, name)),
+    ('12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv', ('bankruptcy_index', 'adjusted'),
+     lambda v, code, name, folder: create_bankruptcy_trend_absolute_csv(
+         folder, v['bankruptcy_index'], code, name, v['adjusted'][code]['construction'])),
+    ('Nieuwe starters (index 2008 = 100).csv', ('survival_data',),
+     lambda v, code, name, folder: create_starters_index_csv(folder, v['survival_data'].get(code, {}), name)),
+    ('Jaarlijkse cijfers bouwsector (sinds 2016).csv', ('aligned',),
+     lambda v, code, name, folder: create_yearly_summary_csv(folder, v['aligned'], code, name)),
+]
+
+
+def _written(*paths):
+    """The paths that exist after a writer ran (writers skip empty tables)"""
+    return [path for path in paths if path.exists()]
+
+
+def _chart_writer(writer, prov_code, prov_name, folder, path):
+    """Build step for one per-province chart file"""
+    def run(values):
+        writer(values, prov_code, prov_name, folder)
+        return _written(path)
+    return run
+
+
+def _svg_writer(view, spec):
+    """Build step for the prerendered SVG of one chart and geography"""
+    def run(values):
+        return write_chart_svg(SVG_DIR / view / f"{spec.chart_id}.svg", base_output_dir, view, spec)
+    return run
+
+
+def _map_writer(boundaries):
+    """Build step for the TopoJSON map of one boundary file"""
+    def run(values):
+        MAP_DIR.mkdir(parents=True, exist_ok=True)
+        path = MAP_DIR / f"{boundaries.stem}.topojson"
+        write_topology(boundaries, path, graph_dir=base_output_dir)
+        return _written(path)
+    return run
+
+
+def _write_municipalities(values):
+    municipalities = bankruptcy_by_municipality(values['bankruptcy_cube'][0])
+    write_municipality_bankruptcies(MUNICIPALITY_FILE, municipalities)
+    print(f"Saved municipality bankruptcies: {MUNICIPALITY_FILE.name} ({len(municipalities)} municipalities)")
+    return _written(MUNICIPALITY_FILE)
+
+
+def _write_prefix_index(values):
+    index = values['bankruptcy_index']
+    index.save(PREFIX_INDEX_FILE)
+    print(f"Saved prefix-sum index: {PREFIX_INDEX_FILE.name} ({len(index.months)} months)")
+    return _written(PREFIX_INDEX_FILE)
+
+
+def _write_anomalies(values):
+    # Anomaly scan over every geography x sector series of the monthly cube
+    flagged = write_anomalies(ANOMALIES_FILE, values['bankruptcy_index'], geography_names())
+    print(f"Saved anomaly scan: {ANOMALIES_FILE.name} ({flagged} flagged months)")
+    return _written(ANOMALIES_FILE)
+
+
+def _write_pyramid(values):
+    periods = write_pyramid(PYRAMID_FILE, values['bankruptcy_index'], geography_names(), values['bankruptcy_undated'])
+    print(f"Saved time pyramid: {PYRAMID_FILE.name} "
+          f"({', '.join(f'{count} {level}s' for level, count in periods.items())})")
+    return _written(PYRAMID_FILE)
+
+
+def _write_seasonal_adjustment(values):
+    count = write_seasonal_adjustment(SEASONAL_FILE, values['bankruptcy_index'], *values['seasonal'],
+                                      geography_names())
+    print(f"Saved seasonal adjustment: {SEASONAL_FILE.name} ({count} series)")
+    return _written(SEASONAL_FILE)
+
+
+def _write_lead_lag(values):
+    series, lags = write_lead_lag(LEAD_LAG_FILE, values['bankruptcy_index'], *values['seasonal'][:2],
+                                  geography_names())
+    print(f"Saved lead/lag correlations: {LEAD_LAG_FILE.name} ({series} series, {lags} lags)")
+    return _written(LEAD_LAG_FILE)
+
+
+def _write_net_formation(values):
+    count = write_net_formation(NET_FORMATION_FILE, values['aligned'], geography_names())
+    print(f"Saved net formation: {NET_FORMATION_FILE.name} ({count} geographies)")
+    return _written(NET_FORMATION_FILE)
+
+
+def _write_cohort_analyses(values):
+    # Attrition, size, tidy and economic-cycle tables (formerly pandas scripts)
+    print("\n=== Cohort analyses ===")
+    write_cohort_analyses(base_output_dir, values['survival_cube'][0], values['bankruptcy_index'],
+                          REGIONS, NACE_CONSTRUCTION, values['bankruptcy_undated'])
+    return _written(*(base_output_dir / name for name in (ATTRITION_FILE, SIZE_FILE, TIDY_FILE, CYCLE_FILE)))
+
+
+def _tidy_export_writer(source):
+    """Build step for the tidy table of one source adapter"""
+    def run(values):
+        name = f"{TIDY_NAME}_{source.name}"
+        fmt, rows, written = write_tidy_export(EXPORT_DIR, [(source, values[f'{source.name}_cube'][0])],
+                                               sector_of, geography_names(), name)
+        print(f"Saved tidy export: {EXPORT_DIR.name}/{name} ({rows} rows, {fmt})")
+        return _written(*written)
+    return run
+
+
+def _release_diff_writer(source):
+    """Build step that diffs one cube against that of the previous run, then keeps it for the next one"""
+    def run(values):
+        start = time.thread_time()
+        cube = values[f'{source.name}_cube'][0]
+        # A cube whose aggregation spilled is compared at the level of its first kept marginal
+        entry, saved = diff_source(source, cube.project(source.marginals[0]) if cube.streamed else cube)
+        print(f"Compared {source.name} cube with the previous run ({entry.get('revised_cells', 0)} revised cells, "
+              f"{time.thread_time() - start:.2f}s CPU)")
+        return _written(*saved)
+    return run
+
+
+def _write_release_diff(values):
+    # Sources whose diff step did not run this time have an unchanged cube
+    rebuilt = {source.name for source in SOURCES if values[f'release_diff/{source.name}'] is not None}
+    write_report(SOURCES, rebuilt)
+    print(f"Saved release diff: {RELEASE_DIFF_FILE.name} ({', '.join(sorted(rebuilt)) or 'no'} sources compared)")
+    # The report is git-ignored and rewritten whenever a cube is compared; nothing to track
+    return []
+
+
+def _sample_errors_writer(samples, path):
+    """Build step for the error bounds of a --sample preview"""
+    def run(values):
+        groups = dict(REGIONS, **{"België": [code for members in REGIONS.values() for code in members]})
+        report = {}
+        for source in SOURCES:
+            cube, sample = values[f'{source.name}_cube'][0], samples[source.name]
+            # One table per output level: yearly cells, and monthly ones for monthly sources
+            levels = {}
+            for n in range(1, len(source.calendar) + 1):
+                period = source.calendar[:n]
+                cells = add_groups(sample.cell_errors(cube, ("geo",) + period + (source.sector,), sector_cell),
+                                   groups)
+                levels["-".join(period)] = error_table(cells, ("geo",) + period + ("sector",), cube.measures,
+                                                       geography_names())
+                margin = median_margin(cells)
+                print(f"   {source.name} per {'-'.join(period)}: {len(cells)} cells, median 95% margin of "
+                      f"{cube.measures[0]} {'n/a' if margin is None else f'±{margin:.1%}'}")
+            report[source.name] = {
+                "rows": sum(sample.rows.values()),
+                "kept": sum(sample.kept.values()),
+                "strata": len(sample.rows),
+                "levels": levels,
+            }
+        any_sample = next(iter(samples.values()))
+        write_sample_errors(path, {"fraction": any_sample.fraction, "seed": any_sample.seed,
+                                   "strata": ["geo", "sector", "year"]}, report)
+        print(f"Saved sample error bounds: {path.name}")
+        return _written(path)
+    return run
+
+
+def _write_manifest(values):
+    # Content-hashed copies + manifest.json, the dataset list of the dashboard
+    hashed, removed = write_manifest(base_output_dir)
+    print(f"Saved manifest.json: {hashed} hashed files ({removed} stale copies removed)")
+    return _written(base_output_dir / MANIFEST_NAME)
+
+
+def _save_cube(scan_result, path):
+    """Keep a scanned cube for the next build; a cube that kept only marginals is not kept"""
+    cube, _ = scan_result
+    if cube.streamed:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".tmp")
+    cube.save(temporary)
+    temporary.replace(path)
+    return True
+
+
+def _load_cube(path):
+    """A kept cube; it was not scanned in this run, so it has no scan stats"""
+    print(f"Loaded {path.stem} from the previous build (raw file and code unchanged)")
+    return SparseCube.load(path), None
+
+
+def checked(scan_result):
+    """Stop the build before any output is written from a scan that broke an invariant"""
+    cube, stats = scan_result
+    if stats.violations:
+        raise InvariantError(stats)
+    return cube, stats
+
+
+def step_code(*modules):
+    """Code of a build step: this script plus the named modules and the local modules they import"""
+    return [SCRIPT_DIR / Path(__file__).name, *local_imports(SCRIPT_DIR / f"{module}.py" for module in modules)]
+
+
+def define_build_graph(folders, memory_budget=None, sample=None):
+    """Declare sources, aggregates and outputs with their dependencies and code
+
+    Each step declares the modules it calls, so editing one analysis module
+    only rebuilds the outputs that use it; the steps downstream of a changed
+    step follow through their dependencies.
+    sample: (fraction, seed) for a stratified-sample preview.
+    """
+    salt = ""
+    samples = {}
+    if sample is not None:
+        salt = "sample={}:{}".format(*sample)
+        samples = {source.name: StratifiedSample(*sample, ("geo", source.sector, source.calendar[0]), sample_stratum)
+                   for source in SOURCES}
+    graph = BuildGraph(BUILD_STATE_FILE, base_output_dir, salt=salt)
     
-    with open(data_file, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f, delimiter='|')
-        
-        for row in reader:
-            year = row.get('CD_YEAR', '').strip()
-            province = row.get('CD_PROV_REFNIS', '').strip()
-            nace_section = row.get('TX_NACE_REV2_SECTION', '').strip()
-            bankruptcies = parse_number(row.get('MS_COUNTOF_BANKRUPTCIES', '0'))
-            
-            if not year or bankruptcies == 0:
-                continue
-            
-            # Handle Brussels
-            if not province or province == '':
-                region = row.get('CD_RGN_REFNIS', '').strip()
-                if region == BRUSSELS_REGION:
-                    province = BRUSSELS_REGION
-                else:
-                    continue
-            
-            if province not in PROVINCES and province != BRUSSELS_REGION:
-                continue
-            
-            is_construction = (nace_section == NACE_CONSTRUCTION)
-            sector_key = "construction" if is_construction else "non_construction"
-            province_data[province][year][sector_key] += bankruptcies
+    # One cube per source adapter ('survival_cube', 'bankruptcy_cube', ...)
+    scan_code = step_code("pushdown_scan", "source_adapters", "external_aggregation", "sparse_cube", "invariants",
+                          "scan_stats", "stratified_sample")
+    for source in SOURCES:
+        graph.source(source.member, DATA_DIR / source.member)
+        # A preview's cube is scaled up from a sample and is not kept
+        keep = None if samples else (KEPT_CUBE_DIR / f"{source.name}.cube", _save_cube, _load_cube)
+        graph.aggregate(f'{source.name}_cube', [source.member],
+                        lambda v, source=source: checked(build_cube(source, memory_budget,
+                                                                    samples.get(source.name))),
+                        scan_code, keep)
     
-    return province_data
+    # Aggregates: the province/sector marginals and what is derived from them
+    graph.aggregate('survival_data', ['survival_cube'],
+                    lambda v: survival_by_province(v['survival_cube'][0]), step_code("sparse_cube"))
+    # 95% intervals for every province x cohort survival rate, in one batch
+    graph.aggregate('intervals', ['survival_data'],
+                    lambda v: survival_intervals(v['survival_data']), step_code("survival_intervals"))
+    # Rolling windows, yearly totals and 2008 base values are all answered from the cumulative sums
+    graph.aggregate('bankruptcy_index', ['bankruptcy_cube'],
+                    lambda v: build_bankruptcy_index(bankruptcy_by_province(v['bankruptcy_cube'][0])),
+                    step_code("sparse_cube", "prefix_index"))
+    # Seasonal adjustment of every geography x sector series in one batch
+    seasonal_code = step_code("seasonal_adjustment")
+    graph.aggregate('seasonal', ['bankruptcy_index'],
+                    lambda v: seasonally_adjust(v['bankruptcy_index'], list(geography_names())), seasonal_code)
+    graph.aggregate('adjusted', ['seasonal'], lambda v: by_geography(*v['seasonal'][:2]), seasonal_code)
+    # Rows without a month only count in the yearly totals and the pyramid's year level
+    graph.aggregate('bankruptcy_undated', ['bankruptcy_cube'],
+                    lambda v: bankruptcy_without_month(v['bankruptcy_cube'][0]), step_code("sparse_cube"))
+    graph.aggregate('bankruptcy_yearly', ['bankruptcy_index', 'bankruptcy_undated'],
+                    lambda v: {code: bankruptcy_yearly_from_index(v['bankruptcy_index'], code,
+                                                                  v['bankruptcy_undated'].get(code))
+                               for code, _, _ in folders},
+                    step_code("prefix_index"))
+    # Starters and bankruptcies joined on (geography, sector, year)
+    graph.aggregate('aligned', ['survival_cube', 'bankruptcy_cube'],
+                    lambda v: build_aligned_series(v['survival_cube'][0], v['bankruptcy_cube'][0]),
+                    step_code("sparse_cube", "net_formation"))
+    
+    outputs = []
+    for name, deps, run, modules in (
+            (MUNICIPALITY_FILE.name, ['bankruptcy_cube'], _write_municipalities, ["sparse_cube"]),
+            (PREFIX_INDEX_FILE.name, ['bankruptcy_index'], _write_prefix_index, ["prefix_index"]),
+            (ANOMALIES_FILE.name, ['bankruptcy_index'], _write_anomalies, ["anomaly_scan"]),
+            (PYRAMID_FILE.name, ['bankruptcy_index', 'bankruptcy_undated'], _write_pyramid, ["time_pyramid"]),
+            (SEASONAL_FILE.name, ['bankruptcy_index', 'seasonal'], _write_seasonal_adjustment,
+             ["seasonal_adjustment"]),
+            (LEAD_LAG_FILE.name, ['bankruptcy_index', 'seasonal'], _write_lead_lag, ["lead_lag"]),
+            (NET_FORMATION_FILE.name, ['aligned'], _write_net_formation, ["net_formation"]),
+            ('cohort_analyses', ['survival_cube', 'bankruptcy_index', 'bankruptcy_undated'], _write_cohort_analyses,
+             ["cohort_analyses", "sparse_cube", "prefix_index"])):
+        graph.output(name, deps, run, step_code(*modules))
+        outputs.append(name)
+    
+    chart_code = step_code("prefix_index")
+    for prov_code, prov_name, folder in folders:
+        for file_name, deps, writer in PROVINCE_CHARTS:
+            name = f"{prov_name}/{file_name}"
+            graph.output(name, deps, _chart_writer(writer, prov_code, prov_name, folder, folder / file_name),
+                         chart_code)
+            outputs.append(name)
+    
+    # Prerendered SVGs, re-rendered only when their chart file is rebuilt (or, for the
+    # page's default view, when the committed root-level file changes)
+    svg_code = step_code("prerender_svg")
+    for spec in SVG_CHARTS:
+        for _, prov_name, _ in folders:
+            graph.output(f"svg/{prov_name}/{spec.chart_id}", [f"{prov_name}/{spec.dataset}"],
+                         _svg_writer(prov_name, spec), svg_code)
+        source = default_view_sources(spec.dataset)
+        if source is not None:
+            if source not in graph.nodes:
+                graph.source(source, base_output_dir / source)
+            graph.output(f"svg/{DEFAULT_VIEW}/{spec.chart_id}", [source], _svg_writer(DEFAULT_VIEW, spec), svg_code)
+    
+    # Maps of the local boundary files, with the yearly summaries and bankruptcies joined in
+    map_code = step_code("build_topojson")
+    map_metrics = [f"{prov_name}/Jaarlijkse cijfers bouwsector (sinds 2016).csv" for _, prov_name, _ in folders]
+    map_metrics += [PREFIX_INDEX_FILE.name, MUNICIPALITY_FILE.name]
+    for boundaries in sorted(BOUNDARY_DIR.glob("*.geojson")):
+        source = f"{BOUNDARY_DIR.name}/{boundaries.name}"
+        graph.source(source, boundaries)
+        graph.output(f"{BOUNDARY_DIR.name}/{boundaries.stem}.topojson", [source, *map_metrics],
+                     _map_writer(boundaries), map_code)
+    
+    graph.output(MANIFEST_NAME, outputs, _write_manifest, step_code("manifest"))
+    # Per source, so a change to one raw file leaves the other cube unscanned.
+    # Outside data-grafieken, so not listed in the manifest
+    tidy_code = step_code("tidy_export", "sparse_cube", "source_adapters")
+    for source in SOURCES:
+        graph.output(f'tidy_export/{source.name}', [f'{source.name}_cube'], _tidy_export_writer(source), tidy_code)
+    cubes = [f'{source.name}_cube' for source in SOURCES]
+    if samples:
+        # A preview is compared with nothing: the kept cubes are those of full runs
+        graph.output(SAMPLE_ERRORS_FILE.name, cubes, _sample_errors_writer(samples, SAMPLE_ERRORS_FILE),
+                     step_code("stratified_sample", "sparse_cube"))
+    else:
+        diff_code = step_code("release_diff", "source_adapters")
+        for source in SOURCES:
+            graph.output(f'release_diff/{source.name}', [f'{source.name}_cube'], _release_diff_writer(source),
+                         diff_code)
+        graph.output('release_diff', [f'release_diff/{source.name}' for source in SOURCES], _write_release_diff,
+                     diff_code)
+    return graph
+
 
+def create_csv_files_per_province(memory_budget=None, dry_run=False, jobs=None, force=False, sample=None):
+    """Rebuild the outputs whose sources or code changed
 
-def create_csv_files_per_province():
-    """Create all CSV files for each province"""
+    sample: (fraction, seed) to build a preview from a stratified sample of the rows.
+    """
     
     # Create folders
     folders = create_province_folders()
     print(f"Created folders for {len(folders)} provinces/regions")
     
-    # Load survival data
-    survival_data = process_survival_data_by_province()
+    graph = define_build_graph(folders, memory_budget, sample)
+    plan = graph.plan(force=force)
+    outputs = sum(1 for name in plan if graph.nodes[name].kind == OUTPUT)
+    total = sum(1 for node in graph.nodes.values() if node.kind == OUTPUT)
     
-    # Load bankruptcy data
-    bankruptcy_monthly = process_bankruptcy_trend_by_province()
-    bankruptcy_yearly = process_bankruptcy_yearly_by_province()
+    if dry_run or not plan:
+        print(f"\n{outputs} of {total} outputs would be rebuilt" if dry_run else "\nEverything is up to date")
+        for name, reason in plan.items():
+            print(f"   {graph.nodes[name].kind:<9} {name}: {reason}")
+        return
     
-    # Process each province
-    for prov_code, prov_name, folder in folders:
-        print(f"\n=== Processing {prov_name} ===")
-        
-        # Get data for this province
-        prov_survival = survival_data.get(prov_code, {})
-        prov_bankruptcy_monthly = bankruptcy_monthly.get(prov_code, {})
-        prov_bankruptcy_yearly = bankruptcy_yearly.get(prov_code, {})
-        
-        # 1. Overlevingskans na 1 jaar
-        create_survival_1year_csv(folder, prov_survival, prov_name)
-        
-        # 2. Overlevingskans na 3 jaar
-        create_survival_3year_csv(folder, prov_survival, prov_name)
-        
-        # 3. Nieuwe starters bouwsector
-        create_starters_csv(folder, prov_survival, prov_name)
-        
-        # 4. Faillissementen bouwsector (yearly)
-        create_bankruptcies_yearly_csv(folder, prov_bankruptcy_yearly, prov_name)
-        
-        # 5. 12-maandelijkse trend faillissementen (index 2008 = 100)
-        create_bankruptcy_trend_index_csv(folder, prov_bankruptcy_monthly, prov_name)
-        
-        # 6. 12-maandelijkse trend faillissementen bouwsector (absolute)
-        create_bankruptcy_trend_absolute_csv(folder, prov_bankruptcy_monthly, prov_name)
-        
-        # 7. Nieuwe starters (index 2008 = 100)
-        create_starters_index_csv(folder, prov_survival, prov_name)
-        
-        # 8. Jaarlijkse cijfers bouwsector (sinds 2016)
-        create_yearly_summary_csv(folder, prov_survival, prov_bankruptcy_yearly, prov_name)
+    print(f"Rebuilding {outputs} of {total} outputs")
+    start = time.perf_counter()
+    try:
+        values = graph.run(plan, jobs)
+    except InvariantError as error:
+        write_run_report(RUN_REPORT_FILE, [error.stats])
+        print(f"\n✗ {error}")
+        print(f"Saved run report: {RUN_REPORT_FILE}")
+        raise SystemExit(1)
+    
+    # Reject counters and parse failures of the scans that ran (not committed)
+    scans = {name: values[name] for name in (f'{source.name}_cube' for source in SOURCES)
+             if name in values and values[name][1] is not None}
+    write_run_report(RUN_REPORT_FILE, [stats for _, stats in scans.values()],
+                     cubes={name.split('_')[0]: len(cube) for name, (cube, _) in scans.items()},
+                     build_seconds=round(time.perf_counter() - start, 3))
+    print(f"Saved run report: {RUN_REPORT_FILE}")
+
 
+# Survival CSVs carry the rate plus its 95% Wilson interval
+SURVIVAL_FIELDNAMES = ['Provincie', 'Jaar', 'Bouwsector (%)', 'Ondergrens 95% (%)', 'Bovengrens 95% (%)']
 
-def create_survival_1year_csv(folder, survival_data, prov_name):
+
+def create_survival_1year_csv(folder, survival_data, intervals, prov_name):
     """Chart 1: Overlevingskans na 1 jaar"""
     rows = []
     
@@ -290,10 +900,13 @@ def create_survival_1year_csv(folder, survival_data, prov_name):
         
         if construction[0] > 0:  # Has registrations
             survival_rate = (construction[1] / construction[0]) * 100
+            lower, upper = intervals[year]["1"]
             rows.append({
                 'Provincie': prov_name,
                 'Jaar': display_year,
                 'Bouwsector (%)': round(survival_rate, 2),
+                'Ondergrens 95% (%)': lower,
+                'Bovengrens 95% (%)': upper,
             })
         
         if non_construction[0] > 0:
@@ -302,13 +915,13 @@ def create_survival_1year_csv(folder, survival_data, prov_name):
     
     if rows:
         with open(folder / 'Overlevingskans na 1 jaar.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['Provincie', 'Jaar', 'Bouwsector (%)'])
+            writer = csv.DictWriter(f, fieldnames=SURVIVAL_FIELDNAMES)
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: Overlevingskans na 1 jaar.csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/Overlevingskans na 1 jaar.csv ({len(rows)} records)")
 
 
-def create_survival_3year_csv(folder, survival_data, prov_name):
+def create_survival_3year_csv(folder, survival_data, intervals, prov_name):
     """Chart 2: Overlevingskans na 3 jaar"""
     rows = []
     
@@ -325,18 +938,21 @@ def create_survival_3year_csv(folder, survival_data, prov_name):
         
         if construction[0] > 0 and construction[2] > 0:
             survival_rate = (construction[2] / construction[0]) * 100
+            lower, upper = intervals[year]["3"]
             rows.append({
                 'Provincie': prov_name,
                 'Jaar': display_year,
                 'Bouwsector (%)': round(survival_rate, 2),
+                'Ondergrens 95% (%)': lower,
+                'Bovengrens 95% (%)': upper,
             })
     
     if rows:
         with open(folder / 'Overlevingskans na 3 jaar.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['Provincie', 'Jaar', 'Bouwsector (%)'])
+            writer = csv.DictWriter(f, fieldnames=SURVIVAL_FIELDNAMES)
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: Overlevingskans na 3 jaar.csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/Overlevingskans na 3 jaar.csv ({len(rows)} records)")
 
 
 def create_starters_csv(folder, survival_data, prov_name):
@@ -357,7 +973,7 @@ def create_starters_csv(folder, survival_data, prov_name):
             writer = csv.DictWriter(f, fieldnames=['Jaar', 'Aantal nieuwe starters'])
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: Nieuwe starters bouwsector.csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/Nieuwe starters bouwsector.csv ({len(rows)} records)")
 
 
 def create_bankruptcies_yearly_csv(folder, bankruptcy_yearly, prov_name):
@@ -378,21 +994,18 @@ def create_bankruptcies_yearly_csv(folder, bankruptcy_yearly, prov_name):
             writer = csv.DictWriter(f, fieldnames=['Jaar', 'Aantal faillissementen'])
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: Faillissementen bouwsector.csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/Faillissementen bouwsector.csv ({len(rows)} records)")
 
 
-def create_bankruptcy_trend_index_csv(folder, bankruptcy_monthly, prov_name):
+def create_bankruptcy_trend_index_csv(folder, bankruptcy_index, prov_code, prov_name):
     """Chart 5: 12-maandelijkse trend (index 2008 = 100)"""
     
     # Calculate 12-month rolling
-    rolling_data = calculate_12month_rolling(bankruptcy_monthly)
+    rolling_data = calculate_12month_rolling(bankruptcy_index, prov_code)
     
-    # Find base values for 2008
-    base_2008 = None
-    for date in sorted(rolling_data.keys()):
-        if date.startswith('2008'):
-            base_2008 = rolling_data[date]
-            break
+    # Base values: first 12-month window ending in 2008
+    base_2008 = next((rolling_data[date] for date in bankruptcy_index.months
+                      if date.startswith('2008') and date in rolling_data), None)
     
     if not base_2008 or base_2008["construction"] == 0:
         print(f"   Skipped: 12-maandelijkse trend (index) - no 2008 base data")
@@ -412,28 +1025,36 @@ def create_bankruptcy_trend_index_csv(folder, bankruptcy_monthly, prov_name):
             writer = csv.DictWriter(f, fieldnames=['Jaar-Maand', 'Bouwsector (index)', 'Niet-bouwsector (index)'])
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: 12-maandelijkse trend (index).csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/12-maandelijkse trend (index).csv ({len(rows)} records)")
+
 
+def create_bankruptcy_trend_absolute_csv(folder, bankruptcy_index, prov_code, prov_name, adjusted=None):
+    """Chart 6: 12-maandelijkse trend bouwsector (absolute)
 
-def create_bankruptcy_trend_absolute_csv(folder, bankruptcy_monthly, prov_name):
-    """Chart 6: 12-maandelijkse trend bouwsector (absolute)"""
+    adjusted: seasonally adjusted monthly construction values on the index's
+    month axis, written next to the rolling sum
+    """
     
-    rolling_data = calculate_12month_rolling(bankruptcy_monthly)
+    rolling_data = calculate_12month_rolling(bankruptcy_index, prov_code)
+    position = {month: i for i, month in enumerate(bankruptcy_index.months)}
     
     rows = []
     for date, sectors in sorted(rolling_data.items()):
         if sectors["construction"] > 0:
-            rows.append({
+            row = {
                 'Jaar-Maand': date,
                 'Aantal faillissementen (12-maands som)': int(sectors["construction"])
-            })
+            }
+            if adjusted is not None:
+                row['Seizoensgecorrigeerd (maandcijfer)'] = round(adjusted[position[date]], 1)
+            rows.append(row)
     
     if rows:
         with open(folder / '12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['Jaar-Maand', 'Aantal faillissementen (12-maands som)'])
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: 12-maandelijkse trend (absolute).csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/12-maandelijkse trend (absolute).csv ({len(rows)} records)")
 
 
 def create_starters_index_csv(folder, survival_data, prov_name):
@@ -466,44 +1087,50 @@ def create_starters_index_csv(folder, survival_data, prov_name):
             writer = csv.DictWriter(f, fieldnames=['Provincie', 'Jaar', 'Bouwsector (index)', 'Niet-bouwsector (index)'])
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: Nieuwe starters (index).csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/Nieuwe starters (index).csv ({len(rows)} records)")
 
 
-def create_yearly_summary_csv(folder, survival_data, bankruptcy_yearly, prov_name):
-    """Chart 8: Jaarlijkse cijfers bouwsector (sinds 2016)"""
+def create_yearly_summary_csv(folder, aligned, prov_code, prov_name):
+    """Chart 8: Jaarlijkse cijfers bouwsector (sinds 2016)
+    
+    Starters, survivors and bankruptcies come from the aligned (geography,
+    sector, year) series, so the two sources are joined on the year index.
+    """
+    if prov_code not in aligned.geos:
+        return
     rows = []
+    columns = zip(
+        aligned.years,
+        aligned.series("starters", prov_code, "construction"),
+        aligned.series("surv_1", prov_code, "construction"),
+        aligned.series("surv_3", prov_code, "construction"),
+        aligned.series("starters", prov_code, "non_construction"),
+        aligned.series("bankruptcies", prov_code, "construction"),
+    )
     
-    for year, sectors in sorted(survival_data.items(), reverse=True):
-        year_int = int(year)
-        
-        if year_int < 2016:
+    for year_int, starters, surv_1, surv_3, other_starters, bankruptcies in reversed(list(columns)):
+        # Only cohort years of the survival file
+        if year_int < 2016 or not (starters or other_starters):
             continue
         
-        construction = sectors["construction"]
-        
         # Calculate 1-year survival rate
-        if construction[0] > 0 and construction[1] > 0:
-            survival_1yr = (construction[1] / construction[0]) * 100
+        if starters > 0 and surv_1 > 0:
+            survival_1yr = (surv_1 / starters) * 100
         else:
             survival_1yr = 0
         
         # Calculate 3-year survival rate (only available up to 2021)
-        if year_int <= 2021 and construction[0] > 0 and construction[2] > 0:
-            survival_3yr = (construction[2] / construction[0]) * 100
+        if year_int <= 2021 and starters > 0 and surv_3 > 0:
+            survival_3yr = (surv_3 / starters) * 100
         else:
             survival_3yr = None
         
-        # Get bankruptcies
-        bankruptcies = 0
-        if str(year_int) in bankruptcy_yearly:
-            bankruptcies = int(bankruptcy_yearly[str(year_int)]["construction"])
-        
         rows.append({
             'Jaar': year_int,
             '1-jarige overlevingskans (%)': round(survival_1yr, 2) if survival_1yr > 0 else '-',
             '3-jarige overlevingskans (%)': round(survival_3yr, 2) if survival_3yr else '-',
-            'Nieuwe starters': int(construction[0]),
-            'Jaarlijkse faillissementen': bankruptcies
+            'Nieuwe starters': int(starters),
+            'Jaarlijkse faillissementen': int(bankruptcies)
         })
     
     if rows:
@@ -517,15 +1144,41 @@ def create_yearly_summary_csv(folder, survival_data, bankruptcy_yearly, prov_nam
             ])
             writer.writeheader()
             writer.writerows(rows)
-        print(f"   Created: Jaarlijkse cijfers bouwsector (sinds 2016).csv ({len(rows)} records)")
+        print(f"   Created: {prov_name}/Jaarlijkse cijfers bouwsector (sinds 2016).csv ({len(rows)} records)")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract chart data per province")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        default=int(os.environ.get("PIPELINE_MEMORY_BUDGET_MB", 0)) or None,
+                        help="Bound aggregation memory; partial aggregates above this spill to temp files "
+                             "(default: $PIPELINE_MEMORY_BUDGET_MB, unbounded when unset)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only print which outputs would be rebuilt and why")
+    parser.add_argument("--force", action="store_true", help="Rebuild all outputs")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Parallel build steps (default: Python's thread pool default)")
+    parser.add_argument("--sample", type=float, metavar="FRACTION", default=None,
+                        help="Preview from a stratified sample of this fraction of the rows, scaled up, "
+                             f"with 95%% error bounds per cell; written to {PREVIEW_DIR.relative_to(DASHBOARD_DIR)}/")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the --sample row selection (default 0)")
+    args = parser.parse_args()
+    if args.sample is not None and not 0 < args.sample <= 1:
+        parser.error("--sample must be a fraction in (0, 1]")
+    
     print("=" * 80)
     print("Extracting chart data per PROVINCE")
     print("=" * 80)
     
-    create_csv_files_per_province()
+    memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    sample = None
+    if args.sample is not None:
+        use_output_dir(PREVIEW_DIR)
+        sample = (args.sample, args.seed)
+        print(f"Sampling {args.sample:.1%} of the rows per (geography, sector, year), seed {args.seed}")
+    create_csv_files_per_province(memory_budget, args.dry_run, args.jobs, args.force, sample)
+    if args.dry_run:
+        raise SystemExit(0)
     
     print("\n" + "=" * 80)
     print("✅ All CSV files created per province!")
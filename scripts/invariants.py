@@ -0,0 +1,81 @@
+"""
+Invariant checks that run alongside aggregation.
+Row-level rules (e.g. survivors never exceed registrations) are tested as the
+rows stream past; aggregate rules (province sums equal the region totals of
+the scanned lines less the rejected ones, the month calendar has no gaps) are
+tested on the in-memory cube right after the scan. Nothing is read twice.
+Violations are counted per rule in the scan's ScanStats and fail the run.
+"""
+
+# Relative tolerance for totals (the measures are summed as floats)
+TOLERANCE = 1e-9
+
+
+class InvariantError(Exception):
+    """Raised when a scan violated one or more invariants"""
+
+    def __init__(self, stats):
+        self.stats = stats
+        lines = [f"{stats.name}: {sum(stats.violations.values())} invariant violations"]
+        for rule, count in sorted(stats.violations.items()):
+            lines.append(f"  - {rule}: {count}x, e.g. {'; '.join(stats.violation_samples.get(rule, []))}")
+        super().__init__("\n".join(lines))
+
+
+def check_survivors(stats, key, registrations, survivors):
+    """Survivor counts are non-negative and never exceed the registrations of their cohort"""
+    for horizon, count in enumerate(survivors, start=1):
+        if count < 0:
+            stats.violation("negative_survivors", f"{key} surv_{horizon}={count:g}")
+        elif count > registrations:
+            stats.violation("survivors_exceed_registrations",
+                            f"{key} surv_{horizon}={count:g} > registrations={registrations:g}")
+
+
+def _differs(actual, expected):
+    return abs(actual - expected) > TOLERANCE * max(1.0, abs(expected))
+
+
+def check_region_totals(stats, measure, region_totals, rejected_totals, geo_totals, region_codes, regions):
+    """Sum over the provinces of each region equals the total of the scanned rows of that region minus its rejected rows
+
+    region_totals: {region code: total} of every line the scan yields, before the row rules
+    rejected_totals: {region code: total} of those lines rejected by a row rule
+    geo_totals: {geo: total} from the cube's geography marginal
+    The scanned totals are kept as the lines come out of the scan, apart from
+    the aggregation: a row lost or double-counted between the scan and the
+    marginal, or a province in the wrong region, shows up as a difference.
+    """
+    for code, region in region_codes.items():
+        expected = region_totals.get(code, 0) - rejected_totals.get(code, 0)
+        actual = sum(geo_totals.get(geo, 0) for geo in regions[region])
+        if _differs(actual, expected):
+            stats.violation("province_sum_differs_from_region",
+                            f"{region} ({code}) {measure}: provinces {actual:g} != region rows {expected:g}")
+    for code in sorted(set(region_totals) - set(region_codes)):
+        accepted = region_totals[code] - rejected_totals.get(code, 0)
+        if _differs(accepted, 0):
+            stats.violation("unknown_region", f"{code} {measure}={accepted:g}")
+
+
+def check_calendar(stats, periods, label, per_year=12):
+    """Periods given as (year, sub-period) strings cover a contiguous calendar
+
+    With per_year=12 these are months ('2024', '03'); with per_year=1 cohort
+    years ('2024', '').
+    """
+    ordinals = set()
+    for year, sub in periods:
+        index = int(sub) - 1 if per_year > 1 and sub.isdigit() else 0
+        if not year.isdigit() or not 0 <= index < per_year:
+            stats.violation("invalid_period", f"{label} {year}-{sub}")
+            continue
+        ordinals.add(int(year) * per_year + index)
+    if not ordinals:
+        return
+
+    missing = [o for o in range(min(ordinals), max(ordinals) + 1) if o not in ordinals]
+    for ordinal in missing:
+        period = (f"{ordinal // per_year}-{str(ordinal % per_year + 1).zfill(2)}"
+                  if per_year > 1 else str(ordinal))
+        stats.violation("calendar_gap", f"{label} {period} missing")
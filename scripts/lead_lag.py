@@ -0,0 +1,88 @@
+"""
+Cross-geography lead/lag correlations of the monthly bankruptcy series.
+For every pair of geography x sector series and every lag of 0..MAX_LAG
+months, the Pearson correlation of series i in month t with series j in month
+t + lag: a high value at a positive lag means i leads j. The seasonally
+adjusted series are used, so the shared calendar pattern does not dominate
+every pair. Per lag all series are standardised over their overlapping
+windows in one batch, and the correlations are the Gram product of those
+columns (one C-level dot product per pair), not a loop over months.
+"""
+import json
+import math
+from operator import mul
+
+MAX_LAG = 12
+
+# Correlations are stored as integers in thousandths
+SCALE = 1000
+
+# Pairs need this many overlapping months for a correlation
+MIN_OVERLAP = 24
+
+
+def _standardised(columns):
+    """Columns scaled to mean 0 and norm 1; None for constant columns"""
+    result = []
+    for column in columns:
+        mean = sum(column) / len(column)
+        centred = [x - mean for x in column]
+        norm = math.sqrt(sum(map(mul, centred, centred)))
+        result.append([x / norm for x in centred] if norm > 0 else None)
+    return result
+
+
+def correlation_tensor(rows, max_lag=MAX_LAG):
+    """tensor[lag][i][j] = corr(series i at t, series j at t + lag), or None
+
+    rows: time-major values (rows[t][j], as returned by monthly_matrix()).
+    """
+    columns = [list(column) for column in zip(*rows)]
+    months = len(rows)
+    tensor = []
+    for lag in range(max_lag + 1):
+        if months - lag < MIN_OVERLAP:
+            break
+        leaders = _standardised([column[:months - lag] for column in columns])
+        followers = leaders if lag == 0 else _standardised([column[lag:] for column in columns])
+        tensor.append([[sum(map(mul, x, y)) if x is not None and y is not None else None
+                        for y in followers]
+                       for x in leaders])
+    return tensor
+
+
+def peak_lags(tensor):
+    """Per pair the lag with the highest correlation and that correlation"""
+    size = len(tensor[0]) if tensor else 0
+    lags = [[None] * size for _ in range(size)]
+    peaks = [[None] * size for _ in range(size)]
+    for lag, matrix in enumerate(tensor):
+        for i, row in enumerate(matrix):
+            for j, r in enumerate(row):
+                if r is not None and (peaks[i][j] is None or r > peaks[i][j]):
+                    lags[i][j], peaks[i][j] = lag, r
+    return lags, peaks
+
+
+def _scaled(value):
+    return None if value is None else round(value * SCALE)
+
+
+def write_lead_lag(path, index, keys, adjusted, geo_names):
+    """Write the correlation tensor and the peak lag per pair as compact JSON"""
+    tensor = correlation_tensor(adjusted)
+    lags, peaks = peak_lags(tensor)
+    payload = {
+        "method": "Pearson correlation of the seasonally adjusted monthly series, series i at t vs j at t + lag",
+        "first_month": index.first_month,
+        "months": len(adjusted),
+        "scale": SCALE,
+        "lags": list(range(len(tensor))),
+        "series": [{"geo": geo_names[geo], "sector": sector} for geo, sector in keys],
+        "correlations": [[[_scaled(r) for r in row] for row in matrix] for matrix in tensor],
+        "peak_lag": lags,
+        "peak": [[_scaled(r) for r in row] for row in peaks],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    return len(keys), len(tensor)
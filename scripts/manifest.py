@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Write content-hashed copies of the generated datasets plus a manifest.json.
+The manifest maps every logical dataset (e.g. 'Overlevingskans na 1 jaar.csv'
+for Antwerpen) to an immutable filename with its hash, size and row count, and
+is the dataset list the dashboard loader reads.
+
+Only the manifest is committed. The hashed copies are git-ignored and written
+from the plain files: by every build, and at deploy time for the committed
+manifest:
+    python3 scripts/manifest.py --copies
+"""
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+DASHBOARD_DIR = SCRIPT_DIR.parent
+DATA_DIR = DASHBOARD_DIR / "data"
+OUTPUT_DIR = DATA_DIR / "data-grafieken"
+
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 10
+
+# Matches 'name.<hash>.ext' copies written by this module
+HASHED_NAME = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<suffix>\.[A-Za-z]+)$" % HASH_LENGTH)
+
+# Root-level files that stand in for a chart dataset for one region
+REGIONAL_FILES = {
+    "Vlaanderen": {
+        'Nieuwe starters bouwsector.csv': 'Nieuwe starters Vlaamse bouwsector.csv',
+        'Faillissementen bouwsector.csv': 'Faillissementen Vlaamse bouwsector.csv',
+        '12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv':
+            '12-maandelijkse trend faillissementen Vlaamse bouwsector (absolute cijfers).csv',
+        'Jaarlijkse cijfers bouwsector (sinds 2016).csv': 'Jaarlijkse cijfers Vlaanderen bouwsector (sinds 2016).csv',
+    },
+}
+
+
+def is_hashed_name(name):
+    """True for content-hashed copies written by write_manifest()"""
+    return HASHED_NAME.match(name) is not None
+
+
+def _digest(content):
+    return hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+
+
+def _describe(path, output_dir):
+    """Hash a dataset and return its manifest entry"""
+    content = path.read_bytes()
+    digest = _digest(content)
+    hashed = path.with_name(f"{path.stem}.{digest}{path.suffix}")
+
+    entry = {
+        "file": hashed.relative_to(output_dir).as_posix(),
+        "hash": digest,
+        "bytes": len(content),
+    }
+    if path.suffix == ".csv":
+        entry["rows"] = max(0, content.decode("utf-8").strip().count("\n"))
+    return entry
+
+
+def _remove_stale_copies(folder, live):
+    """Delete hashed copies that no manifest entry points to anymore"""
+    removed = 0
+    for path in folder.iterdir():
+        if path.is_file() and is_hashed_name(path.name) and path not in live:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def _entries(manifest):
+    """Every file entry of a manifest"""
+    for dataset in manifest["datasets"].values():
+        yield from dataset["geographies"].values()
+        if "root" in dataset:
+            yield dataset["root"]
+        yield from dataset.get("regional", {}).values()
+    yield from manifest["files"].values()
+
+
+def write_hashed_copies(output_dir=OUTPUT_DIR):
+    """Write the hashed copy of every file in manifest.json and remove the copies it no longer lists
+
+    The copies are made from the plain files next to them; a plain file whose
+    content no longer matches its manifest hash fails the run.
+    Returns (hashed files, stale copies removed).
+    """
+    output_dir = Path(output_dir)
+    with open(output_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    live = set()
+    for entry in _entries(manifest):
+        hashed = output_dir / entry["file"]
+        live.add(hashed)
+        if hashed.exists():
+            continue
+        match = HASHED_NAME.match(hashed.name)
+        plain = hashed.with_name(match["stem"] + match["suffix"])
+        content = plain.read_bytes()
+        if _digest(content) != entry["hash"]:
+            raise ValueError(f"{plain.relative_to(output_dir)} does not match {MANIFEST_NAME}; rebuild the manifest")
+        hashed.write_bytes(content)
+
+    folders = [output_dir] + sorted(d for d in output_dir.iterdir() if d.is_dir())
+    removed = sum(_remove_stale_copies(folder, live) for folder in folders)
+    return len(live), removed
+
+
+def write_manifest(output_dir=OUTPUT_DIR):
+    """Hash all generated datasets under output_dir, write manifest.json and the hashed copies"""
+    output_dir = Path(output_dir)
+    datasets = {}
+    files = {}
+
+    folders = sorted(d for d in output_dir.iterdir() if d.is_dir())
+    for folder in folders:
+        for path in sorted(folder.glob("*.csv")):
+            if is_hashed_name(path.name):
+                continue
+            entry = _describe(path, output_dir)
+            dataset = datasets.setdefault(path.name, {"geographies": {}})
+            dataset["geographies"][folder.name] = entry
+
+    for path in sorted(output_dir.iterdir()):
+        if not path.is_file() or path.name == MANIFEST_NAME or path.name.startswith(".") or is_hashed_name(path.name):
+            continue
+        if path.suffix not in (".csv", ".json"):
+            continue
+        entry = _describe(path, output_dir)
+        if path.name in datasets:
+            datasets[path.name]["root"] = entry
+        else:
+            files[path.name] = entry
+
+    # Region-specific stand-ins for a dataset (e.g. Vlaamse bouwsector files)
+    for region, mapping in REGIONAL_FILES.items():
+        for dataset_name, regional_name in mapping.items():
+            if dataset_name in datasets and regional_name in files:
+                datasets[dataset_name].setdefault("regional", {})[region] = files.pop(regional_name)
+
+    manifest = {"version": 1, "datasets": datasets, "files": files}
+    with open(output_dir / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+    return write_hashed_copies(output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write manifest.json and the content-hashed copies it lists")
+    parser.add_argument("--copies", action="store_true",
+                        help="Only write the hashed copies of the current manifest (deploy)")
+    args = parser.parse_args()
+
+    if args.copies:
+        count, removed = write_hashed_copies()
+        print(f"✓ Wrote the copies of {MANIFEST_NAME}: {count} hashed files ({removed} stale copies removed)")
+    else:
+        count, removed = write_manifest()
+        print(f"✓ Wrote {MANIFEST_NAME}: {count} hashed files ({removed} stale copies removed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Net business formation: starters against stoppers per geography and sector.
+The survival cube (starters per cohort, survivors after 1..5 years) and the
+bankruptcy cube are projected once onto shared (geography, sector, year)
+indices. Everything after that is element-wise arithmetic over the aligned
+year arrays: exits are the drop in survivors from one horizon to the next,
+shifted to the calendar year in which they happen, and the exit rate divides
+them by the young firms alive at the start of that year.
+
+Exits only cover firms up to HORIZONS years old (the survival file follows
+each cohort for five years), so they are young-firm exits; bankruptcies cover
+firms of any age.
+"""
+import json
+from operator import add, and_, sub
+
+from prefix_index import SECTORS, compact_number
+
+HORIZONS = 5
+
+# Aligned measures: starters and survivors per cohort year, bankruptcies per calendar year
+SURVIVAL_MEASURES = ("starters",) + tuple(f"surv_{k}" for k in range(1, HORIZONS + 1))
+MEASURES = SURVIVAL_MEASURES + ("bankruptcies",)
+
+
+class AlignedSeries:
+    """Measures of both sources on one (geography, sector, year) index
+
+    values[measure][(geo, sector)] is a list over years.
+    """
+
+    def __init__(self, geos, years):
+        self.geos = list(geos)
+        self.years = list(years)
+        self.values = {measure: {(geo, sector): [0.0] * len(self.years)
+                                 for geo in self.geos for sector in SECTORS}
+                       for measure in MEASURES}
+
+    def series(self, measure, geo, sector):
+        return self.values[measure][(geo, sector)]
+
+    def add_group(self, name, members):
+        """Add a geography that is the element-wise sum of others"""
+        for series in self.values.values():
+            for sector in SECTORS:
+                total = [0.0] * len(self.years)
+                for member in members:
+                    if (member, sector) in series:
+                        total = list(map(add, total, series[(member, sector)]))
+                series[(name, sector)] = total
+        self.geos.append(name)
+
+
+def align(survival_cube, bankruptcy_cube, sector_of):
+    """Project both cubes onto shared geography, sector and year indices (one pass over each marginal)"""
+    survival = survival_cube.marginal(("geo", "year", "nace"))
+    bankruptcy = bankruptcy_cube.marginal(("geo", "year", "nace"))
+    geos = sorted({geo for geo, _, _ in survival} | {geo for geo, _, _ in bankruptcy})
+    years = sorted({int(year) for _, year, _ in survival} | {int(year) for _, year, _ in bankruptcy})
+    if not years:
+        return AlignedSeries(geos, [])
+    aligned = AlignedSeries(geos, range(years[0], years[-1] + 1))
+    first = years[0]
+
+    for (geo, year, nace), totals in survival.items():
+        key, t = (geo, sector_of(nace)), int(year) - first
+        for measure, value in zip(SURVIVAL_MEASURES, totals):
+            aligned.values[measure][key][t] += value
+    bankruptcies = aligned.values["bankruptcies"]
+    for (geo, year, nace), totals in bankruptcy.items():
+        bankruptcies[(geo, sector_of(nace))][int(year) - first] += totals[0]
+    return aligned
+
+
+def _years_with_totals(aligned, measure):
+    totals = [0.0] * len(aligned.years)
+    for series in aligned.values[measure].values():
+        totals = list(map(add, totals, series))
+    return [year for year, total in zip(aligned.years, totals) if total]
+
+
+def follow_up(aligned):
+    """Per horizon k (0 = the starters) the (first, last) cohort year observed after k years
+
+    Later cohorts are not followed up yet; (None, None) when a horizon has no data.
+    """
+    observed = {}
+    for k, measure in enumerate(SURVIVAL_MEASURES):
+        years = _years_with_totals(aligned, measure)
+        observed[k] = (years[0], years[-1]) if years else (None, None)
+    return observed
+
+
+def _shifted(values, k):
+    """values[t - k] at position t, 0 before the start"""
+    return [0.0] * k + values[:len(values) - k] if k else list(values)
+
+
+def _known(values, mask):
+    return [v if ok else None for v, ok in zip(values, mask)]
+
+
+def net_formation(aligned, geo, sector, observed):
+    """Starters, young-firm exits, net formation, exit rate (%) and bankruptcies per year
+
+    Exits in year y are the survivors lost in their k-th year by the cohorts of
+    y - k (k = 1..HORIZONS); the stock is the firms of those cohorts still
+    alive at the start of y. Years whose cohorts are not all followed up are None.
+    """
+    survivors = [aligned.series(measure, geo, sector) for measure in SURVIVAL_MEASURES]
+    exits = [0.0] * len(aligned.years)
+    stock = [0.0] * len(aligned.years)
+    for k in range(1, HORIZONS + 1):
+        before, after = _shifted(survivors[k - 1], k), _shifted(survivors[k], k)
+        exits = list(map(add, exits, map(sub, before, after)))
+        stock = list(map(add, stock, before))
+
+    def covered(year, k):
+        last = observed[k][1]
+        return last is not None and observed[0][0] <= year <= last
+
+    has_starters = [covered(year, 0) for year in aligned.years]
+    has_exits = [all(covered(year - k, k) for k in range(1, HORIZONS + 1)) for year in aligned.years]
+    rates = [100 * e / s if s else None for e, s in zip(exits, stock)]
+    return {
+        "starters": _known(survivors[0], has_starters),
+        "exits": _known(exits, has_exits),
+        "net": _known(map(sub, survivors[0], exits), map(and_, has_starters, has_exits)),
+        "exit_rate": _known(rates, has_exits),
+        "bankruptcies": aligned.series("bankruptcies", geo, sector),
+    }
+
+
+def _rounded(values, digits=0):
+    return [None if v is None else compact_number(round(v, digits)) for v in values]
+
+
+def write_net_formation(path, aligned, geo_names):
+    """Write the series of every geography and sector as compact JSON"""
+    observed = follow_up(aligned)
+    series = {}
+    for geo in aligned.geos:
+        for sector in SECTORS:
+            values = net_formation(aligned, geo, sector, observed)
+            series.setdefault(geo_names.get(geo, geo), {})[sector] = {
+                name: _rounded(v, 2 if name == "exit_rate" else 0) for name, v in values.items()
+            }
+    payload = {
+        "years": aligned.years,
+        "horizons": HORIZONS,
+        "exits": "young-firm exits (up to 5 years after starting), from the survival counts",
+        "series": series,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    return len(series)
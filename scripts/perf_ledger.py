@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Performance ledger of the update runs.
+Every run of update_data.py appends one JSON line to data/perf_ledger.jsonl
+with its stage timings, scanned rows, bytes in and out and peak RSS, and
+exports the same numbers as Prometheus textfile metrics. The summary compares
+the last run with the median of the runs before it and flags regressions; the
+workflow adds it to the job summary:
+    python3 scripts/perf_ledger.py --summary >> "$GITHUB_STEP_SUMMARY"
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from manifest import is_hashed_name
+from source_adapters import SOURCES
+
+DASHBOARD_DIR = Path(__file__).parent.parent
+DATA_DIR = DASHBOARD_DIR / "data"
+PROCESSED_DIR = DATA_DIR / "data-grafieken"
+RAW_FILES = tuple(source.member for source in SOURCES)
+
+# One record per run; carried between runs in the Actions cache, committed with data changes
+LEDGER_FILE = DATA_DIR / "perf_ledger.jsonl"
+# Prometheus textfile-collector format; not committed
+METRICS_FILE = DATA_DIR / "metrics.prom"
+
+# Runs the last one is compared with, and how many are needed for a verdict
+TRAILING_RUNS = 8
+MIN_HISTORY = 3
+# Flag metrics this much above the trailing median...
+REGRESSION_RATIO = 1.25
+# ...unless the difference is below the noise floor of the metric's unit
+NOISE_FLOOR = {"seconds": 2.0, "bytes": 1024 * 1024, "rows": 1000}
+
+METRIC_PREFIX = "statbel_pipeline"
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process and its finished children"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def output_bytes(output_dir=PROCESSED_DIR):
+    """Number and total size of the generated files (hashed copies excluded)"""
+    files = [p for p in Path(output_dir).rglob("*")
+             if p.is_file() and not p.name.startswith(".") and not is_hashed_name(p.name)]
+    return len(files), sum(p.stat().st_size for p in files)
+
+
+def build_record(stages, started, status, run_report_path=None):
+    """One ledger record; scans are taken from the run report if this run wrote it"""
+    files_out, bytes_out = output_bytes()
+    record = {
+        "run": started.isoformat(timespec="seconds"),
+        "commit": os.environ.get("GITHUB_SHA", ""),
+        "status": status,
+        "stages": stages,
+        "scans": {},
+        "bytes_in": {name: (DATA_DIR / name).stat().st_size for name in RAW_FILES if (DATA_DIR / name).exists()},
+        "bytes_out": bytes_out,
+        "files_out": files_out,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+    # A report from an earlier run (nothing was rebuilt) is not this run's work
+    run_report_path = Path(run_report_path) if run_report_path else None
+    if run_report_path and run_report_path.exists() and run_report_path.stat().st_mtime >= started.timestamp():
+        with open(run_report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        record["scans"] = {name: {"rows": scan["rows"], "seconds": scan["seconds"]}
+                           for name, scan in report["scans"].items()}
+        if "build_seconds" in report:
+            record["build_seconds"] = report["build_seconds"]
+    return record
+
+
+def append_record(record, path=LEDGER_FILE):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n")
+
+
+def load_ledger(path=LEDGER_FILE):
+    if not Path(path).exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def metrics(record):
+    """Flat {(metric, labels): (value, unit)} of a record; skipped stages are left out"""
+    values = {}
+    for stage, entry in record.get("stages", {}).items():
+        if entry.get("status") == "completed":
+            values[("stage_seconds", (("stage", stage),))] = (entry["seconds"], "seconds")
+    for scan, entry in record.get("scans", {}).items():
+        values[("scan_seconds", (("scan", scan),))] = (entry["seconds"], "seconds")
+        values[("scan_rows", (("scan", scan),))] = (entry["rows"], "rows")
+    if "build_seconds" in record:
+        values[("build_seconds", ())] = (record["build_seconds"], "seconds")
+    for name, size in record.get("bytes_in", {}).items():
+        values[("input_bytes", (("file", name),))] = (size, "bytes")
+    values[("output_bytes", ())] = (record.get("bytes_out", 0), "bytes")
+    if record.get("peak_rss_bytes") is not None:
+        values[("peak_rss_bytes", ())] = (record["peak_rss_bytes"], "bytes")
+    return values
+
+
+def compare(ledger):
+    """Last record against the median of up to TRAILING_RUNS earlier ones
+
+    Returns [(metric, labels, value, median, history size, regression)].
+    """
+    if not ledger:
+        return []
+    current = metrics(ledger[-1])
+    history = [metrics(record) for record in ledger[-TRAILING_RUNS - 1:-1]]
+
+    rows = []
+    for key, (value, unit) in sorted(current.items()):
+        previous = [m[key][0] for m in history if key in m]
+        if len(previous) < MIN_HISTORY:
+            rows.append((key[0], key[1], value, None, len(previous), False))
+            continue
+        median = statistics.median(previous)
+        regression = value > median * REGRESSION_RATIO and value - median > NOISE_FLOOR[unit]
+        rows.append((key[0], key[1], value, median, len(previous), regression))
+    return rows
+
+
+def _label_text(labels):
+    return ", ".join(value for _, value in labels)
+
+
+def _format(metric, value):
+    if value is None:
+        return "–"
+    if metric.endswith("seconds"):
+        return f"{value:.1f} s"
+    if metric.endswith("bytes"):
+        return f"{value / (1024 * 1024):.1f} MB"
+    return f"{value:,.0f}".replace(",", ".")
+
+
+def summary_markdown(ledger):
+    """Job-summary table of the last run; regressions are flagged"""
+    rows = compare(ledger)
+    if not rows:
+        return "ℹ️ Nog geen prestatiegegevens\n"
+
+    regressions = [row for row in rows if row[5]]
+    lines = [f"### Prestaties van deze run ({ledger[-1]['run']})", ""]
+    if regressions:
+        lines.append(f"⚠️ **{len(regressions)} regressie(s)** ten opzichte van de mediaan van de vorige runs")
+    else:
+        lines.append("✅ Geen regressies ten opzichte van de mediaan van de vorige runs")
+    lines += ["", "| Meting | Deze run | Mediaan | Verschil |", "|---|---|---|---|"]
+    for metric, labels, value, median, history, regression in rows:
+        name = f"{metric} ({_label_text(labels)})" if labels else metric
+        if median is None:
+            change = f"te weinig historiek ({history} runs)"
+        else:
+            change = f"{(value - median) / median:+.0%}" if median else "–"
+            if regression:
+                change += " ⚠️"
+        lines.append(f"| {name} | {_format(metric, value)} | {_format(metric, median)} | {change} |")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(record, path=METRICS_FILE):
+    """Write the record as Prometheus textfile metrics (atomically, as the collector requires)"""
+    lines = []
+    seen = set()
+    for (metric, labels), (value, _) in sorted(metrics(record).items()):
+        name = f"{METRIC_PREFIX}_{metric}"
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+        lines.append(f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}")
+
+    started = datetime.fromisoformat(record["run"])
+    lines.append(f"# TYPE {METRIC_PREFIX}_last_run_timestamp_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds {started.timestamp():.0f}")
+    lines.append(f"# TYPE {METRIC_PREFIX}_last_run_success gauge")
+    lines.append(f"{METRIC_PREFIX}_last_run_success {1 if record['status'] == 'completed' else 0}")
+
+    temporary = Path(path).with_suffix(".tmp")
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(temporary, path)
+
+
+def record_run(stages, started, status, run_report_path=None):
+    """Append this run to the ledger and export its metrics"""
+    record = build_record(stages, started, status, run_report_path)
+    append_record(record)
+    write_prometheus(record)
+    regressions = [row for row in compare(load_ledger()) if row[5]]
+    print(f"\nPerformance ledger: {LEDGER_FILE.name} ({len(regressions)} regressions against the trailing median)")
+    for metric, labels, value, median, _, _ in regressions:
+        print(f"  ⚠ {metric} {_label_text(labels)}: {_format(metric, value)} (median {_format(metric, median)})")
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the performance ledger of the update runs")
+    parser.add_argument("--summary", action="store_true",
+                        help="Markdown comparison of the last run with the trailing median")
+    args = parser.parse_args()
+
+    ledger = load_ledger()
+    if args.summary:
+        print(summary_markdown(ledger), end="")
+        return
+    for record in ledger[-TRAILING_RUNS:]:
+        stages = ", ".join(f"{name} {entry['seconds']:.1f}s" for name, entry in record["stages"].items()
+                           if entry.get("status") == "completed")
+        print(f"{record['run']}  {record['status']:<9}  {stages or 'nothing ran'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Prefix-sum index over the monthly bankruptcy series.
+Stores cumulative sums per (geography, sector) on a dense month axis, so any
+period total, rolling window, base period or region-group total is a single
+subtraction instead of a rescan of the monthly data.
+"""
+import json
+from pathlib import Path
+
+SECTORS = ("construction", "non_construction")
+
+
+def month_ordinal(month_key):
+    """Convert 'YYYY-MM' to a running month number"""
+    year, month = month_key.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def month_key(ordinal):
+    """Convert a running month number back to 'YYYY-MM'"""
+    return f"{ordinal // 12}-{str(ordinal % 12 + 1).zfill(2)}"
+
+
+def month_axis(first, last):
+    """Dense list of 'YYYY-MM' keys from first to last (inclusive)"""
+    return [month_key(o) for o in range(month_ordinal(first), month_ordinal(last) + 1)]
+
+
+def compact_number(value):
+    """Write integral floats as ints to keep the JSON small"""
+    return int(value) if float(value).is_integer() else value
+
+
+class PrefixSumIndex:
+    """Cumulative sums per (geography, sector) over a dense month axis"""
+
+    def __init__(self, first_month, last_month, cumsums=None):
+        self.first_month = first_month
+        self.last_month = last_month
+        self.origin = month_ordinal(first_month)
+        self.months = month_axis(first_month, last_month)
+        # {geo: {sector: [0, m1, m1+m2, ...]}} - one more entry than months
+        self.cumsums = cumsums or {}
+        self.groups = {}
+
+    @classmethod
+    def from_monthly(cls, monthly_by_geo):
+        """Build from {geo: {year_month: {sector: count}}}"""
+        all_months = [m for series in monthly_by_geo.values() for m in series]
+        if not all_months:
+            return cls("2000-01", "1999-12")
+
+        index = cls(min(all_months), max(all_months))
+        for geo, series in monthly_by_geo.items():
+            index.cumsums[geo] = {}
+            for sector in SECTORS:
+                cumulative = [0] * (len(index.months) + 1)
+                running = 0
+                for i, month in enumerate(index.months):
+                    sectors = series.get(month)
+                    if sectors:
+                        running += sectors[sector]
+                    cumulative[i + 1] = running
+                index.cumsums[geo][sector] = cumulative
+        return index
+
+    def add_group(self, name, members):
+        """Materialise the cumulative sums of a group of geographies (e.g. a region)"""
+        members = [m for m in members if m in self.cumsums]
+        self.groups[name] = members
+        self.cumsums[name] = {
+            sector: [sum(values) for values in zip(*(self.cumsums[m][sector] for m in members))]
+            if members else [0] * (len(self.months) + 1)
+            for sector in SECTORS
+        }
+
+    def _position(self, month, upper):
+        """Position in the cumulative array, clipped to the axis"""
+        pos = month_ordinal(month) - self.origin + (1 if upper else 0)
+        return max(0, min(pos, len(self.months)))
+
+    def total(self, geo, sector, start, end):
+        """Sum for geo/sector over the months start..end (inclusive)"""
+        cumulative = self.cumsums.get(geo, {}).get(sector)
+        if cumulative is None:
+            return 0
+        lo = self._position(start, upper=False)
+        hi = self._position(end, upper=True)
+        return cumulative[hi] - cumulative[lo] if hi > lo else 0
+
+    def group_total(self, members, sector, start, end):
+        """Sum over an ad-hoc set of geographies (one subtraction per member)"""
+        return sum(self.total(geo, sector, start, end) for geo in members)
+
+    def window(self, geo, sector, end, length=12):
+        """Rolling sum of `length` months ending at `end`, None without full history"""
+        end_ordinal = month_ordinal(end)
+        start_ordinal = end_ordinal - length + 1
+        if start_ordinal < self.origin or end_ordinal > month_ordinal(self.last_month):
+            return None
+        return self.total(geo, sector, month_key(start_ordinal), end)
+
+    def yearly(self, geo, sector, year):
+        """Calendar-year total"""
+        return self.total(geo, sector, f"{year}-01", f"{year}-12")
+
+    def years(self):
+        """Calendar years covered by the month axis"""
+        if not self.months:
+            return []
+        return list(range(int(self.first_month[:4]), int(self.last_month[:4]) + 1))
+
+    def save(self, path):
+        """Persist the index as JSON so other tools can query it"""
+        payload = {
+            "first_month": self.first_month,
+            "last_month": self.last_month,
+            "sectors": list(SECTORS),
+            "groups": self.groups,
+            "cumsums": {
+                geo: {sector: [compact_number(v) for v in values] for sector, values in sectors.items()}
+                for geo, sectors in self.cumsums.items()
+            },
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save()"""
+        with open(Path(path), 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        index = cls(payload["first_month"], payload["last_month"], payload["cumsums"])
+        index.groups = payload.get("groups", {})
+        return index
@@ -0,0 +1,252 @@
+"""
+Static SVG versions of the dashboard charts, for the first paint.
+dashboard-index.html shows these images right away and hides them once
+js/dashboard-charts.js has drawn the interactive charts, so the page is not
+blank while the CSVs load. Every chart is rendered for the default view of
+one geography: a province folder, or Vlaanderen (the page's initial
+selection), whose data comes from the root-level files the data loader reads
+for it. The series, labels and colours follow dashboard-charts.js; values
+that are not numbers are drawn as 0, as Chart.js gets them from parseFloat.
+Only the stdlib is used.
+"""
+import csv
+import math
+from xml.sax.saxutils import escape
+
+from manifest import REGIONAL_FILES
+
+SVG_WIDTH, SVG_HEIGHT = 800, 400
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 70, 20, 70, 80
+FONT = "font-family=\"sans-serif\""
+
+# Default geography of the page
+DEFAULT_VIEW = "Vlaanderen"
+
+# Colours of getProvinceColor() in dashboard-data-loader.js
+COLORS = {
+    'Antwerpen': '#e74c3c',
+    'Vlaams-Brabant': '#3498db',
+    'West-Vlaanderen': '#2ecc71',
+    'Oost-Vlaanderen': '#f39c12',
+    'Limburg': '#9b59b6',
+    'Waals-Brabant': '#1abc9c',
+    'Henegouwen': '#e67e22',
+    'Luik': '#34495e',
+    'Luxemburg': '#16a085',
+    'Namen': '#d35400',
+    'Brussels': '#c0392b',
+    'Vlaanderen': '#FFD700',
+}
+
+
+class ChartSpec:
+    """One dashboard chart: canvas id prefix, dataset file, title, axes and kind ('line' or 'bar')"""
+
+    def __init__(self, chart_id, dataset, title, x_column, y_columns, y_label, kind="line", skip_labels=False):
+        self.chart_id = chart_id
+        self.dataset = dataset
+        self.title = title
+        self.x_column = x_column
+        self.y_columns = tuple(y_columns)
+        self.y_label = y_label
+        self.kind = kind
+        # Monthly axes show at most MAX_X_LABELS labels, like Chart.js autoSkip
+        self.skip_labels = skip_labels
+
+
+MAX_X_LABELS = 20
+
+# In the order of ChartsManager.createAllCharts()
+CHARTS = [
+    ChartSpec('survival-1year', 'Overlevingskans na 1 jaar.csv', 'Overlevingskans na 1 jaar (%)',
+              'Jaar', ['Bouwsector (%)'], 'Percentage (%)'),
+    ChartSpec('survival-3year', 'Overlevingskans na 3 jaar.csv', 'Overlevingskans na 3 jaar (%)',
+              'Jaar', ['Bouwsector (%)'], 'Percentage (%)'),
+    ChartSpec('starters', 'Nieuwe starters bouwsector.csv', 'Nieuwe starters bouwsector',
+              'Jaar', ['Aantal nieuwe starters'], 'Aantal'),
+    ChartSpec('bankruptcies', 'Faillissementen bouwsector.csv', 'Faillissementen bouwsector',
+              'Jaar', ['Aantal faillissementen'], 'Aantal'),
+    ChartSpec('trend-index', '12-maandelijkse trend faillissementen (index 2008 = 100).csv',
+              '12-maandelijkse trend (index 2008 = 100)', 'Jaar-Maand',
+              ['Bouwsector (index)', 'Niet-bouwsector (index)'], 'Index', skip_labels=True),
+    ChartSpec('trend-absolute', '12-maandelijkse trend faillissementen bouwsector (absolute cijfers).csv',
+              '12-maandelijkse trend (absolute)', 'Jaar-Maand',
+              ['Aantal faillissementen (12-maands som)'], 'Aantal', skip_labels=True),
+    ChartSpec('starters-index', 'Nieuwe starters (index 2008 = 100).csv', 'Nieuwe starters (index 2008 = 100)',
+              'Jaar', ['Bouwsector (index)', 'Niet-bouwsector (index)'], 'Index'),
+    ChartSpec('yearly-summary', 'Jaarlijkse cijfers bouwsector (sinds 2016).csv',
+              'Jaarlijkse cijfers bouwsector (sinds 2016)', 'Jaar',
+              ['Nieuwe starters', 'Jaarlijkse faillissementen'], 'Aantal', kind="bar"),
+]
+
+# Root-level files with one row per region in a 'Gewest' column (loadGewestCSV)
+GEWEST_FILES = ('Overlevingskans na 1 jaar.csv', 'Overlevingskans na 3 jaar.csv', 'Nieuwe starters (index 2008 = 100).csv')
+GEWEST_NAME = "Vlaams Gewest"
+# Root-level file with '<Gewest> - <sector>' columns (loadTrendIndexCSV)
+TREND_INDEX_FILE = '12-maandelijkse trend faillissementen (index 2008 = 100).csv'
+
+
+def default_view_sources(dataset):
+    """Root-level file the Vlaanderen view of a dataset is read from, None if the page has none"""
+    if dataset in GEWEST_FILES or dataset == TREND_INDEX_FILE:
+        return dataset
+    return REGIONAL_FILES[DEFAULT_VIEW].get(dataset)
+
+
+def _read_csv(path):
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def view_rows(output_dir, view, dataset):
+    """Rows of one dataset as the data loader gives them to the charts for a single geography"""
+    if view != DEFAULT_VIEW:
+        return _read_csv(output_dir / view / dataset)
+    source = default_view_sources(dataset)
+    if source is None:
+        return []
+    rows = _read_csv(output_dir / source)
+    if dataset in GEWEST_FILES:
+        return [row for row in rows if row.get('Gewest') == GEWEST_NAME]
+    if dataset == TREND_INDEX_FILE:
+        return [{'Jaar-Maand': row['Jaar-Maand'],
+                 'Bouwsector (index)': row.get(f'{GEWEST_NAME} - Bouwsector', '-'),
+                 'Niet-bouwsector (index)': row.get(f'{GEWEST_NAME} - Niet-bouwsector', '-')}
+                for row in rows]
+    return rows
+
+
+def _number(value):
+    """parseFloat(value) || 0"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return number if math.isfinite(number) else 0.0
+
+
+def nice_ticks(low, high, count=6):
+    """Round tick values covering low..high"""
+    if high <= low:
+        high = low + 1
+    raw = (high - low) / max(count - 1, 1)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    first = math.floor(low / step) * step
+    ticks = []
+    value = first
+    while value <= high + step * 1e-9:
+        ticks.append(round(value, 10))
+        value += step
+    if ticks[-1] < high:
+        ticks.append(round(value, 10))
+    return ticks, step
+
+
+def _tick_label(value, step):
+    decimals = 0 if step >= 1 else min(3, -math.floor(math.log10(step)))
+    text = f"{value:,.{decimals}f}"
+    return text.replace(",", " ").replace(".", ",").replace(" ", ".")
+
+
+def render_chart(spec, rows, view):
+    """SVG text of one chart for one geography, None without data"""
+    if not rows:
+        return None
+    rows = sorted(rows, key=lambda row: row[spec.x_column])
+    labels = [row[spec.x_column] for row in rows]
+    color = COLORS.get(view, '#95a5a6')
+    series = [(f"{view} - {column}" if len(spec.y_columns) > 1 or spec.kind == "bar" else view,
+               [_number(row.get(column)) for row in rows], index)
+              for index, column in enumerate(spec.y_columns)]
+
+    values = [value for _, points, _ in series for value in points]
+    low, high = min(values), max(values)
+    # Chart.js grace: '10%' of the range on both ends
+    grace = (high - low) * 0.1 or abs(high) * 0.1 or 1
+    ticks, step = nice_ticks(low - grace, high + grace)
+    y_min, y_max = ticks[0], ticks[-1]
+
+    left, right = MARGIN_LEFT, SVG_WIDTH - MARGIN_RIGHT
+    top, bottom = MARGIN_TOP, SVG_HEIGHT - MARGIN_BOTTOM
+    width, height = right - left, bottom - top
+
+    def y_of(value):
+        return bottom - (value - y_min) / (y_max - y_min) * height
+
+    count = len(labels)
+    if spec.kind == "bar":
+        slot = width / count
+
+        def x_of(i):
+            return left + (i + 0.5) * slot
+    else:
+        def x_of(i):
+            return left + (i * width / (count - 1) if count > 1 else width / 2)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+             f'role="img" aria-label="{escape(spec.title)}, {escape(view)}">',
+             f'<rect width="{SVG_WIDTH}" height="{SVG_HEIGHT}" fill="#fff"/>',
+             f'<text x="{SVG_WIDTH / 2:.0f}" y="22" text-anchor="middle" {FONT} font-size="16" '
+             f'font-weight="bold" fill="#666">{escape(spec.title)}</text>']
+
+    # Legend
+    legend_x = SVG_WIDTH / 2 - sum(len(name) * 6.5 + 40 for name, _, _ in series) / 2
+    for name, _, index in series:
+        dash = ' stroke-dasharray="5 5"' if spec.kind == "line" and index > 0 else ''
+        parts.append(f'<rect x="{legend_x:.1f}" y="36" width="30" height="10" fill="{color}33" '
+                     f'stroke="{color}" stroke-width="2"{dash}/>')
+        parts.append(f'<text x="{legend_x + 36:.1f}" y="45" {FONT} font-size="12" fill="#666">{escape(name)}</text>')
+        legend_x += len(name) * 6.5 + 40
+
+    # Grid and y axis
+    for tick in ticks:
+        y = y_of(tick)
+        parts.append(f'<line x1="{left}" y1="{y:.1f}" x2="{right}" y2="{y:.1f}" stroke="#e5e5e5"/>')
+        parts.append(f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end" {FONT} font-size="11" '
+                     f'fill="#666">{_tick_label(tick, step)}</text>')
+    parts.append(f'<text transform="translate(16 {top + height / 2:.0f}) rotate(-90)" text-anchor="middle" '
+                 f'{FONT} font-size="12" fill="#666">{escape(spec.y_label)}</text>')
+
+    # x axis labels, rotated like the Chart.js ticks
+    every = math.ceil(count / MAX_X_LABELS) if spec.skip_labels else 1
+    for i in range(0, count, every):
+        x = x_of(i)
+        parts.append(f'<text transform="translate({x:.1f} {bottom + 12}) rotate(-45)" text-anchor="end" '
+                     f'{FONT} font-size="11" fill="#666">{escape(labels[i])}</text>')
+    parts.append(f'<line x1="{left}" y1="{bottom}" x2="{right}" y2="{bottom}" stroke="#ccc"/>')
+    parts.append(f'<text x="{left + width / 2:.0f}" y="{SVG_HEIGHT - 6}" text-anchor="middle" {FONT} '
+                 f'font-size="12" fill="#666">{escape(spec.x_column)}</text>')
+
+    # Data
+    if spec.kind == "bar":
+        bar = slot * 0.8 / len(series)
+        base = y_of(max(y_min, min(0, y_max)))
+        for _, points, index in series:
+            for i, value in enumerate(points):
+                x = x_of(i) - slot * 0.4 + index * bar
+                y = y_of(value)
+                parts.append(f'<rect x="{x:.1f}" y="{min(y, base):.1f}" width="{bar:.1f}" '
+                             f'height="{abs(base - y):.1f}" fill="{color}80" stroke="{color}"/>')
+    else:
+        for _, points, index in series:
+            dash = ' stroke-dasharray="5 5"' if index > 0 else ''
+            coordinates = " ".join(f"{x_of(i):.1f},{y_of(value):.1f}" for i, value in enumerate(points))
+            parts.append(f'<polyline points="{coordinates}" fill="none" stroke="{color}" stroke-width="2"{dash}/>')
+    parts.append('</svg>')
+    return "\n".join(parts) + "\n"
+
+
+def write_chart_svg(path, output_dir, view, spec):
+    """Render one chart of one view to path; returns the written paths (none without data)"""
+    svg = render_chart(spec, view_rows(output_dir, view, spec.dataset), view)
+    if svg is None:
+        if path.exists():
+            path.unlink()
+        return []
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(svg)
+    return [path]
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Cell-level diff of each cube against the previous run's cube.
+After a build the cube of every source adapter is saved (SparseCube.save) in
+data/.cache/cubes/; the next build compares its cube with that one cell by
+cell instead of leaving the review to a git diff of the CSVs. The previous
+cube's codes are translated into the current cube's code space once per
+dimension value, after which the added, removed and common cells are set
+operations on the encoded keys and the revised cells one list comparison per
+common cell.
+
+The JSON report lists the periods that were added, the cells that were added
+to or removed from existing periods, and the revised cells (count and net and
+absolute change per measure, per period, and the largest revisions with their
+absolute and relative change). Each source is diffed on its own (diff_source),
+so a build that only rescans one source leaves the other cube alone;
+write_report() combines the entries. summary_markdown() is the job summary of
+update-data.yml.
+
+    python3 scripts/release_diff.py --summary
+"""
+import argparse
+import json
+from datetime import datetime, timezone
+from operator import getitem, itemgetter
+from pathlib import Path
+
+from sparse_cube import SparseCube
+
+SCRIPT_DIR = Path(__file__).parent
+DASHBOARD_DIR = SCRIPT_DIR.parent
+DATA_DIR = DASHBOARD_DIR / "data"
+
+# Cubes of the previous run (kept with the Actions cache, not committed)
+CUBE_DIR = DATA_DIR / ".cache" / "cubes"
+
+# Report of the last build; kept out of git, uploaded with the run report
+REPORT_FILE = DATA_DIR / "release_diff.json"
+
+# Largest revisions listed per source
+TOP_REVISIONS = 20
+# Removed cells listed per source
+REMOVED_SAMPLES = 10
+
+
+def cube_path(source, cube_dir=CUBE_DIR):
+    return Path(cube_dir) / f"{source.name}.cube"
+
+
+def entry_path(source, cube_dir=CUBE_DIR):
+    """Report entry of the last diff of one source, kept next to its cube"""
+    return Path(cube_dir) / f"{source.name}.diff.json"
+
+
+def _translated_cells(previous, current):
+    """Previous cells keyed in the current cube's codes; values missing from it get negative codes"""
+    translations = []
+    for axis, dim in enumerate(current.dims):
+        codes = current.code_map(dim)
+        translations.append([codes.get(value, -1 - code) for code, value in enumerate(previous.values[axis])])
+    # Codes follow the file order, so between releases they are usually unchanged
+    if all(translation == list(range(len(translation))) for translation in translations):
+        return previous.cells
+    return {tuple(map(getitem, translations, key)): values for key, values in previous.cells.items()}
+
+
+def _decoder(cube):
+    values = cube.values
+    return lambda key: tuple(map(getitem, values, key))
+
+
+def _relative(old, change):
+    return round(change / old, 4) if old else None
+
+
+def _schema_changed(dims, measures, current):
+    return {"schema_changed": {"previous": {"dims": list(dims), "measures": list(measures)},
+                               "current": {"dims": list(current.dims), "measures": list(current.measures)}}}
+
+
+def cube_diff(previous, current, calendar):
+    """Added periods, added and removed cells, and revised values of current against previous
+
+    calendar: the dimensions that make up the period, e.g. ('year', 'month').
+    """
+    if previous.dims != current.dims or previous.measures != current.measures:
+        return _schema_changed(previous.dims, previous.measures, current)
+
+    old_cells = _translated_cells(previous, current)
+    new_cells = current.cells
+    added = new_cells.keys() - old_cells.keys()
+    removed = old_cells.keys() - new_cells.keys()
+    revised = [key for key, old in old_cells.items() if (new := new_cells.get(key)) is not None and new != old]
+
+    # Values of removed cells may be absent from the current cube; decode them with the previous one
+    decode = _decoder(current)
+    previous_values = previous.values
+    removed_keys = [old_key for key, old_key in zip(old_cells, previous.cells) if key in removed]
+    axes = [current.dims.index(dim) for dim in calendar]
+
+    def period(coords):
+        return "-".join(coords[axis] for axis in axes)
+
+    calendar_codes = itemgetter(*axes) if len(axes) > 1 else (lambda key: (key[axes[0]],))
+    old_periods = {"-".join(map(getitem, (previous_values[axis] for axis in axes), codes))
+                   for codes in set(map(calendar_codes, previous.cells))}
+    measures = current.measures
+
+    added_periods, added_cells = {}, 0
+    for key in added:
+        name = period(decode(key))
+        if name in old_periods:
+            added_cells += 1
+            continue
+        entry = added_periods.setdefault(name, {"period": name, "cells": 0, "totals": dict.fromkeys(measures, 0.0)})
+        entry["cells"] += 1
+        for measure, value in zip(measures, new_cells[key]):
+            entry["totals"][measure] += value
+
+    removed_totals = dict.fromkeys(measures, 0.0)
+    removed_samples = []
+    for key in sorted(removed_keys):
+        for measure, value in zip(measures, previous.cells[key]):
+            removed_totals[measure] += value
+        if len(removed_samples) < REMOVED_SAMPLES:
+            removed_samples.append(dict(zip(current.dims, (previous_values[axis][code]
+                                                           for axis, code in enumerate(key)))))
+
+    by_measure = {measure: {"cells": 0, "net": 0.0, "absolute": 0.0} for measure in measures}
+    by_period = {}
+    changes = []
+    for key in revised:
+        coords = decode(key)
+        name = period(coords)
+        for measure, old, new in zip(measures, old_cells[key], new_cells[key]):
+            if old == new:
+                continue
+            change = new - old
+            totals = by_measure[measure]
+            totals["cells"] += 1
+            totals["net"] += change
+            totals["absolute"] += abs(change)
+            by_period.setdefault(name, {}).setdefault(measure, 0.0)
+            by_period[name][measure] += change
+            changes.append((abs(change), coords, measure, old, new, change))
+    changes.sort(key=lambda item: item[0], reverse=True)
+
+    return {
+        "cells": {"previous": len(previous), "current": len(current)},
+        "added_periods": sorted(added_periods.values(), key=lambda entry: entry["period"]),
+        "added_cells": added_cells,
+        "removed_cells": len(removed),
+        "removed_totals": removed_totals,
+        "removed_samples": removed_samples,
+        "revised_cells": len(revised),
+        "revised_by_measure": by_measure,
+        "revised_by_period": dict(sorted(by_period.items())),
+        "largest_revisions": [
+            {"cell": dict(zip(current.dims, coords)), "measure": measure, "previous": old, "current": new,
+             "change": change, "relative": _relative(old, change)}
+            for _, coords, measure, old, new, change in changes[:TOP_REVISIONS]
+        ],
+    }
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def diff_source(source, cube, cube_dir=CUBE_DIR):
+    """Diff one source adapter's cube against its saved cube, then save it in its place
+
+    The report entry is also written next to the cube, for write_report().
+    Returns the entry and the paths of the saved cube and entry.
+    """
+    cube_dir = Path(cube_dir)
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    now = _now()
+    path = cube_path(source, cube_dir)
+    if path.exists():
+        schema = SparseCube.load_schema(path)
+        # A previous cube of another schema (e.g. marginals kept by a run that spilled) is not loaded
+        entry = (cube_diff(SparseCube.load(path), cube, source.calendar) if schema == (cube.dims, cube.measures)
+                 else _schema_changed(*schema, cube))
+        entry["previous_run"] = SparseCube.load_meta(path).get("saved")
+    else:
+        entry = {"previous_run": None}
+    entry["run"] = now
+    # Written next to the old cube first, so an interrupted save keeps the previous one
+    temporary = path.with_suffix(".tmp")
+    cube.save(temporary, meta={"saved": now})
+    temporary.replace(path)
+    with open(entry_path(source, cube_dir), 'w', encoding='utf-8') as f:
+        json.dump(entry, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    return entry, [path, entry_path(source, cube_dir)]
+
+
+def write_report(sources, rebuilt, report_path=REPORT_FILE, cube_dir=CUBE_DIR):
+    """Combine the entries of the sources diffed in this run into the report
+
+    sources: all source adapters; rebuilt: the names of those whose cube was
+    diffed in this run. The others are listed as unchanged since their last run.
+    """
+    report = {"generated": _now(), "sources": {}}
+    for source in sources:
+        if source.name in rebuilt:
+            with open(entry_path(source, cube_dir), 'r', encoding='utf-8') as f:
+                report["sources"][source.name] = json.load(f)
+        else:
+            path = cube_path(source, cube_dir)
+            report["sources"][source.name] = {
+                "unchanged": True,
+                "previous_run": SparseCube.load_meta(path).get("saved") if path.exists() else None,
+            }
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    return report
+
+
+def _number(value, sign=""):
+    text = f"{value:{sign},.0f}" if value == int(value) else f"{value:{sign},.2f}"
+    return text.replace(",", " ").replace(".", ",").replace(" ", ".")
+
+
+def summary_markdown(report):
+    """Short job summary of the report"""
+    lines = [f"### Wijzigingen ten opzichte van de vorige run ({report['generated']})", ""]
+    for name, entry in report["sources"].items():
+        if entry.get("unchanged"):
+            lines.append(f"- **{name}**: bronbestand ongewijzigd, niet opnieuw vergeleken")
+            continue
+        if entry.get("previous_run") is None:
+            lines.append(f"- **{name}**: geen vorige run om mee te vergelijken")
+            continue
+        if "schema_changed" in entry:
+            lines.append(f"- **{name}**: dimensies of metingen gewijzigd, geen celvergelijking")
+            continue
+        periods = [added["period"] for added in entry["added_periods"]]
+        if not (periods or entry["revised_cells"] or entry["added_cells"] or entry["removed_cells"]):
+            lines.append(f"- **{name}**: geen wijzigingen")
+            continue
+        parts = [f"{len(periods)} nieuwe periode(s)" + (f" ({', '.join(periods[:6])}"
+                                                        f"{', …' if len(periods) > 6 else ''})" if periods else "")]
+        parts.append(f"{entry['revised_cells']} herziene cellen")
+        parts.append(f"{entry['added_cells']} cellen toegevoegd en {entry['removed_cells']} verwijderd "
+                     f"in bestaande periodes")
+        lines.append(f"- **{name}** (vorige run {entry['previous_run']}): {', '.join(parts)}")
+        for measure, totals in entry["revised_by_measure"].items():
+            if totals["cells"]:
+                lines.append(f"  - {measure}: netto {_number(totals['net'], '+')}, "
+                             f"{totals['cells']} cellen herzien")
+        if entry["largest_revisions"]:
+            top = entry["largest_revisions"][0]
+            cell = ", ".join(f"{dim}={value}" for dim, value in top["cell"].items())
+            relative = f" ({top['relative']:+.0%})" if top["relative"] is not None else ""
+            lines.append(f"  - grootste herziening: {top['measure']} {_number(top['previous'])} → "
+                         f"{_number(top['current'])}{relative} bij {cell}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the cell-level diff of the last build")
+    parser.add_argument("--summary", action="store_true", help="Markdown summary for the job summary")
+    args = parser.parse_args()
+
+    if not REPORT_FILE.exists():
+        print("ℹ️ Geen celvergelijking: de kubussen zijn in deze run niet opnieuw opgebouwd")
+        return
+    with open(REPORT_FILE, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    print(summary_markdown(report) if args.summary else json.dumps(report, ensure_ascii=False, indent=1), end="")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Counters for the raw-file scans.
+Each scan counts the rows it drops per reason and the values parse_number()
+could not read per column, with a few example values. Rejections only touch a
+dict slot and the accepted path is untouched, so the counting is cheap enough
+to stay on in every run. The counts go into data/run_report.json.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timezone
+
+# Distinct bad values kept per column
+SAMPLE_SIZE = 5
+
+
+class ScanStats:
+    """Reject and parse-failure counters of one scan"""
+
+    def __init__(self, name):
+        self.name = name
+        self.accepted = 0
+        self.seconds = 0.0
+        self.rejected = defaultdict(int)
+        # Empty, '?' or '??.??' values (expected, read as 0)
+        self.missing = defaultdict(int)
+        # Values that are not numbers at all (read as 0)
+        self.parse_failures = defaultdict(int)
+        self.samples = {}
+        # Broken invariants (see invariants.py), with a few examples each
+        self.violations = defaultdict(int)
+        self.violation_samples = {}
+
+    @property
+    def rows(self):
+        return self.accepted + sum(self.rejected.values())
+
+    def parse_failure(self, column, value):
+        """Count an unreadable value and keep it as an example"""
+        self.parse_failures[column] += 1
+        samples = self.samples.setdefault(column, [])
+        if len(samples) < SAMPLE_SIZE and value not in samples:
+            samples.append(value)
+
+    def violation(self, rule, detail):
+        """Count a broken invariant and keep its description as an example"""
+        self.violations[rule] += 1
+        samples = self.violation_samples.setdefault(rule, [])
+        if len(samples) < SAMPLE_SIZE:
+            samples.append(detail)
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "accepted": self.accepted,
+            "seconds": round(self.seconds, 3),
+            "rejected": dict(sorted(self.rejected.items())),
+            "missing_values": dict(sorted(self.missing.items())),
+            "parse_failures": {
+                column: {"count": count, "samples": self.samples.get(column, [])}
+                for column, count in sorted(self.parse_failures.items())
+            },
+            "invariant_violations": {
+                rule: {"count": count, "samples": self.violation_samples.get(rule, [])}
+                for rule, count in sorted(self.violations.items())
+            },
+        }
+
+    def print_summary(self):
+        print(f"   {self.name} scan: {self.rows} rows, {self.accepted} accepted in {self.seconds:.2f}s")
+        for reason, count in sorted(self.rejected.items()):
+            print(f"     - rejected {count} ({reason})")
+        for column, count in sorted(self.parse_failures.items()):
+            print(f"     - {count} unreadable values in {column}, e.g. {self.samples.get(column, [])}")
+        for rule, count in sorted(self.violations.items()):
+            print(f"     ✗ {count} invariant violations ({rule}), e.g. {self.violation_samples.get(rule, [])}")
+
+
+def write_run_report(path, scans, **extra):
+    """Write the counters of all scans (plus extra sections) as JSON"""
+    report = {
+        "generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "scans": {stats.name: stats.as_dict() for stats in scans},
+    }
+    report.update(extra)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return report
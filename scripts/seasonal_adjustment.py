@@ -0,0 +1,93 @@
+"""
+Seasonal adjustment of every monthly bankruptcy series.
+Classical additive decomposition: a centred 2x12 moving average gives the
+trend, the average deviation from it per calendar month gives the seasonal
+component, and the adjusted series is the monthly value minus that component.
+Unlike the 12-month rolling sum it does not lag turning points by half a year.
+All geography x sector series are laid out time-major (as in anomaly_scan.py),
+so each step is one batched operation over all series per month instead of a
+loop per series.
+"""
+import json
+from operator import add, sub
+
+from anomaly_scan import monthly_matrix
+from prefix_index import SECTORS
+
+PERIOD = 12
+HALF = PERIOD // 2
+
+# Without two full years there is nothing to estimate the seasonal pattern from
+MIN_MONTHS = 2 * PERIOD
+
+
+def seasonal_components(months, cumulative, first_month_index):
+    """Seasonal component per calendar month (0 = January), for all series
+
+    months: time-major monthly values; cumulative: their running sums (one
+    row more); first_month_index: calendar month of the first row (0-11).
+    """
+    width = len(months[0])
+    sums = [[0.0] * width for _ in range(PERIOD)]
+    counts = [0] * PERIOD
+
+    # 2x12 centred moving average from the running sums:
+    # (sum x[t-6..t+5] + sum x[t-5..t+6]) / 24
+    for t in range(HALF, len(months) - HALF):
+        lo, lo_next = cumulative[t - HALF], cumulative[t - HALF + 1]
+        hi, hi_next = cumulative[t + HALF], cumulative[t + HALF + 1]
+        window = map(add, map(sub, hi, lo), map(sub, hi_next, lo_next))
+        deviation = [x - w / (2 * PERIOD) for x, w in zip(months[t], window)]
+        month = (first_month_index + t) % PERIOD
+        sums[month] = list(map(add, sums[month], deviation))
+        counts[month] += 1
+
+    components = [[s / counts[m] for s in sums[m]] if counts[m] else [0.0] * width for m in range(PERIOD)]
+    # Centre the components so they cancel out over a year
+    mean = [sum(column) / PERIOD for column in zip(*components)]
+    return [list(map(sub, component, mean)) for component in components]
+
+
+def seasonally_adjust(index, geos):
+    """Adjusted monthly values and seasonal components of every geography x sector series
+
+    Returns (keys, adjusted rows, components): adjusted[t][j] belongs to
+    index.months[t] and series keys[j]; components[m][j] to calendar month m.
+    """
+    keys, cumulative, months = monthly_matrix(index, geos)
+    if len(months) < MIN_MONTHS:
+        return keys, months, [[0.0] * len(keys) for _ in range(PERIOD)]
+
+    first_month_index = index.origin % PERIOD
+    components = seasonal_components(months, cumulative, first_month_index)
+    adjusted = [list(map(sub, row, components[(first_month_index + t) % PERIOD]))
+                for t, row in enumerate(months)]
+    return keys, adjusted, components
+
+
+def by_geography(keys, adjusted):
+    """Time-major rows to {geo: {sector: [values]}}"""
+    series = {}
+    for j, (geo, sector) in enumerate(keys):
+        series.setdefault(geo, {})[sector] = [row[j] for row in adjusted]
+    return series
+
+
+def write_seasonal_adjustment(path, index, keys, adjusted, components, geo_names):
+    """Write the adjusted series and the seasonal components as compact JSON"""
+    series = {}
+    for j, (geo, sector) in enumerate(keys):
+        series.setdefault(geo_names[geo], {})[sector] = {
+            "adjusted": [round(row[j], 2) for row in adjusted],
+            "seasonal": [round(component[j], 2) for component in components],
+        }
+
+    payload = {
+        "method": "classical additive decomposition, centred 2x12 moving average",
+        "first_month": index.first_month,
+        "sectors": list(SECTORS),
+        "series": series,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    return len(keys)
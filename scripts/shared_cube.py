@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Publish a finished SparseCube into shared memory for other processes.
+The cells are laid out column-wise in one multiprocessing.shared_memory
+segment: one uint32 array of dimension codes per dimension and one float64
+array per measure, after a small JSON header with the dimension index (the
+decoded values and labels). Readers attach by name and get typed memoryviews
+on the segment, so nothing is copied or unpickled.
+
+The publishing process owns the segment and unlinks it when it is closed,
+at interpreter exit, or on SIGTERM; attached readers only close their view.
+
+    python3 scripts/shared_cube.py serve              # publish both cubes until Ctrl-C
+    python3 scripts/shared_cube.py query NAME --by geo,year
+"""
+import argparse
+import atexit
+import json
+import os
+import signal
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+MAGIC = b"SCUB"
+HEADER = struct.Struct("<4sI")
+ALIGN = 8
+CODE_TYPE, MEASURE_TYPE = "I", "d"
+
+# Segments published by this process, unlinked at exit if still open
+_owned = {}
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _unlink_owned():
+    for cube in list(_owned.values()):
+        cube.close()
+
+
+atexit.register(_unlink_owned)
+
+
+class SharedCube:
+    """Read-only view of a cube in a shared memory segment"""
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.name = shm.name
+        # Forked workers inherit the object but must not unlink the segment
+        self.owner = os.getpid() if owner else None
+        magic, length = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{shm.name} is not a shared cube segment")
+        meta = json.loads(bytes(shm.buf[HEADER.size:HEADER.size + length]))
+        self.dims = tuple(meta["dims"])
+        self.measures = tuple(meta["measures"])
+        self.values = meta["values"]
+        self.labels = meta["labels"]
+        self.size = meta["cells"]
+
+        # Typed views on the segment; released before the segment is closed
+        self._views = []
+        self.codes = [self._view(offset, CODE_TYPE) for offset in meta["code_offsets"]]
+        self.columns = [self._view(offset, MEASURE_TYPE) for offset in meta["measure_offsets"]]
+
+    def _view(self, offset, typecode):
+        width = struct.calcsize(typecode)
+        view = self.shm.buf[offset:offset + self.size * width].cast(typecode)
+        self._views.append(view)
+        return view
+
+    @classmethod
+    def publish(cls, cube, name=None):
+        """Copy a SparseCube into a new segment owned by this process"""
+        meta = {
+            "dims": list(cube.dims),
+            "measures": list(cube.measures),
+            "values": cube.values,
+            "labels": cube.labels,
+            "cells": len(cube),
+        }
+        # Offsets depend on the header length, which depends on the offsets' digits;
+        # reserving room for the largest offset keeps this one pass
+        code_bytes = len(cube) * struct.calcsize(CODE_TYPE)
+        measure_bytes = len(cube) * struct.calcsize(MEASURE_TYPE)
+        arrays = len(cube.dims) + len(cube.measures)
+        header_guess = len(json.dumps(meta).encode("utf-8")) + arrays * 24 + 64
+        data_start = offset = _aligned(HEADER.size + header_guess)
+        meta["code_offsets"], meta["measure_offsets"] = [], []
+        for _ in cube.dims:
+            meta["code_offsets"].append(offset)
+            offset = _aligned(offset + code_bytes)
+        for _ in cube.measures:
+            meta["measure_offsets"].append(offset)
+            offset = _aligned(offset + measure_bytes)
+        header = json.dumps(meta).encode("utf-8")
+        if HEADER.size + len(header) > data_start:
+            raise ValueError("shared cube header does not fit")
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(offset, data_start))
+        HEADER.pack_into(shm.buf, 0, MAGIC, len(header))
+        shm.buf[HEADER.size:HEADER.size + len(header)] = header
+
+        shared = cls(shm, owner=True)
+        for i, (key, totals) in enumerate(cube.cells.items()):
+            for column, code in zip(shared.codes, key):
+                column[i] = code
+            for column, value in zip(shared.columns, totals):
+                column[i] = value
+        _owned[shared.name] = shared
+        return shared
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to a published segment without copying it"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 registers every attach with the resource tracker, which
+            # child processes share with the owner; skip the registration instead
+            # of unregistering, which would drop the owner's entry
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    def close(self):
+        """Release the views; the owner also removes the segment"""
+        if self.shm is None:
+            return
+        for view in self._views:
+            view.release()
+        self._views = []
+        self.codes = self.columns = []
+        self.shm.close()
+        if self.owner == os.getpid():
+            self.shm.unlink()
+        _owned.pop(self.name, None)
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def members(self, dim):
+        return list(self.values[self.dims.index(dim)])
+
+    def marginal(self, dims):
+        """Sum over all dimensions not in dims, as SparseCube.marginal()"""
+        axes = [self.dims.index(d) for d in dims]
+        decoders = [self.values[a] for a in axes]
+        result = {}
+        for key, *values in zip(zip(*(self.codes[a] for a in axes)), *self.columns):
+            totals = result.get(key)
+            if totals is None:
+                result[key] = values
+            else:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return {tuple(decoder[code] for decoder, code in zip(decoders, key)): totals
+                for key, totals in result.items()}
+
+    def totals(self):
+        return [sum(column) for column in self.columns]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or query cubes in shared memory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Build both cubes and keep them published until interrupted")
+    serve.add_argument("--prefix", default="statbel", help="Segment name prefix")
+    query = commands.add_parser("query", help="Attach to a published cube and print a marginal")
+    query.add_argument("name", help="Segment name printed by 'serve'")
+    query.add_argument("--by", required=True, metavar="DIM1,DIM2", help="Dimensions to keep")
+    args = parser.parse_args()
+
+    if args.command == "query":
+        with SharedCube.attach(args.name) as cube:
+            dims = args.by.split(",")
+            print("|".join(dims + list(cube.measures)))
+            for key, totals in sorted(cube.marginal(dims).items()):
+                print("|".join(list(key) + [f"{value:g}" for value in totals]))
+        return
+
+    from extract_chart_data_per_province import build_bankruptcy_cube, build_survival_cube
+
+    # Unlink on SIGTERM as well as on Ctrl-C and normal exit
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    published = [
+        SharedCube.publish(build_survival_cube()[0], f"{args.prefix}_survival"),
+        SharedCube.publish(build_bankruptcy_cube()[0], f"{args.prefix}_bankruptcy"),
+    ]
+    for cube in published:
+        print(f"Published {cube.name}: {len(cube)} cells, {cube.shm.size / 1e6:.1f} MB "
+              f"(dims: {', '.join(cube.dims)})")
+    print("Press Ctrl-C to unpublish")
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
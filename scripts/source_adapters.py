@@ -0,0 +1,163 @@
+"""
+Declarative adapters for the Statbel open-data sources.
+An adapter says where a dataset is downloaded from, which file in the archive
+holds it, and how its columns map onto cube dimensions and measures. The
+download stages (update_data.py), the cube builder, the build graph and the
+tidy export (extract_chart_data_per_province.py) all work from SOURCES, so a
+new dataset is one more adapter here instead of another scan loop.
+
+Every source is per geography: the province and region columns are mapped to
+the 'geo' dimension (Brussels has no province) by the pipeline and are not
+declared per adapter.
+"""
+import os
+from datetime import datetime
+
+from invariants import check_survivors
+
+# Base URL of the Statbel open data; tests point it at a local stand-in (statbel_stand_in.py)
+STATBEL_OPENDATA = os.environ.get("STATBEL_OPENDATA_URL",
+                                  "https://statbel.fgov.be/sites/default/files/files/opendata").rstrip("/")
+
+# Columns every source has; mapped to the 'geo' dimension by the pipeline
+PROVINCE_COLUMN = "CD_PROV_REFNIS"
+REGION_COLUMN = "CD_RGN_REFNIS"
+
+
+class Dimension:
+    """A cube dimension read from one column
+
+    column: the column name, or a tuple of alternatives (the first one present
+    in the file is used; a dimension without any is empty).
+    required: reject reason for rows where the value is empty.
+    label: column with the display label of the value (kept in cube.labels).
+    transform: applied to the stripped value, e.g. to zero-pad months.
+    """
+
+    def __init__(self, name, column, required=None, label=None, transform=None):
+        self.name = name
+        self.columns = column if isinstance(column, tuple) else (column,)
+        self.required = required
+        self.label = label
+        self.transform = transform
+
+    def column_in(self, header):
+        return next((column for column in self.columns if column in header), self.columns[0])
+
+
+class Measure:
+    """A summed cube measure; rows where it is 0 are rejected with the reason in nonzero"""
+
+    def __init__(self, name, column, nonzero=None):
+        self.name = name
+        self.column = column
+        self.nonzero = nonzero
+
+
+class SourceAdapter:
+    """One Statbel dataset: download location, file, dimensions and measures
+
+    urls: URL patterns tried in order; '{year}' is filled in with the current
+    and then the previous year (for archives named after their year).
+    calendar: the dimensions that make up the period (('year',) or ('year', 'month')).
+    sector: the dimension with the NACE section.
+    marginals: the cube dims the outputs read marginals over (or over subsets of
+    them). With a memory budget only these are kept, not the cells; the first
+    one is the level of the release diff then.
+    row_check: optional invariant check per accepted row, row_check(stats, geo, keys, totals).
+    """
+
+    def __init__(self, name, stage, member, urls, dims, measures, calendar, sector, marginals, row_check=None):
+        self.name = name
+        self.stage = stage
+        self.member = member
+        self.archive = member.rsplit(".", 1)[0] + ".zip"
+        self.url_patterns = tuple(urls)
+        self.dims = tuple(dims)
+        self.measures = tuple(measures)
+        self.calendar = tuple(calendar)
+        self.sector = sector
+        self.marginals = tuple(tuple(dims) for dims in marginals)
+        self.row_check = row_check
+
+    @property
+    def cube_dims(self):
+        return ("geo",) + tuple(dim.name for dim in self.dims)
+
+    @property
+    def cube_measures(self):
+        return tuple(measure.name for measure in self.measures)
+
+    def urls(self, now=None):
+        """Candidate download URLs, most recent first"""
+        year = (now or datetime.now()).year
+        urls = []
+        for pattern in self.url_patterns:
+            for candidate in ((pattern.format(year=year), pattern.format(year=year - 1))
+                              if "{year}" in pattern else (pattern,)):
+                if candidate not in urls:
+                    urls.append(candidate)
+        return urls
+
+
+def _check_survivors(stats, geo, keys, totals):
+    first_registrations, survivors = totals[0], totals[1:]
+    if max(survivors) > first_registrations or min(survivors) < 0:
+        check_survivors(stats, f"{geo} {keys[0]} {keys[1]}", first_registrations, survivors)
+
+
+def _check_non_negative(stats, geo, keys, totals):
+    bankruptcies, workers = totals
+    if bankruptcies < 0 or workers < 0:
+        stats.violation("negative_count", f"{geo} {keys[1]}-{keys[2]} {keys[3]}: "
+                                          f"bankruptcies={bankruptcies:g} workers={workers:g}")
+
+
+SURVIVALS = SourceAdapter(
+    name="survival",
+    stage="survivals",
+    member="TF_VAT_SURVIVALS.txt",
+    urls=[f"{STATBEL_OPENDATA}/TF_VAT_SURVIVAL/TF_VAT_SURVIVALS.zip"],
+    dims=[
+        Dimension("year", "CD_YEAR", required="empty_year"),
+        Dimension("nace", "CD_NACE_LVL1", required="empty_nace"),
+        Dimension("size_class", "CD_CLS_WRKR", label="TX_CLS_WRKR_NL"),
+        Dimension("person_type", "CD_PERS_TYPE"),
+    ],
+    measures=[Measure("first_registrations", "MS_CNT_FIRST_REGISTRATIONS", nonzero="zero_registrations")]
+             + [Measure(f"surv_{n}", f"MS_CNT_SURV_YEAR_{n}") for n in range(1, 6)],
+    calendar=("year",),
+    sector="nace",
+    # The chart marginals, the attrition and size analyses, and the tidy export
+    marginals=[("geo", "year", "nace", "size_class")],
+    row_check=_check_survivors,
+)
+
+BANKRUPTCIES = SourceAdapter(
+    name="bankruptcy",
+    stage="bankruptcies",
+    member="TF_BANKRUPTCIES.txt",
+    # The archive name contains the year; a new year's file may not exist yet
+    urls=[f"{STATBEL_OPENDATA}/BRI_Nace/TF_BANKRUPTCIES%28{{year}}%29.zip"],
+    dims=[
+        Dimension("municipality", ("CD_MUNTY_REFNIS", "CD_REFNIS")),
+        Dimension("year", "CD_YEAR", required="empty_year"),
+        # Rows without a month keep month '' and count in the yearly totals only
+        Dimension("month", "CD_MONTH", transform=lambda month: month.zfill(2) if month else month),
+        Dimension("nace", "TX_NACE_REV2_SECTION"),
+        Dimension("legal_form", "CD_LEGAL_FORM", label="TX_LEGAL_FORM_NL"),
+    ],
+    measures=[
+        Measure("bankruptcies", "MS_COUNTOF_BANKRUPTCIES", nonzero="zero_bankruptcies"),
+        Measure("workers", "MS_COUNTOF_WORKERS"),
+    ],
+    calendar=("year", "month"),
+    sector="nace",
+    # The monthly chart series and the tidy export, and the municipality map
+    marginals=[("geo", "year", "month", "nace"), ("municipality", "year", "nace")],
+    row_check=_check_non_negative,
+)
+
+# Download and processing order
+SOURCES = (BANKRUPTCIES, SURVIVALS)
+SOURCES_BY_NAME = {source.name: source for source in SOURCES}
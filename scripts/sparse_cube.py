@@ -0,0 +1,251 @@
+"""
+Sparse multi-dimensional cube of the Statbel counts.
+Cells are stored as a hash map from a coordinate tuple to the measure values,
+so memory scales with the number of non-empty cells rather than with the cross
+product of the dimensions. Dimension values are dictionary-encoded as small
+ints. Marginals over any subset of dimensions are summed from the smallest
+already computed marginal that contains them and cached.
+
+A cube too large for memory can be filled with add_streamed() instead: the
+(coords, values) stream, e.g. the merged runs of a SpillingAggregator, is summed
+straight into a few kept marginals and the cells are never held.
+"""
+import json
+import struct
+import sys
+from array import array
+from operator import getitem, itemgetter
+
+# save()/load() file layout: header length, JSON header, code columns, measure columns
+FILE_MAGIC = b"SCUF"
+FILE_HEADER = struct.Struct("<4sI")
+CODE_TYPE, MEASURE_TYPE = "I", "d"
+
+
+class SparseCube:
+    """Hash-based sparse cube: {(code per dimension): [measure values]}"""
+
+    def __init__(self, dims, measures):
+        self.dims = tuple(dims)
+        self.measures = tuple(measures)
+        # Dictionary encoding per dimension: values[i][code] -> original value
+        self.values = [[] for _ in self.dims]
+        self._codes = [{} for _ in self.dims]
+        self.cells = {}
+        # Optional display labels per dimension, e.g. legal form code -> name
+        self.labels = {}
+        self._marginals = {}
+        # Marginals kept instead of the cells (add_streamed); never cleared
+        self._kept = {}
+
+    def _encode(self, axis, value):
+        codes = self._codes[axis]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[axis])
+            self.values[axis].append(value)
+        return code
+
+    def add(self, coords, values):
+        """Add measure values to the cell at coords (one value per dimension)"""
+        key = tuple(self._encode(axis, value) for axis, value in enumerate(coords))
+        totals = self.cells.get(key)
+        if totals is None:
+            self.cells[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                totals[i] += value
+        self._marginals.clear()
+
+    def add_streamed(self, items, marginals):
+        """Sum a stream of (coords, values) into the marginals over these dims, without keeping the cells
+
+        Afterwards only marginals over (subsets of) one of these dims can be
+        asked for; save() and the cells are not available.
+        """
+        kept = [(tuple(sorted(self._axes(dims))), {}) for dims in marginals]
+        projections = [(itemgetter(*axes) if len(axes) > 1 else (lambda key, axis=axes[0]: (key[axis],)), cells)
+                       for axes, cells in kept]
+        for coords, values in items:
+            key = tuple(self._encode(axis, value) for axis, value in enumerate(coords))
+            for project, cells in projections:
+                target = project(key)
+                totals = cells.get(target)
+                if totals is None:
+                    cells[target] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        totals[i] += value
+        self._kept.update(kept)
+        self._marginals.clear()
+
+    @property
+    def streamed(self):
+        return bool(self._kept)
+
+    def project(self, dims):
+        """A new cube of the marginal over dims, with its cells"""
+        cube = SparseCube(dims, self.measures)
+        for coords, values in self.marginal(dims).items():
+            cube.add(coords, values)
+        cube.labels = {dim: labels for dim, labels in self.labels.items() if dim in dims}
+        return cube
+
+    def scale(self, weight):
+        """Multiply the measures of every cell by weight(coords)"""
+        for key, totals in self.cells.items():
+            factor = weight(tuple(map(getitem, self.values, key)))
+            totals[:] = [value * factor for value in totals]
+        self._marginals.clear()
+
+    def set_label(self, dim, value, label):
+        """Remember the display label of a dimension value"""
+        if label:
+            self.labels.setdefault(dim, {})[value] = label
+
+    def __len__(self):
+        """Non-empty cells; for a streamed cube, those of its largest kept marginal"""
+        if self._kept:
+            return max(map(len, self._kept.values()))
+        return len(self.cells)
+
+    def _axes(self, dims):
+        unknown = [d for d in dims if d not in self.dims]
+        if unknown:
+            raise KeyError(f"Unknown cube dimensions: {', '.join(unknown)}")
+        return tuple(self.dims.index(d) for d in dims)
+
+    def _marginal_cells(self, axes):
+        """Encoded cells summed down to axes (sorted tuple of dimension positions)"""
+        cached = self._kept.get(axes) or self._marginals.get(axes)
+        if cached is not None:
+            return cached
+        if axes == tuple(range(len(self.dims))) and not self._kept:
+            return self.cells
+
+        # Start from the smallest cached (or kept) marginal that still has all axes
+        source_axes, source = tuple(range(len(self.dims))), self.cells
+        if self._kept:
+            covering = [(kept_axes, cells) for kept_axes, cells in self._kept.items() if set(axes) <= set(kept_axes)]
+            if not covering:
+                names = ", ".join(self.dims[a] for a in axes)
+                raise KeyError(f"Marginal over {names} is not kept by this streamed cube")
+            source_axes, source = min(covering, key=lambda item: len(item[1]))
+        for cached_axes, cells in list(self._marginals.items()):
+            if set(axes) <= set(cached_axes) and len(cells) < len(source):
+                source_axes, source = cached_axes, cells
+
+        positions = [source_axes.index(a) for a in axes]
+        project = itemgetter(*positions) if len(positions) > 1 else (
+            (lambda key: (key[positions[0]],)) if positions else (lambda key: ()))
+
+        result = {}
+        for key, values in source.items():
+            target = project(key)
+            totals = result.get(target)
+            if totals is None:
+                result[target] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        self._marginals[axes] = result
+        return result
+
+    def marginal(self, dims):
+        """Sum over all dimensions not in dims: {(value per dim): [measures]}
+
+        The key tuple follows the order of dims.
+        """
+        axes = self._axes(dims)
+        order = tuple(sorted(axes))
+        cells = self._marginal_cells(order)
+        positions = [order.index(a) for a in axes]
+        decoders = [self.values[a] for a in axes]
+        return {
+            tuple(decoder[key[p]] for decoder, p in zip(decoders, positions)): list(values)
+            for key, values in cells.items()
+        }
+
+    def totals(self):
+        """Grand total of every measure"""
+        return self._marginal_cells(()).get((), [0] * len(self.measures))
+
+    def members(self, dim):
+        """Distinct values of one dimension"""
+        return list(self.values[self.dims.index(dim)])
+
+    def code_map(self, dim):
+        """{value: code} of one dimension"""
+        return dict(self._codes[self.dims.index(dim)])
+
+    def save(self, path, meta=None):
+        """Write the cube column-wise (little-endian typed arrays after a JSON header)
+
+        meta: extra JSON-serialisable header fields, returned by load_meta().
+        """
+        if self._kept:
+            raise ValueError("A streamed cube has no cells to save; save a project()ed marginal instead")
+        header = json.dumps({
+            "dims": list(self.dims),
+            "measures": list(self.measures),
+            "values": self.values,
+            "labels": self.labels,
+            "cells": len(self.cells),
+            "meta": meta or {},
+        }, ensure_ascii=False).encode('utf-8')
+        swap = sys.byteorder != "little"
+        with open(path, 'wb') as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, len(header)))
+            f.write(header)
+            keys = list(self.cells)
+            for axis in range(len(self.dims)):
+                column = array(CODE_TYPE, (key[axis] for key in keys))
+                if swap:
+                    column.byteswap()
+                column.tofile(f)
+            totals = list(self.cells.values())
+            for i in range(len(self.measures)):
+                column = array(MEASURE_TYPE, (values[i] for values in totals))
+                if swap:
+                    column.byteswap()
+                column.tofile(f)
+
+    @staticmethod
+    def _read_header(f):
+        magic, length = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{f.name} is not a saved cube")
+        return json.loads(f.read(length))
+
+    @classmethod
+    def load_schema(cls, path):
+        """(dims, measures) of a saved cube, without reading the cells"""
+        with open(path, 'rb') as f:
+            header = cls._read_header(f)
+        return tuple(header["dims"]), tuple(header["measures"])
+
+    @classmethod
+    def load_meta(cls, path):
+        """The meta fields passed to save(), without reading the cells"""
+        with open(path, 'rb') as f:
+            return cls._read_header(f)["meta"]
+
+    @classmethod
+    def load(cls, path):
+        """Read a cube written by save()"""
+        with open(path, 'rb') as f:
+            header = cls._read_header(f)
+            columns = []
+            for typecode in [CODE_TYPE] * len(header["dims"]) + [MEASURE_TYPE] * len(header["measures"]):
+                column = array(typecode)
+                column.fromfile(f, header["cells"])
+                if sys.byteorder != "little":
+                    column.byteswap()
+                columns.append(column)
+        cube = cls(header["dims"], header["measures"])
+        cube.values = header["values"]
+        cube._codes = [{value: code for code, value in enumerate(values)} for values in cube.values]
+        cube.labels = header["labels"]
+        codes, measures = columns[:len(cube.dims)], columns[len(cube.dims):]
+        cube.cells = dict(zip(zip(*codes), map(list, zip(*measures))))
+        return cube
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Statbel open-data server, for testing the download
+stages and watch mode (watch_data.py) without the network.
+build_archives() zips the raw .txt files of every source adapter under the
+same paths Statbel serves them at; serve() answers HEAD and GET for them with
+Last-Modified, Content-Length and an ETag, so remote fingerprints change when
+an archive is rebuilt. Point the pipeline at it with STATBEL_OPENDATA_URL.
+"""
+import argparse
+import http.server
+import sys
+import threading
+import zipfile
+from functools import partial
+from pathlib import Path
+from urllib.parse import unquote
+
+from source_adapters import SOURCES, STATBEL_OPENDATA
+
+
+def archive_path(root, url):
+    """Local file for a source URL: its path below the open-data base URL, unquoted"""
+    return Path(root) / unquote(url[len(STATBEL_OPENDATA):].lstrip("/"))
+
+
+def build_archives(raw_dir, root, now=None):
+    """Zip each source's raw file to the first URL it is downloaded from; returns the archive paths"""
+    archives = []
+    for source in SOURCES:
+        raw = Path(raw_dir) / source.member
+        if not raw.exists():
+            print(f"✗ {raw} not found, {source.archive} not served")
+            continue
+        path = archive_path(root, source.urls(now)[0])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(raw, source.member)
+        archives.append(path)
+    return archives
+
+
+class StandInHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with an ETag of their modification time and size"""
+
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        self._etag = None
+        if path.is_file():
+            stat = path.stat()
+            self._etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, "_etag", None):
+            self.send_header("ETag", self._etag)
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(root, port=0):
+    """Serve root on localhost in a daemon thread; returns (server, base URL)
+
+    Stop it with server.shutdown(). Port 0 picks a free port.
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), partial(StandInHandler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the raw Statbel files as a local stand-in for the open-data server")
+    parser.add_argument("--raw", type=Path, required=True, help="Directory with the raw .txt files")
+    parser.add_argument("--root", type=Path, required=True, help="Directory to build and serve the archives from")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for path in build_archives(args.raw, args.root):
+        print(f"✓ Built {path.relative_to(args.root)}")
+    server, url = serve(args.root, args.port)
+    print(f"Serving {args.root} at {url}")
+    print(f"Use: STATBEL_OPENDATA_URL={url} python scripts/watch_data.py")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
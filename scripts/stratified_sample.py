@@ -0,0 +1,221 @@
+"""
+Stratified row sampling for quick previews of the pipeline (--sample).
+Rows are stratified by (geography, sector, year). Within a stratum the rows
+are split into blocks of `step` = round(1 / fraction) consecutive rows and one
+row per block is kept, at a position drawn from a generator seeded with the
+seed and the stratum. A preview is therefore reproducible, a periodic file
+order (twelve months per municipality) cannot line up with the step, and every
+stratum keeps at least one row. Kept rows are weighted by N_h / n_h: the rows
+read over the rows kept in their stratum.
+
+Standard errors treat each stratum as a simple random sample without
+replacement: for an output cell d the variance in stratum h is
+N_h^2 (1 - n_h / N_h) s_hd^2 / n_h, with s_hd^2 the sample variance of the row
+values counted in d (0 for the stratum's other rows). Strata are independent,
+so the variances of a cell that spans strata (a region) add up. The bounds use
+Student's t with Welch-Satterthwaite degrees of freedom, as strata keep few rows.
+"""
+import json
+import math
+import random
+from operator import getitem
+
+# 97.5% quantiles of the normal distribution and of Student's t with 1..30 degrees of freedom
+Z_95 = 1.96
+T_975 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+         2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+         2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+class StratifiedSample:
+    """Which rows to keep, and the counts to scale them up with
+
+    stratum_dims: the cube dimensions the strata are formed from, e.g.
+    ('geo', 'nace', 'year'); stratum_key maps their values to the stratum,
+    e.g. a NACE section to its sector.
+    """
+
+    def __init__(self, fraction, seed, stratum_dims, stratum_key=tuple):
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Sample fraction must be in (0, 1], got {fraction}")
+        self.step = max(1, round(1 / fraction))
+        self.fraction = 1 / self.step
+        self.seed = seed
+        self.stratum_dims = tuple(stratum_dims)
+        self.stratum_key = stratum_key
+        # Rows read (N_h) and kept (n_h) per stratum
+        self.rows = {}
+        self.kept = {}
+        self._generators = {}
+        self._picks = {}
+        # Sum of the squared row values per cube cell and measure
+        self.squares = {}
+
+    def _generator(self, stratum):
+        generator = self._generators.get(stratum)
+        if generator is None:
+            generator = self._generators[stratum] = random.Random(f"{self.seed}|{'|'.join(stratum)}")
+        return generator
+
+    def _keep(self, stratum, block):
+        self.kept[stratum] = self.kept.get(stratum, 0) + 1
+        return block[self._generator(stratum).randrange(len(block))]
+
+    def select(self, rows, stratum_values):
+        """Yield the kept rows; stratum_values(row) gives a row's stratum_dims values
+
+        The first block of each stratum is buffered and its pick made when the
+        block is complete, or at the end for strata with fewer rows than a
+        block, so every stratum keeps at least one row. Later blocks are
+        decided row by row.
+        """
+        step = self.step
+        first = {}
+        for row in rows:
+            stratum = self.stratum_key(stratum_values(row))
+            position = self.rows.get(stratum, 0)
+            self.rows[stratum] = position + 1
+            block, offset = divmod(position, step)
+            if block == 0:
+                buffered = first.setdefault(stratum, [])
+                buffered.append(row)
+                if offset == step - 1:
+                    yield self._keep(stratum, first.pop(stratum))
+                continue
+            if offset == 0:
+                self._picks[stratum] = self._generator(stratum).randrange(step)
+            if offset == self._picks[stratum]:
+                self.kept[stratum] += 1
+                yield row
+        for stratum, buffered in first.items():
+            yield self._keep(stratum, buffered)
+
+    def record(self, coords, values):
+        """Remember the squares of a kept row's values, for the standard errors"""
+        squares = self.squares.get(coords)
+        if squares is None:
+            self.squares[coords] = [value * value for value in values]
+        else:
+            for i, value in enumerate(values):
+                squares[i] += value * value
+
+    def weight(self, stratum):
+        kept = self.kept.get(stratum)
+        return self.rows[stratum] / kept if kept else 0.0
+
+    def _stratum_of(self, cube):
+        axes = [cube.dims.index(dim) for dim in self.stratum_dims]
+        key = self.stratum_key
+        return lambda coords: key(tuple(coords[axis] for axis in axes))
+
+    def scale(self, cube):
+        """Scale the sampled cube's cells up to estimates of the full totals"""
+        stratum_of = self._stratum_of(cube)
+        cube.scale(lambda coords: self.weight(stratum_of(coords)))
+
+    def cell_errors(self, cube, dims, domain_of=tuple):
+        """{cell: (estimates, variances, dof)} of the scaled cube summed to dims
+
+        domain_of maps the values of dims to the output cell (e.g. NACE section
+        to sector). A variance is None when a stratum of the cell has a single
+        kept row; dof holds the Welch-Satterthwaite sums, see margin().
+        """
+        stratum_of = self._stratum_of(cube)
+        axes = [cube.dims.index(dim) for dim in dims]
+        # Sums and sums of squares of the kept rows per (cell, stratum)
+        sums = {}
+        for key, values in cube.cells.items():
+            coords = tuple(map(getitem, cube.values, key))
+            stratum = stratum_of(coords)
+            weight = self.weight(stratum)
+            cell = (domain_of(tuple(coords[axis] for axis in axes)), stratum)
+            entry = sums.get(cell)
+            if entry is None:
+                entry = sums[cell] = [[0.0] * len(values), [0.0] * len(values)]
+            for i, (value, square) in enumerate(zip(values, self.squares[coords])):
+                entry[0][i] += value / weight
+                entry[1][i] += square
+
+        cells = {}
+        for (cell, stratum), (totals, squares) in sums.items():
+            rows, kept = self.rows[stratum], self.kept[stratum]
+            estimates, variances, dof = cells.setdefault(cell, tuple([0.0] * len(totals) for _ in range(3)))
+            for i, (total, square) in enumerate(zip(totals, squares)):
+                estimates[i] += total * rows / kept
+                if kept < 2:
+                    variances[i] = None
+                elif variances[i] is not None:
+                    spread = max(square - total * total / kept, 0.0) / (kept - 1)
+                    variance = rows * rows * (1 - kept / rows) * spread / kept
+                    variances[i] += variance
+                    dof[i] += variance * variance / (kept - 1)
+        return cells
+
+
+def add_groups(cells, groups):
+    """Add group cells (e.g. regions) as sums of their members' cells; cells are keyed (geo, ...)"""
+    for name, members in groups.items():
+        for (geo, *rest), (estimates, variances, dof) in list(cells.items()):
+            if geo not in members:
+                continue
+            group = cells.setdefault((name, *rest), tuple([0.0] * len(estimates) for _ in range(3)))
+            for i, (estimate, variance) in enumerate(zip(estimates, variances)):
+                group[0][i] += estimate
+                if variance is None or group[1][i] is None:
+                    group[1][i] = None
+                else:
+                    group[1][i] += variance
+                    group[2][i] += dof[i]
+    return cells
+
+
+def t_quantile(dof):
+    """97.5% quantile of Student's t, exact to three decimals up to 30 degrees of freedom"""
+    if dof <= len(T_975):
+        return T_975[max(1, math.floor(dof)) - 1]
+    return Z_95 + (Z_95 ** 3 + Z_95) / (4 * dof)
+
+
+def margin(variance, dof):
+    """Half-width of the 95% bounds; dof is the Welch-Satterthwaite sum of a cell (0 without spread)"""
+    if not variance:
+        return 0.0
+    return t_quantile(variance * variance / dof) * math.sqrt(variance)
+
+
+def _bounds(estimate, variance, dof):
+    """Estimate and 95% bounds; the measures are counts, so the lower bound stops at 0"""
+    if variance is None:
+        return [round(estimate, 1), None, None]
+    half = margin(variance, dof)
+    return [round(estimate, 1), round(max(estimate - half, 0.0), 1), round(estimate + half, 1)]
+
+
+def error_table(cells, dims, measures, names=None):
+    """Columns and rows (estimate, low, high per measure) of the cells, sorted"""
+    names = names or {}
+    columns = list(dims)
+    for measure in measures:
+        columns += [measure, f"{measure}_low95", f"{measure}_high95"]
+    rows = []
+    for (geo, *rest), (estimates, variances, dof) in sorted(cells.items()):
+        row = [names.get(geo, geo), *rest]
+        for estimate, variance, terms in zip(estimates, variances, dof):
+            row += _bounds(estimate, variance, terms)
+        rows.append(row)
+    return {"columns": columns, "rows": rows}
+
+
+def median_margin(cells, measure=0):
+    """Median relative half-width of the 95% bounds of one measure, over cells with a nonzero estimate"""
+    margins = sorted(margin(variances[measure], dof[measure]) / abs(estimates[measure])
+                     for estimates, variances, dof in cells.values()
+                     if estimates[measure] and variances[measure] is not None)
+    return margins[len(margins) // 2] if margins else None
+
+
+def write_sample_errors(path, sample_info, sources):
+    """Write the error report: the sample design plus one table per source and output level"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({**sample_info, "confidence": 0.95, "sources": sources}, f, ensure_ascii=False,
+                  separators=(',', ':'))
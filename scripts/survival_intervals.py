@@ -0,0 +1,52 @@
+"""
+Confidence intervals for the survival percentages.
+Each province x cohort rate is a binomial proportion (survivors out of new
+registrations), so the Wilson score interval is used. It is computed for all
+cells in one batched pass and needs no resampling or seed.
+"""
+import math
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+
+def wilson_intervals(successes, totals, z=Z_95):
+    """Wilson score intervals (as percentages) for parallel lists of counts"""
+    z2 = z * z
+    lower, upper = [], []
+    for k, n in zip(successes, totals):
+        if n <= 0:
+            lower.append(None)
+            upper.append(None)
+            continue
+        p = min(max(k / n, 0.0), 1.0)
+        denominator = 1 + z2 / n
+        centre = (p + z2 / (2 * n)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / denominator
+        lower.append(round(max(0.0, centre - margin) * 100, 2))
+        upper.append(round(min(1.0, centre + margin) * 100, 2))
+    return lower, upper
+
+
+def survival_intervals(survival_data, sector="construction"):
+    """Intervals for every (geo, cohort year) of the 1- and 3-year survival rates
+
+    Returns {geo: {year: {"1": (lo, hi), "3": (lo, hi)}}}.
+    """
+    cells, successes, totals = [], [], []
+    for geo, years in survival_data.items():
+        for year, sectors in years.items():
+            registrations, surv_1, surv_3 = sectors[sector]
+            cells.append((geo, year, "1"))
+            successes.append(surv_1)
+            totals.append(registrations)
+            cells.append((geo, year, "3"))
+            successes.append(surv_3)
+            totals.append(registrations)
+
+    lower, upper = wilson_intervals(successes, totals)
+
+    intervals = {}
+    for (geo, year, horizon), lo, hi in zip(cells, lower, upper):
+        intervals.setdefault(geo, {}).setdefault(year, {})[horizon] = (lo, hi)
+    return intervals
@@ -0,0 +1,181 @@
+"""
+Columnar export of all geographies, sectors, periods and measures of every
+source adapter as a long-format (tidy) table per source for analysts, instead
+of the 88 chart CSVs. One row per (source, geography, NACE section, period, measure)
+with its value. With pyarrow installed the table is written as an Arrow IPC
+stream; without it as one little-endian typed array per column plus a JSON
+schema (the stdlib fallback, readable with numpy.fromfile or array.fromfile).
+Either way the rows are written in batches of BATCH_ROWS, so the long table
+never sits in memory; only the cube marginals it is streamed from do.
+"""
+import json
+import sys
+from array import array
+from itertools import islice
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional; the typed-array fallback needs only the stdlib
+    pyarrow = None
+
+TIDY_NAME = "starters_stoppers_tidy"
+SCHEMA_VERSION = 1
+BATCH_ROWS = 65536
+
+# String columns are dictionary-encoded; the code width follows the dictionary size
+DICTIONARY_COLUMNS = ("source", "geo", "sector", "nace", "period", "measure")
+VALUE_COLUMN = "value"
+
+
+def _code_type(size):
+    for typecode in ("B", "H", "I"):
+        if size <= 1 << (8 * array(typecode).itemsize):
+            return typecode
+    return "Q"
+
+
+def tidy_rows(cubes, sector_of):
+    """Stream (source, geo, sector, nace, period, measure, value) from the cubes
+
+    cubes: (source adapter, cube) pairs. The period joins the adapter's
+    calendar dimensions: '2024' for survival cohorts, '2024-03' for
+    bankruptcy months. Zero measures are left out.
+    """
+    for source, cube in cubes:
+        periods = len(source.calendar)
+        marginal = cube.marginal(("geo",) + source.calendar + (source.sector,))
+        for (geo, *period, nace), totals in sorted(marginal.items()):
+            period = "-".join(period) if periods > 1 else period[0]
+            for measure, value in zip(cube.measures, totals):
+                if value:
+                    yield source.name, geo, sector_of(nace), nace, period, measure, value
+
+
+def _batches(rows):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, BATCH_ROWS))
+        if not batch:
+            return
+        yield batch
+
+
+def write_typed_arrays(output_dir, rows, geo_names, name=TIDY_NAME):
+    """Stdlib fallback: one <name>.<column>.bin per column plus <name>.schema.json"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    dictionaries = {column: {} for column in DICTIONARY_COLUMNS}
+    # Codes are staged as uint32 and narrowed once the dictionary sizes are known
+    staged = {column: output_dir / f"{name}.{column}.tmp" for column in DICTIONARY_COLUMNS}
+    paths = {column: output_dir / f"{name}.{column}.bin" for column in DICTIONARY_COLUMNS + (VALUE_COLUMN,)}
+    swap = sys.byteorder != "little"
+    count = batches = 0
+
+    files = {column: open(path, 'wb') for column, path in staged.items()}
+    files[VALUE_COLUMN] = open(paths[VALUE_COLUMN], 'wb')
+    try:
+        for batch in _batches(rows):
+            for position, column in enumerate(DICTIONARY_COLUMNS):
+                codes = dictionaries[column]
+                encoded = array("I", (codes.setdefault(row[position], len(codes)) for row in batch))
+                encoded.tofile(files[column])
+            values = array("d", (row[-1] for row in batch))
+            if swap:
+                values.byteswap()
+            values.tofile(files[VALUE_COLUMN])
+            count += len(batch)
+            batches += 1
+    finally:
+        for f in files.values():
+            f.close()
+
+    columns = []
+    for column in DICTIONARY_COLUMNS:
+        typecode = _code_type(len(dictionaries[column]))
+        # Narrow the staged codes batch by batch
+        with open(staged[column], 'rb') as source, open(paths[column], 'wb') as target:
+            while True:
+                codes = array("I")
+                try:
+                    codes.fromfile(source, BATCH_ROWS)
+                except EOFError:
+                    pass
+                if not codes:
+                    break
+                narrowed = array(typecode, codes)
+                if swap:
+                    narrowed.byteswap()
+                narrowed.tofile(target)
+        staged[column].unlink()
+        columns.append({
+            "name": column,
+            "file": paths[column].name,
+            "type": f"uint{8 * array(typecode).itemsize}",
+            "dictionary": list(dictionaries[column]),
+        })
+    columns.append({"name": VALUE_COLUMN, "file": paths[VALUE_COLUMN].name, "type": "float64"})
+
+    schema_path = output_dir / f"{name}.schema.json"
+    schema = {
+        "version": SCHEMA_VERSION,
+        "format": "typed-arrays",
+        "byte_order": "little",
+        "rows": count,
+        "batches": batches,
+        "columns": columns,
+        "geo_names": {geo: geo_names.get(geo, geo) for geo in dictionaries["geo"]},
+    }
+    with open(schema_path, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    return count, [schema_path] + list(paths.values())
+
+
+def write_arrow(output_dir, rows, geo_names, name=TIDY_NAME):
+    """Arrow IPC stream with dictionary-encoded string columns, one record batch per batch
+
+    The stream format (unlike the file format) allows each batch its own dictionaries.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"{name}.arrows"
+    dictionary = pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    schema = pyarrow.schema([(column, dictionary) for column in DICTIONARY_COLUMNS]
+                            + [(VALUE_COLUMN, pyarrow.float64())],
+                            metadata={"geo_names": json.dumps(geo_names, ensure_ascii=False)})
+    count = 0
+    with pyarrow.ipc.new_stream(path, schema) as writer:
+        for batch in _batches(rows):
+            columns = [pyarrow.array([row[i] for row in batch]).dictionary_encode()
+                       for i in range(len(DICTIONARY_COLUMNS))]
+            columns.append(pyarrow.array([row[-1] for row in batch], pyarrow.float64()))
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+            count += len(batch)
+    return count, [path]
+
+
+def write_tidy_export(output_dir, cubes, sector_of, geo_names, name=TIDY_NAME):
+    """Write the tidy table of (source adapter, cube) pairs; returns (format, rows, written paths)
+
+    name: file name prefix, e.g. one table per source as f"{TIDY_NAME}_{source.name}".
+    """
+    rows = tidy_rows(cubes, sector_of)
+    if pyarrow is not None:
+        return ("arrow",) + write_arrow(output_dir, rows, geo_names, name)
+    return ("typed-arrays",) + write_typed_arrays(output_dir, rows, geo_names, name)
+
+
+def read_typed_arrays(schema_path):
+    """Load a typed-array export back into {column: list of values} (for checks and small tables)"""
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+    typecodes = {"uint8": "B", "uint16": "H", "uint32": "I", "uint64": "Q", "float64": "d"}
+    table = {}
+    for column in schema["columns"]:
+        values = array(typecodes[column["type"]])
+        with open(schema_path.parent / column["file"], 'rb') as f:
+            values.frombytes(f.read())
+        if sys.byteorder != "little":
+            values.byteswap()
+        dictionary = column.get("dictionary")
+        table[column["name"]] = [dictionary[v] for v in values] if dictionary else list(values)
+    return table
@@ -0,0 +1,122 @@
+"""
+Multi-resolution pyramid over the monthly bankruptcy series.
+Month, quarter and calendar-year totals plus a rolling sum at each level are
+built bottom-up in one pass over the month axis, for all geography x sector
+series at once. Bankruptcies without a month count in the year level only,
+so its totals equal the yearly bankruptcy CSVs. The dashboard reads the level that fits the chart width
+instead of downsampling the monthly series in the browser.
+"""
+import json
+from operator import add, sub
+
+from anomaly_scan import monthly_matrix
+from prefix_index import SECTORS, compact_number, month_key
+
+# (level, months per period, rolling window in periods)
+LEVELS = (
+    ("month", 1, 12),
+    ("quarter", 3, 4),
+    ("year", 12, 3),
+)
+
+
+def period_label(level, ordinal):
+    """'YYYY-MM', 'YYYY-Qn' or 'YYYY' for a period number of the level"""
+    if level == "month":
+        return month_key(ordinal)
+    if level == "quarter":
+        return f"{ordinal // 4}-Q{ordinal % 4 + 1}"
+    return str(ordinal)
+
+
+def _rolling(totals, window, partial):
+    """Trailing sums of `window` periods for all series; None without full, complete periods"""
+    rolling = []
+    running = [0] * len(totals[0]) if totals else []
+    for t, row in enumerate(totals):
+        running = list(map(add, running, row))
+        if t >= window:
+            running = list(map(sub, running, totals[t - window]))
+        complete = t + 1 >= window and not any(t - window < p <= t for p in partial)
+        rolling.append(running if complete else None)
+    return rolling
+
+
+def build_pyramid(index, geos, undated=None):
+    """Totals and rolling sums per level, time-major: {level: (first period, partial, totals, rolling)}
+
+    undated: {geo: {year: {sector: count}}} of the rows without a month.
+    """
+    undated = undated or {}
+    keys, _, months = monthly_matrix(index, geos)
+    first_month, last_month = index.origin, index.origin + len(index.months) - 1
+    undated_years = {year for geo in geos for year in undated.get(geo, {})}
+
+    levels = {}
+    for level, size, window in LEVELS:
+        first, last = first_month // size, last_month // size
+        # Periods at the edges of the month axis can be cut short
+        partial = []
+        if first_month % size:
+            partial.append(0)
+        if (last_month + 1) % size and (last - first) not in partial:
+            partial.append(last - first)
+        if level == "year" and undated_years:
+            # Years with only undated rows widen the year axis
+            shift = first - min(first, min(undated_years))
+            first, last = first - shift, max(last, max(undated_years))
+            partial = [p + shift for p in partial]
+        levels[level] = [first, partial, [[0] * len(keys) for _ in range(last - first + 1)], window]
+
+    # One pass over the months feeds every level
+    for t, row in enumerate(months):
+        ordinal = first_month + t
+        for level, size, _ in LEVELS:
+            first, _, totals, _ = levels[level]
+            slot = ordinal // size - first
+            totals[slot] = list(map(add, totals[slot], row))
+
+    # Rows without a month count in their calendar year, as in the yearly totals
+    first, _, totals, _ = levels["year"]
+    for j, (geo, sector) in enumerate(keys):
+        for year, counts in undated.get(geo, {}).items():
+            totals[year - first][j] += counts.get(sector, 0)
+
+    return keys, {
+        level: (first, partial, totals, _rolling(totals, window, partial))
+        for level, (first, partial, totals, window) in levels.items()
+    }
+
+
+def _by_series(keys, rows, geo_names):
+    """Time-major rows to {geo name: {sector: [values]}}"""
+    series = {}
+    for j, (geo, sector) in enumerate(keys):
+        series.setdefault(geo_names[geo], {})[sector] = [
+            None if row is None else compact_number(row[j]) for row in rows
+        ]
+    return series
+
+
+def write_pyramid(path, index, geo_names, undated=None):
+    """Write the pyramid as compact JSON; returns the number of periods per level"""
+    keys, levels = build_pyramid(index, list(geo_names), undated)
+
+    payload = {"sectors": list(SECTORS), "levels": {}}
+    for level, size, window in LEVELS:
+        first, partial, totals, rolling = levels[level]
+        payload["levels"][level] = {
+            "start": period_label(level, first),
+            "periods": len(totals),
+            "months": size,
+            "window": window,
+            # Positions of periods that do not cover all their months
+            "partial": partial,
+            # Whether the bankruptcies without a month are counted (year level only)
+            "undated": level == "year",
+            "totals": _by_series(keys, totals, geo_names),
+            "rolling": _by_series(keys, rolling, geo_names),
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    return {level: len(levels[level][2]) for level, _, _ in LEVELS}
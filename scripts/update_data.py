@@ -1,21 +1,28 @@
 #!/usr/bin/env python3
 """
 Download and process Statbel data for dashboard
-Downloads TF_BANKRUPTCIES and TF_VAT_SURVIVALS from Statbel and processes them
+Downloads the Statbel sources (TF_BANKRUPTCIES, TF_VAT_SURVIVALS; see
+source_adapters.py) and processes them
 """
 
+import argparse
+import json
 import os
 import sys
 import zipfile
 import urllib.request
 import ssl
 import shutil
+import time
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
 
-# URLs for Statbel data
-# BANKRUPTCIES_URL is generated dynamically in main() to handle year updates
-VAT_SURVIVALS_URL = "https://statbel.fgov.be/sites/default/files/files/opendata/TF_VAT_SURVIVAL/TF_VAT_SURVIVALS.zip"
+from checkpoints import files_fingerprint, file_fingerprint, load_checkpoint, save_checkpoint, stale_reason
+from manifest import MANIFEST_NAME
+from perf_ledger import record_run
+from source_adapters import SOURCES
+
+# Download URLs, archive and file names of the Statbel data are in source_adapters.py
 
 # Directories
 SCRIPT_DIR = Path(__file__).parent
@@ -23,21 +30,41 @@ DASHBOARD_DIR = SCRIPT_DIR.parent
 DATA_DIR = DASHBOARD_DIR / "data"
 PROCESSED_DIR = DATA_DIR / "data-grafieken"
 
+# Downloaded archives are kept here (not committed) so a rerun can skip them
+CACHE_DIR = DATA_DIR / ".cache"
+
+# Written by the extractor, with the invariant checks of its scans
+RUN_REPORT_FILE = DATA_DIR / "run_report.json"
+
+def create_ssl_context():
+    """SSL context that doesn't verify certificates
+    (Statbel certificates can be problematic)"""
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+def remote_fingerprint(url):
+    """ETag/Last-Modified/size of a remote file (HEAD request), None when unreachable"""
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        with urllib.request.urlopen(request, context=create_ssl_context(), timeout=30) as response:
+            headers = response.headers
+            return "|".join([url, headers.get("ETag", ""), headers.get("Last-Modified", ""),
+                             headers.get("Content-Length", "")])
+    except Exception:
+        return None
+
 def download_and_extract(url, filename, target_dir):
     """Download a zip file and extract it"""
     print(f"Downloading {filename}...")
     
-    zip_path = target_dir / filename
-    
-    # Create SSL context that doesn't verify certificates
-    # (Statbel certificates can be problematic)
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    zip_path = CACHE_DIR / filename
     
     # Download file
     try:
-        with urllib.request.urlopen(url, context=ssl_context) as response:
+        with urllib.request.urlopen(url, context=create_ssl_context()) as response:
             with open(zip_path, 'wb') as out_file:
                 out_file.write(response.read())
         print(f"✓ Downloaded {filename}")
@@ -45,18 +72,17 @@ def download_and_extract(url, filename, target_dir):
         print(f"✗ Error downloading {filename}: {e}")
         return False
     
-    # Extract zip
+    return extract_archive(zip_path, target_dir)
+
+def extract_archive(zip_path, target_dir):
+    """Extract a downloaded zip file"""
     try:
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
             zip_ref.extractall(target_dir)
-        print(f"✓ Extracted {filename}")
-        
-        # Remove zip file
-        zip_path.unlink()
-        
+        print(f"✓ Extracted {zip_path.name}")
         return True
     except Exception as e:
-        print(f"✗ Error extracting {filename}: {e}")
+        print(f"✗ Error extracting {zip_path.name}: {e}")
         return False
 
 def run_processing_scripts():
@@ -87,33 +113,170 @@ def run_processing_scripts():
     return True
 
 def verify_data():
-    """Verify that processed data exists"""
+    """Check the invariant results of the processing run and the manifest"""
     print("\nVerifying processed data...")
     
-    if not PROCESSED_DIR.exists():
-        print(f"✗ Processed data directory not found: {PROCESSED_DIR}")
+    # Invariants are checked while the rows are aggregated; only their results are read here
+    if RUN_REPORT_FILE.exists():
+        with open(RUN_REPORT_FILE, 'r', encoding='utf-8') as f:
+            scans = json.load(f).get("scans", {})
+        failed = False
+        for scan, stats in scans.items():
+            for rule, violation in stats.get("invariant_violations", {}).items():
+                print(f"✗ {scan}: {violation['count']} violations of {rule}, e.g. {violation['samples']}")
+                failed = True
+        if failed:
+            return False
+        print(f"✓ No invariant violations ({', '.join(scans) or 'no scans ran'})")
+    
+    manifest_path = PROCESSED_DIR / MANIFEST_NAME
+    if not manifest_path.exists():
+        print(f"✗ {MANIFEST_NAME} not found in {PROCESSED_DIR}")
         return False
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        datasets = json.load(f)["datasets"]
     
-    # Check for province folders
+    # Every province needs datasets in the manifest
     expected_provinces = ['Antwerpen', 'Vlaams-Brabant', 'West-Vlaanderen', 
                          'Oost-Vlaanderen', 'Limburg', 'Waals-Brabant',
                          'Henegouwen', 'Luik', 'Luxemburg', 'Namen', 'Brussels']
     
-    found_provinces = [d.name for d in PROCESSED_DIR.iterdir() if d.is_dir()]
-    
-    if len(found_provinces) == 0:
-        print(f"✗ No province data found in {PROCESSED_DIR}")
+    counts = {prov: sum(1 for dataset in datasets.values() if prov in dataset["geographies"])
+              for prov in expected_provinces}
+    missing = [prov for prov, count in counts.items() if count == 0]
+    if missing:
+        print(f"✗ No datasets for {', '.join(missing)} in {MANIFEST_NAME}")
         return False
     
-    print(f"✓ Found data for {len(found_provinces)} provinces/regions")
-    for prov in found_provinces:
-        csv_count = len(list((PROCESSED_DIR / prov).glob("*.csv")))
-        print(f"  - {prov}: {csv_count} CSV files")
+    print(f"✓ Found data for {len(counts)} provinces/regions")
+    for prov, count in counts.items():
+        print(f"  - {prov}: {count} CSV files")
+    
+    return True
+
+def download_stage(source):
+    return f"download-{source.stage}"
+
+def cached_archive(source):
+    """The archive in data/.cache, when it is the one the last download fetched and Statbel still serves it"""
+    zip_path = CACHE_DIR / source.archive
+    checkpoint = load_checkpoint(download_stage(source))
+    if checkpoint is None or checkpoint.get("status") != "completed":
+        return None
+    if file_fingerprint(zip_path) not in checkpoint.get("outputs", {}).values():
+        return None
+    remote = checkpoint.get("inputs", {}).get("remote")
+    if remote is None or remote != source_inputs(source)["remote"]:
+        return None
+    return zip_path
+
+def download_source(source):
+    """Download the archive of a source, trying its candidate URLs in order
+
+    An unchanged archive in the cache is only extracted again, e.g. when the
+    cache was restored on a fresh runner without the extracted file.
+    """
+    zip_path = cached_archive(source)
+    if zip_path is not None:
+        print(f"Remote file unchanged, extracting cached {zip_path.name}...")
+        if extract_archive(zip_path, DATA_DIR):
+            return True
+    urls = source.urls()
+    for url in urls:
+        if len(urls) > 1:
+            print(f"Attempting to download {url.rsplit('/', 1)[-1]}...")
+        if download_and_extract(url, source.archive, DATA_DIR):
+            return True
+    print(f"\n✗ Failed to download {source.member}")
+    return False
+
+def source_inputs(source):
+    # First archive Statbel serves, in the same order download_source() tries them
+    for url in source.urls():
+        fingerprint = remote_fingerprint(url)
+        if fingerprint:
+            return {"remote": fingerprint}
+    return {"remote": None}
+
+def processing_inputs():
+    inputs = {source.member: file_fingerprint(DATA_DIR / source.member) for source in SOURCES}
+    inputs["scripts"] = files_fingerprint(SCRIPT_DIR.glob("*.py"))
+    return inputs
+
+# (name, description, input fingerprints, run, outputs) in execution order.
+# Each stage's inputs include the outputs of the stage before it, so a changed
+# download invalidates processing and verification as well.
+STAGES = [
+    (download_stage(source), f"Downloading {source.member}",
+     lambda source=source: source_inputs(source), lambda source=source: download_source(source),
+     lambda source=source: [DATA_DIR / source.member, CACHE_DIR / source.archive])
+    for source in SOURCES
+] + [
+    ("process", "Processing data",
+     processing_inputs, run_processing_scripts,
+     lambda: [PROCESSED_DIR / "manifest.json"]),
+    ("verify", "Verifying processed data",
+     lambda: {"manifest.json": file_fingerprint(PROCESSED_DIR / "manifest.json"),
+              "run_report.json": file_fingerprint(RUN_REPORT_FILE)}, verify_data,
+     lambda: []),
+]
+
+STAGE_NAMES = [stage[0] for stage in STAGES]
+
+def run_stages(from_stage=None, only_stage=None, timings=None):
+    """Run the stages whose checkpoint is missing, failed or stale
+
+    timings collects {stage: {"status", "seconds"}} for the performance ledger.
+    """
+    if timings is None:
+        timings = {}
+    first = STAGE_NAMES.index(from_stage) if from_stage else 0
+    
+    for number, (name, description, inputs_of, run, outputs_of) in enumerate(STAGES, 1):
+        if only_stage and name != only_stage:
+            continue
+        if number - 1 < first:
+            print(f"\n[{number}/{len(STAGES)}] {description}: skipped (--from-stage {from_stage})")
+            timings[name] = {"status": "skipped", "seconds": 0.0}
+            continue
+        
+        print(f"\n[{number}/{len(STAGES)}] {description}...")
+        inputs = inputs_of()
+        forced = name == only_stage or (from_stage is not None and number - 1 >= first)
+        reason = "forced" if forced else stale_reason(name, inputs)
+        if reason is None:
+            print(f"✓ Up to date, skipped ({name} checkpoint)")
+            timings[name] = {"status": "skipped", "seconds": 0.0}
+            continue
+        print(f"  Running {name}: {reason}")
+        
+        start = time.perf_counter()
+        try:
+            ok = run()
+            error = None if ok else f"{name} failed"
+        except Exception as e:
+            ok, error = False, f"{type(e).__name__}: {e}"
+        timings[name] = {"status": "completed" if ok else "failed",
+                         "seconds": round(time.perf_counter() - start, 3)}
+        
+        if not ok:
+            save_checkpoint(name, "failed", inputs, [], error=error)
+            print(f"\n✗ {description} failed ({error}); the next run resumes here")
+            return False
+        save_checkpoint(name, "completed", inputs, outputs_of())
     
     return True
 
 def main():
     """Main execution"""
+    parser = argparse.ArgumentParser(description="Download and process Statbel data")
+    stage_help = ", ".join(STAGE_NAMES)
+    parser.add_argument("--from-stage", choices=STAGE_NAMES, metavar="STAGE",
+                        help=f"Rerun this stage and all later ones ({stage_help})")
+    parser.add_argument("--only-stage", choices=STAGE_NAMES, metavar="STAGE",
+                        help="Rerun only this stage")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Statbel Data Update Script")
     print("=" * 60)
@@ -122,42 +285,12 @@ def main():
     DATA_DIR.mkdir(exist_ok=True)
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Step 1: Download bankruptcies data
-    print("\n[1/4] Downloading bankruptcies data...")
-    
-    current_year = datetime.now().year
-    download_success = False
-    
-    # Try current year first, then previous year (in case new year file isn't created yet)
-    years_to_try = [current_year, current_year - 1]
-    
-    for year in years_to_try:
-        url = f"https://statbel.fgov.be/sites/default/files/files/opendata/BRI_Nace/TF_BANKRUPTCIES%28{year}%29.zip"
-        print(f"Attempting to download data for year {year}...")
-        if download_and_extract(url, "TF_BANKRUPTCIES.zip", DATA_DIR):
-            download_success = True
-            break
-    
-    if not download_success:
-        print("\n✗ Failed to download bankruptcies data")
-        sys.exit(1)
-    
-    # Step 2: Download VAT survivals data
-    print("\n[2/4] Downloading VAT survivals data...")
-    if not download_and_extract(VAT_SURVIVALS_URL, "TF_VAT_SURVIVALS.zip", DATA_DIR):
-        print("\n✗ Failed to download VAT survivals data")
-        sys.exit(1)
-    
-    # Step 3: Process data with existing scripts
-    print("\n[3/4] Processing data...")
-    if not run_processing_scripts():
-        print("\n✗ Data processing failed")
-        sys.exit(1)
-    
-    # Step 4: Verify data
-    print("\n[4/4] Verifying processed data...")
-    if not verify_data():
-        print("\n✗ Data verification failed")
+    started = datetime.now(timezone.utc)
+    timings = {}
+    ok = run_stages(args.from_stage, args.only_stage, timings)
+    # Failed runs are recorded too; their timings show where the time went
+    record_run(timings, started, "completed" if ok else "failed", RUN_REPORT_FILE)
+    if not ok:
         sys.exit(1)
     
     print("\n" + "=" * 60)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Watch mode: keep the dashboard data up to date without a cold batch job per refresh.
+The daemon polls the Statbel archives (HEAD requests, see update_data.py) on
+a schedule, or with --local the raw files in data/. When an input changes it
+runs update_data.py in a background process while it keeps polling. A
+successful run is copied to an immutable snapshot directory under
+data/snapshots/, and the CURRENT pointer file is then replaced atomically
+(os.replace). Readers resolve CURRENT once with current_snapshot() and read
+that directory only, so they see either the previous or the new snapshot,
+never a half-built one.
+"""
+import argparse
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from checkpoints import file_fingerprint, load_checkpoint
+from manifest import MANIFEST_NAME
+from source_adapters import SOURCES
+
+SCRIPT_DIR = Path(__file__).parent
+DASHBOARD_DIR = SCRIPT_DIR.parent
+DATA_DIR = DASHBOARD_DIR / "data"
+PROCESSED_DIR = DATA_DIR / "data-grafieken"
+
+# Immutable published snapshots and the pointer to the current one; not committed
+SNAPSHOT_DIR = DATA_DIR / "snapshots"
+POINTER_NAME = "CURRENT"
+SNAPSHOT_INFO = "snapshot.json"
+
+# Poll intervals in seconds: Statbel publishes at most monthly, local files can change any time
+REMOTE_INTERVAL = 3600
+LOCAL_INTERVAL = 10
+
+# Published snapshots kept besides the current one, for readers still on an older snapshot
+KEEP_SNAPSHOTS = 2
+
+
+def current_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Directory of the current snapshot, None before the first publish
+
+    Resolve it once per read session and keep using the returned path; later
+    swaps do not change a published directory.
+    """
+    try:
+        name = (Path(snapshot_dir) / POINTER_NAME).read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        return None
+    return Path(snapshot_dir) / name
+
+
+def snapshot_info(snapshot):
+    with open(snapshot / SNAPSHOT_INFO, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def poll_inputs(local):
+    """Fingerprints of the inputs: the raw files with --local, else the remote archives"""
+    if local:
+        return {source.member: file_fingerprint(DATA_DIR / source.member) for source in SOURCES}
+    from update_data import source_inputs
+    return {source.member: source_inputs(source)["remote"] for source in SOURCES}
+
+
+def built_inputs(local):
+    """Fingerprints of the inputs the last update_data.py run built from, read from its checkpoints
+
+    The raw files the process stage read with --local, else the archives the
+    download stages fetched. A poll can already see a newer input than the
+    run used; recording that would hide the change from the next poll.
+    """
+    if local:
+        checkpoint = load_checkpoint("process") or {}
+        return {source.member: checkpoint.get("inputs", {}).get(source.member) for source in SOURCES}
+    from update_data import download_stage
+    inputs = {}
+    for source in SOURCES:
+        checkpoint = load_checkpoint(download_stage(source)) or {}
+        inputs[source.member] = checkpoint.get("inputs", {}).get("remote")
+    return inputs
+
+
+def _read_only(path):
+    mode = path.stat().st_mode
+    path.chmod(mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def publish_snapshot(inputs, source_dir=PROCESSED_DIR, snapshot_dir=SNAPSHOT_DIR):
+    """Copy the built outputs to a new snapshot and swap the pointer; returns its path
+
+    Nothing is published when the outputs equal the current snapshot (same manifest).
+    """
+    manifest = file_fingerprint(source_dir / MANIFEST_NAME)
+    if manifest is None:
+        raise FileNotFoundError(f"{MANIFEST_NAME} not found in {source_dir}")
+    current = current_snapshot(snapshot_dir)
+    if current is not None and snapshot_info(current)["manifest"] == manifest:
+        return None
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    created = datetime.now(timezone.utc)
+    name = f"{created:%Y%m%dT%H%M%SZ}-{manifest[:10]}"
+    staging = snapshot_dir / f".{name}.tmp"
+    if staging.exists():
+        shutil.rmtree(staging)
+    # Build outputs are rewritten in place by the next run, so they are copied, not linked
+    shutil.copytree(source_dir, staging, ignore=shutil.ignore_patterns(".*"))
+    with open(staging / SNAPSHOT_INFO, 'w', encoding='utf-8') as f:
+        json.dump({"created": created.isoformat(timespec="seconds"), "manifest": manifest,
+                   "inputs": inputs}, f, indent=2)
+        f.write("\n")
+    for path in staging.rglob("*"):
+        if path.is_file():
+            _read_only(path)
+    snapshot = snapshot_dir / name
+    staging.rename(snapshot)
+
+    # The swap: readers see the old name or the new one, never a partial file
+    pointer = snapshot_dir / f".{POINTER_NAME}.tmp"
+    pointer.write_text(name + "\n", encoding='utf-8')
+    os.replace(pointer, snapshot_dir / POINTER_NAME)
+    prune_snapshots(snapshot_dir)
+    return snapshot
+
+
+def prune_snapshots(snapshot_dir=SNAPSHOT_DIR, keep=KEEP_SNAPSHOTS):
+    """Remove all but the current and the keep most recent earlier snapshots"""
+    current = current_snapshot(snapshot_dir)
+    older = sorted((path for path in snapshot_dir.iterdir()
+                    if path.is_dir() and not path.name.startswith(".") and path != current), reverse=True)
+    for path in older[keep:]:
+        shutil.rmtree(path)
+
+
+def start_rebuild(local):
+    """Run update_data.py in a background process"""
+    command = [sys.executable, str(SCRIPT_DIR / "update_data.py")]
+    if local:
+        # The raw files are already there; only processing and verification can be stale
+        command += ["--from-stage", "process"]
+    return subprocess.Popen(command, cwd=SCRIPT_DIR)
+
+
+def watch(local=False, interval=None, once=False):
+    """Poll, rebuild and publish until interrupted (with once: until one rebuild finished or nothing is stale)
+
+    A change is only acted on once two polls in a row agree, so a raw file that
+    is still being written (or an archive being replaced) is not built half-way.
+    """
+    interval = interval or (LOCAL_INTERVAL if local else REMOTE_INTERVAL)
+    current = current_snapshot()
+    built = snapshot_info(current)["inputs"] if current else None
+    previous = rebuild = None
+    next_poll = 0.0
+    print(f"Watching {'data/' if local else 'Statbel'} every {interval}s; "
+          f"current snapshot: {current.name if current else 'none'}")
+
+    while True:
+        if rebuild is not None and rebuild.poll() is not None:
+            if rebuild.returncode == 0:
+                built = built_inputs(local)
+                snapshot = publish_snapshot(built)
+                print(f"✓ Published snapshot {snapshot.name}" if snapshot
+                      else "✓ Rebuilt, outputs unchanged; snapshot kept")
+            else:
+                print(f"✗ Rebuild failed (exit code {rebuild.returncode}); "
+                      f"keeping {current_snapshot().name if current_snapshot() else 'no snapshot'}")
+            if once:
+                return rebuild.returncode
+            rebuild = None
+
+        if time.monotonic() >= next_poll:
+            inputs = poll_inputs(local)
+            next_poll = time.monotonic() + interval
+            stable = inputs == previous
+            previous = inputs
+            if None in inputs.values():
+                print(f"✗ Inputs unavailable: {', '.join(name for name, value in inputs.items() if value is None)}")
+            elif stable and inputs != built and rebuild is None:
+                print(f"\n{datetime.now():%Y-%m-%d %H:%M:%S} Inputs changed, rebuilding...")
+                rebuild = start_rebuild(local)
+            elif once and rebuild is None and inputs == built:
+                return 0
+            elif not stable:
+                # Confirm the change on the next poll instead of waiting a full interval
+                next_poll = time.monotonic() + min(interval, LOCAL_INTERVAL)
+
+        time.sleep(min(1.0, interval))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the dashboard data whenever the Statbel inputs change")
+    parser.add_argument("--local", action="store_true",
+                        help="Watch the raw files in data/ instead of polling the Statbel archives")
+    parser.add_argument("--interval", type=float, default=None,
+                        help=f"Seconds between polls (default {REMOTE_INTERVAL}, {LOCAL_INTERVAL} with --local)")
+    parser.add_argument("--once", action="store_true",
+                        help="Exit once the current snapshot matches the inputs")
+    args = parser.parse_args()
+    try:
+        return watch(args.local, args.interval, args.once)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Checks of the TopoJSON arc cutting and the Douglas-Peucker simplification.
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from build_topojson import ArcStore, cut_ring, find_junctions, simplify_arc  # noqa: E402
+
+
+def ring_points(references, store):
+    """Points of a ring from its arc references (the closing point once)"""
+    points = []
+    for reference in references:
+        arc = store.arcs[reference] if reference >= 0 else store.arcs[~reference][::-1]
+        points.extend(arc if not points else arc[1:])
+    return points[:-1]
+
+
+def same_ring(a, b):
+    """Equal up to the starting point"""
+    start = b.index(a[0])
+    return a == b[start:] + b[:start]
+
+
+class CutRingTest(unittest.TestCase):
+    def setUp(self):
+        # Two squares sharing the edge (2, 0)-(2, 2), with a midpoint on it
+        self.left = [(0, 0), (2, 0), (2, 1), (2, 2), (0, 2)]
+        self.right = [(2, 0), (4, 0), (4, 2), (2, 2), (2, 1)]
+        self.junctions = find_junctions([self.left, self.right])
+        self.store = ArcStore()
+
+    def test_junctions_are_the_ends_of_the_shared_border(self):
+        self.assertEqual(self.junctions, {(2, 0), (2, 2)})
+
+    def test_shared_border_is_stored_once(self):
+        left = cut_ring(self.left, self.junctions, self.store)
+        right = cut_ring(self.right, self.junctions, self.store)
+        self.assertEqual(len(self.store.arcs), 3)
+        # The right square runs along the shared arc the other way round
+        shared = [reference for reference in left if ~reference in right]
+        self.assertEqual(len(shared), 1)
+        arc = self.store.arcs[shared[0] if shared[0] >= 0 else ~shared[0]]
+        self.assertEqual(sorted(arc), [(2, 0), (2, 1), (2, 2)])
+
+    def test_arcs_rebuild_the_rings(self):
+        for ring in (self.left, self.right):
+            references = cut_ring(ring, self.junctions, self.store)
+            self.assertTrue(same_ring(ring_points(references, self.store), ring))
+
+    def test_isolated_ring_is_one_closed_arc(self):
+        ring = [(5, 5), (6, 5), (6, 6)]
+        forward = cut_ring(ring, set(), self.store)
+        backward = cut_ring(list(reversed(ring)), set(), self.store)
+        self.assertEqual(len(forward), 1)
+        self.assertEqual(backward, [~forward[0]])
+        arc = self.store.arcs[forward[0]]
+        self.assertEqual(arc[0], arc[-1])
+
+
+class SimplifyArcTest(unittest.TestCase):
+    def test_collinear_points_are_dropped(self):
+        self.assertEqual(simplify_arc([(0, 0), (1, 0), (2, 0), (3, 0)], 0.5), [(0, 0), (3, 0)])
+
+    def test_points_beyond_the_tolerance_are_kept(self):
+        arc = [(0, 0), (1, 0.1), (2, 3), (3, 0.1), (4, 0)]
+        self.assertEqual(simplify_arc(arc, 1), [(0, 0), (2, 3), (4, 0)])
+
+    def test_endpoints_are_kept(self):
+        arc = [(0, 0), (1, 0.01), (2, 0)]
+        simplified = simplify_arc(arc, 10)
+        self.assertEqual((simplified[0], simplified[-1]), (arc[0], arc[-1]))
+
+    def test_zero_tolerance_keeps_the_arc(self):
+        arc = [(0, 0), (1, 0), (2, 0)]
+        self.assertEqual(simplify_arc(arc, 0), arc)
+
+    def test_closed_ring_keeps_an_area(self):
+        ring = [(0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 2), (0, 1), (0, 0)]
+        simplified = simplify_arc(ring, 100)
+        self.assertGreaterEqual(len(simplified), 4)
+        self.assertEqual(simplified[0], simplified[-1])
+        self.assertGreaterEqual(len(set(simplified)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Checks that the spilling aggregator sums to the same totals as a plain dict.
+"""
+import os
+import random
+import sys
+import unittest
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from external_aggregation import SpillingAggregator  # noqa: E402
+
+
+def rows(seed, count=5000):
+    """(key, values) pairs with repeated keys, in random order"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        key = (f"{rng.randint(1, 9)}0000", str(rng.randint(2015, 2024)), rng.choice("ABCFGK"))
+        yield key, [rng.randint(0, 5), rng.random()]
+
+
+def in_memory(pairs):
+    totals = defaultdict(lambda: [0, 0.0])
+    for key, values in pairs:
+        totals[key] = [a + b for a, b in zip(totals[key], values)]
+    return dict(totals)
+
+
+class SpillingAggregatorTest(unittest.TestCase):
+    def aggregate(self, memory_budget, fan_in=64):
+        aggregator = SpillingAggregator(memory_budget, fan_in=fan_in)
+        for key, values in rows(7):
+            aggregator.add(key, values)
+        return aggregator
+
+    def assert_same_totals(self, result, expected):
+        self.assertEqual(list(result), sorted(expected))
+        for key, (count, amount) in result.items():
+            self.assertEqual(count, expected[key][0])
+            self.assertAlmostEqual(amount, expected[key][1])
+
+    def test_unbounded_keeps_everything_in_memory(self):
+        with self.aggregate(None) as aggregator:
+            result = dict(aggregator.items())
+            self.assertEqual(aggregator.spills, 0)
+        self.assert_same_totals(result, in_memory(rows(7)))
+
+    def test_spilled_runs_merge_to_the_same_totals(self):
+        # A budget of a few entries spills many runs, each with a key repeated in others
+        with self.aggregate(4096) as aggregator:
+            result = dict(aggregator.items())
+            self.assertGreater(aggregator.spills, 10)
+        self.assert_same_totals(result, in_memory(rows(7)))
+
+    def test_runs_above_the_fan_in_are_compacted(self):
+        with self.aggregate(2048, fan_in=4) as aggregator:
+            result = dict(aggregator.items())
+            self.assertLessEqual(len(aggregator.runs), 4)
+        self.assert_same_totals(result, in_memory(rows(7)))
+
+    def test_items_are_in_key_order(self):
+        with self.aggregate(4096) as aggregator:
+            keys = [key for key, _ in aggregator.items()]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_close_removes_the_spill_files(self):
+        aggregator = self.aggregate(4096)
+        runs = list(aggregator.runs)
+        self.assertTrue(runs and all(os.path.exists(path) for path in runs))
+        aggregator.close()
+        self.assertFalse(any(os.path.exists(path) for path in runs))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Checks of the aligned starters / bankruptcies series and the derived net formation.
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from net_formation import HORIZONS, align, follow_up, net_formation  # noqa: E402
+from sparse_cube import SparseCube  # noqa: E402
+
+FIRST, LAST = 2010, 2020
+
+
+def sector_of(nace):
+    return "construction" if nace == "F" else "non_construction"
+
+
+def cubes():
+    """100 starters per cohort, 10 fewer survivors per year, followed up until LAST"""
+    survival = SparseCube(("geo", "year", "nace"), ("starters",) + tuple(f"surv_{k}" for k in range(1, 6)))
+    bankruptcy = SparseCube(("geo", "year", "nace"), ("bankruptcies",))
+    for geo in ("10000", "20001"):
+        for year in range(FIRST, LAST + 1):
+            survivors = [100 - 10 * k if year + k <= LAST else 0 for k in range(1, HORIZONS + 1)]
+            survival.add((geo, str(year), "F"), [100] + survivors)
+            survival.add((geo, str(year), "G"), [40] + [0] * HORIZONS)
+            bankruptcy.add((geo, str(year), "F"), [year - FIRST])
+    # Bankruptcies of a year before the first cohort widen the year axis
+    bankruptcy.add(("10000", "2008", "A"), [3])
+    return survival, bankruptcy
+
+
+class NetFormationTest(unittest.TestCase):
+    def setUp(self):
+        self.aligned = align(*cubes(), sector_of)
+        self.observed = follow_up(self.aligned)
+
+    def test_alignment(self):
+        self.assertEqual(self.aligned.years, list(range(2008, LAST + 1)))
+        self.assertEqual(self.aligned.series("bankruptcies", "10000", "non_construction")[0], 3)
+        self.assertEqual(self.aligned.series("starters", "20001", "construction")[2:], [100] * 11)
+
+    def test_follow_up(self):
+        self.assertEqual(self.observed[0], (FIRST, LAST))
+        self.assertEqual(self.observed[3], (FIRST, LAST - 3))
+
+    def test_exits_net_and_rate(self):
+        values = net_formation(self.aligned, "10000", "construction", self.observed)
+        known = {year: i for i, year in enumerate(self.aligned.years)}
+        # Every horizon loses 10 firms: 5 x 10 exits out of 100 + 90 + 80 + 70 + 60 alive
+        for year in range(FIRST + HORIZONS, LAST + 1):
+            with self.subTest(year=year):
+                self.assertEqual(values["exits"][known[year]], 50)
+                self.assertEqual(values["net"][known[year]], 50)
+                self.assertEqual(values["exit_rate"][known[year]], 12.5)
+        # Earlier years miss cohorts before the survival file
+        self.assertEqual(values["exits"][:known[FIRST + HORIZONS]], [None] * known[FIRST + HORIZONS])
+        self.assertEqual(values["starters"][:2], [None, None])
+        self.assertEqual(values["bankruptcies"][known[2015]], 5)
+
+    def test_region_group(self):
+        self.aligned.add_group("Vlaanderen", ["10000", "20001", "missing"])
+        values = net_formation(self.aligned, "Vlaanderen", "construction", self.observed)
+        self.assertEqual(values["exits"][-1], 100)
+        self.assertEqual(values["exit_rate"][-1], 12.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Checks of the prefix-sum index against plain sums of the monthly series.
+"""
+import random
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from prefix_index import PrefixSumIndex, month_axis  # noqa: E402
+
+
+def monthly_series(seed, first="2019-11", last="2022-02"):
+    """{geo: {month: {sector: count}}} with random counts and some missing months"""
+    rng = random.Random(seed)
+    return {
+        geo: {month: {"construction": rng.randint(0, 9), "non_construction": rng.randint(0, 30)}
+              for month in month_axis(first, last) if rng.random() > 0.1}
+        for geo in ("10000", "20001", "21000")
+    }
+
+
+class PrefixSumIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.monthly = monthly_series(1)
+        self.index = PrefixSumIndex.from_monthly(self.monthly)
+
+    def plain_sum(self, geo, sector, months):
+        return sum(self.monthly[geo].get(month, {}).get(sector, 0) for month in months)
+
+    def test_total_matches_plain_sum(self):
+        months = self.index.months
+        for start in range(0, len(months), 5):
+            for end in range(start, len(months), 7):
+                with self.subTest(start=months[start], end=months[end]):
+                    self.assertEqual(self.index.total("20001", "construction", months[start], months[end]),
+                                     self.plain_sum("20001", "construction", months[start:end + 1]))
+
+    def test_total_clips_to_the_axis(self):
+        self.assertEqual(self.index.total("10000", "construction", "2000-01", "2030-12"),
+                         self.plain_sum("10000", "construction", self.index.months))
+        self.assertEqual(self.index.total("10000", "construction", "2023-01", "2023-12"), 0)
+        self.assertEqual(self.index.total("99999", "construction", "2020-01", "2020-12"), 0)
+
+    def test_window(self):
+        months = self.index.months
+        for end in range(11, len(months)):
+            self.assertEqual(self.index.window("21000", "non_construction", months[end]),
+                             self.plain_sum("21000", "non_construction", months[end - 11:end + 1]))
+
+    def test_window_without_full_history(self):
+        self.assertIsNone(self.index.window("10000", "construction", self.index.months[10]))
+        self.assertIsNone(self.index.window("10000", "construction", "2022-03"))
+
+    def test_yearly_and_group(self):
+        self.index.add_group("Vlaanderen", ["10000", "20001", "missing"])
+        expected = sum(self.plain_sum(geo, "construction", [f"2021-{m:02d}" for m in range(1, 13)])
+                       for geo in ("10000", "20001"))
+        self.assertEqual(self.index.yearly("Vlaanderen", "construction", 2021), expected)
+        self.assertEqual(self.index.years(), [2019, 2020, 2021, 2022])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "index.json"
+            self.index.save(path)
+            loaded = PrefixSumIndex.load(path)
+        self.assertEqual(loaded.months, self.index.months)
+        self.assertEqual(loaded.window("20001", "construction", "2021-06"),
+                         self.index.window("20001", "construction", "2021-06"))
+
+
+if __name__ == "__main__":
+    unittest.main()
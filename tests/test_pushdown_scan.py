@@ -0,0 +1,102 @@
+"""
+Checks of the pushdown scan against csv.DictReader with the same filters.
+"""
+import csv
+import random
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from pushdown_scan import read_header, scan, year_range  # noqa: E402
+
+HEADER = ["CD_YEAR", "CD_MONTH", "CD_PROV_REFNIS", "TX_NACE_REV2_SECTION", "TX_NAME", "MS_COUNT"]
+
+
+def write_file(path, seed, count=2000):
+    """Statbel-like pipe file with a BOM, quoted names, blank lines and short rows"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write("|".join(HEADER) + "\r\n")
+        for i in range(count):
+            row = [str(rng.randint(2014, 2024)), str(rng.randint(1, 12)),
+                   rng.choice(["10000", "20001", "", "99999 "]), rng.choice("ACFG"),
+                   rng.choice(["Bouw", '"Bouw | renovatie"', "Handel"]), str(rng.randint(0, 9))]
+            if i % 97 == 0:
+                row = row[:3]
+            f.write("|".join(row) + "\r\n")
+            if i % 211 == 0:
+                f.write("\r\n")
+
+
+def reference(path, columns, where):
+    """Projected rows and reject counts the slow way, one dict per row"""
+    rows, rejected = [], defaultdict(int)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for record in csv.DictReader(f, delimiter='|'):
+            if not any(record.values()):
+                continue
+            for column, accept, reason in where:
+                value = (record.get(column) or '').strip()
+                if not (accept(value) if callable(accept) else value in accept):
+                    rejected[reason] += 1
+                    break
+            else:
+                rows.append(tuple(record.get(column) or '' for column in columns))
+    return rows, dict(rejected)
+
+
+class PushdownScanTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "TF_TEST.txt"
+        write_file(self.path, 11)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, columns, where):
+        rejected = defaultdict(int)
+        rows = list(scan(self.path, columns, where, rejected))
+        expected_rows, expected_rejected = reference(self.path, columns, where)
+        self.assertEqual(rows, expected_rows)
+        self.assertEqual(dict(rejected), expected_rejected)
+        return rows
+
+    def test_header_without_bom(self):
+        self.assertEqual(read_header(self.path), HEADER)
+
+    def test_no_filters_projects_every_line(self):
+        rows = self.check(["MS_COUNT", "CD_YEAR"], [])
+        self.assertEqual(len(rows), 2000)
+
+    def test_province_and_sector_filters(self):
+        where = [("CD_PROV_REFNIS", {"10000", "20001", ""}, "unknown_province"),
+                 ("TX_NACE_REV2_SECTION", {"F"}, "other_sector")]
+        rows = self.check(["CD_PROV_REFNIS", "TX_NAME", "MS_COUNT"], where)
+        self.assertTrue(rows)
+        # Quoted fields keep their pipe
+        self.assertIn("Bouw | renovatie", {name for _, name, _ in rows})
+
+    def test_predicate_and_missing_column(self):
+        where = [("CD_YEAR", year_range(2016, 2020), "out_of_range"), ("NOT_IN_FILE", {"x"}, "ignored")]
+        rows = list(scan(self.path, ["CD_YEAR", "NOT_IN_FILE"], where))
+        self.assertTrue(rows and all(2016 <= int(year) <= 2020 and missing == '' for year, missing in rows))
+        self.assertEqual(rows, reference(self.path, ["CD_YEAR", "NOT_IN_FILE"], where[:1])[0])
+
+    def test_first_failing_filter_is_counted(self):
+        where = [("TX_NACE_REV2_SECTION", {"F"}, "other_sector"),
+                 ("CD_PROV_REFNIS", {"10000"}, "unknown_province")]
+        self.check(["CD_MONTH"], where)
+
+    def test_year_range(self):
+        accept = year_range(2016, None)
+        self.assertEqual([accept(v) for v in ("2015", "2016", "2030", "", "20x6")],
+                         [False, True, True, False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Checks of the sparse cube marginals, the streamed fill and the saved layout.
+"""
+import random
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from sparse_cube import SparseCube  # noqa: E402
+
+DIMS = ("geo", "year", "month", "nace")
+
+
+def cells(seed, count=3000):
+    """(coords, [count, workers]) rows with repeated coordinates"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        coords = (rng.choice(["10000", "20001", "21000"]), str(rng.randint(2019, 2023)),
+                  str(rng.randint(1, 12)) if rng.random() > 0.05 else "", rng.choice("ACFGK"))
+        yield coords, [rng.randint(1, 4), rng.randint(0, 50)]
+
+
+def plain_marginal(dims, rows):
+    positions = [DIMS.index(d) for d in dims]
+    totals = defaultdict(lambda: [0, 0])
+    for coords, values in rows:
+        key = tuple(coords[p] for p in positions)
+        totals[key] = [a + b for a, b in zip(totals[key], values)]
+    return dict(totals)
+
+
+class SparseCubeTest(unittest.TestCase):
+    def setUp(self):
+        self.cube = SparseCube(DIMS, ("count", "workers"))
+        for coords, values in cells(5):
+            self.cube.add(coords, values)
+
+    def test_marginals_match_plain_sums(self):
+        for dims in [("geo",), ("nace", "geo"), ("year", "month"), ("geo", "year", "nace"), DIMS, ()]:
+            with self.subTest(dims=dims):
+                self.assertEqual(self.cube.marginal(dims), plain_marginal(dims, cells(5)))
+
+    def test_key_order_follows_the_requested_dims(self):
+        marginal = self.cube.marginal(("nace", "geo"))
+        self.assertTrue(all(key[0] in "ACFGK" and key[1].isdigit() for key in marginal))
+
+    def test_cached_marginal_is_refreshed_after_add(self):
+        before = self.cube.marginal(("geo",))[("10000",)][0]
+        self.cube.add(("10000", "2020", "1", "F"), [7, 0])
+        self.assertEqual(self.cube.marginal(("geo",))[("10000",)][0], before + 7)
+
+    def test_totals_and_unknown_dims(self):
+        self.assertEqual(self.cube.totals(), plain_marginal((), cells(5))[()])
+        with self.assertRaises(KeyError):
+            self.cube.marginal(("sector",))
+
+    def test_add_streamed_keeps_only_the_given_marginals(self):
+        streamed = SparseCube(DIMS, ("count", "workers"))
+        streamed.add_streamed(cells(5), [("geo", "year", "month", "nace"), ("geo", "nace")])
+        self.assertTrue(streamed.streamed)
+        self.assertEqual(streamed.cells, {})
+        for dims in [("geo", "month"), ("nace",), ("nace", "geo"), ()]:
+            with self.subTest(dims=dims):
+                self.assertEqual(streamed.marginal(dims), self.cube.marginal(dims))
+        with self.assertRaises(ValueError):
+            streamed.save(Path(tempfile.gettempdir()) / "never-written.cube")
+
+    def test_streamed_marginal_not_kept_raises(self):
+        streamed = SparseCube(DIMS, ("count", "workers"))
+        streamed.add_streamed(cells(5), [("geo", "nace")])
+        with self.assertRaises(KeyError):
+            streamed.marginal(("year",))
+
+    def test_project(self):
+        projected = self.cube.project(("geo", "year"))
+        self.assertEqual(projected.dims, ("geo", "year"))
+        self.assertEqual(projected.marginal(("year",)), self.cube.marginal(("year",)))
+
+    def test_save_and_load(self):
+        self.cube.set_label("nace", "F", "Bouwnijverheid")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.cube"
+            self.cube.save(path, meta={"run": "test"})
+            self.assertEqual(SparseCube.load_schema(path), (DIMS, ("count", "workers")))
+            self.assertEqual(SparseCube.load_meta(path), {"run": "test"})
+            loaded = SparseCube.load(path)
+        self.assertEqual(loaded.marginal(DIMS), self.cube.marginal(DIMS))
+        self.assertEqual(loaded.labels, {"nace": {"F": "Bouwnijverheid"}})
+        loaded.add(("10000", "2020", "1", "F"), [1, 1])
+        self.assertEqual(len(loaded.members("geo")), len(self.cube.members("geo")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Checks of the Wilson score intervals against published values and their symmetry.
+"""
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from survival_intervals import survival_intervals, wilson_intervals  # noqa: E402
+
+
+class WilsonIntervalsTest(unittest.TestCase):
+    def test_known_values(self):
+        # 95% Wilson bounds as tabulated by Newcombe (1998) and common calculators
+        lower, upper = wilson_intervals([5, 0, 10], [10, 10, 10])
+        self.assertEqual((lower[0], upper[0]), (23.66, 76.34))
+        self.assertEqual((lower[1], upper[1]), (0.0, 27.75))
+        self.assertEqual((lower[2], upper[2]), (72.25, 100.0))
+
+    def test_empty_cohort_has_no_interval(self):
+        self.assertEqual(wilson_intervals([0, 3], [0, -1]), ([None, None], [None, None]))
+
+    def test_interval_contains_the_rate_and_stays_in_range(self):
+        rng = random.Random(3)
+        totals = [rng.randint(1, 5000) for _ in range(500)]
+        successes = [rng.randint(0, n) for n in totals]
+        for k, n, lo, hi in zip(successes, totals, *wilson_intervals(successes, totals)):
+            with self.subTest(k=k, n=n):
+                self.assertLessEqual(0.0, lo)
+                self.assertLessEqual(lo, round(100 * k / n, 2) + 0.01)
+                self.assertLessEqual(round(100 * k / n, 2) - 0.01, hi)
+                self.assertLessEqual(hi, 100.0)
+
+    def test_symmetric_in_successes_and_failures(self):
+        totals = [7, 40, 263, 1000]
+        for k in (0, 1, 3):
+            lower, upper = wilson_intervals([k] * 4, totals)
+            mirrored_lower, mirrored_upper = wilson_intervals([n - k for n in totals], totals)
+            for lo, hi, mirrored_lo, mirrored_hi in zip(lower, upper, mirrored_lower, mirrored_upper):
+                self.assertAlmostEqual(lo, 100 - mirrored_hi, places=2)
+                self.assertAlmostEqual(hi, 100 - mirrored_lo, places=2)
+
+    def test_narrower_with_more_registrations(self):
+        lower, upper = wilson_intervals([30, 300, 3000], [100, 1000, 10000])
+        widths = [hi - lo for lo, hi in zip(lower, upper)]
+        self.assertEqual(widths, sorted(widths, reverse=True))
+
+
+class SurvivalIntervalsTest(unittest.TestCase):
+    def test_one_interval_per_geography_cohort_and_horizon(self):
+        data = {
+            "Antwerpen": {2019: {"construction": (10, 5, 0)}, 2020: {"construction": (0, 0, 0)}},
+            "Limburg": {2019: {"construction": (10, 10, 5)}},
+        }
+        intervals = survival_intervals(data)
+        self.assertEqual(intervals["Antwerpen"][2019], {"1": (23.66, 76.34), "3": (0.0, 27.75)})
+        self.assertEqual(intervals["Antwerpen"][2020], {"1": (None, None), "3": (None, None)})
+        self.assertEqual(intervals["Limburg"][2019]["1"], (72.25, 100.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Checks of the month / quarter / year pyramid against sums of the monthly series.
+"""
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from prefix_index import PrefixSumIndex, month_axis  # noqa: E402
+from time_pyramid import build_pyramid, period_label  # noqa: E402
+
+GEOS = ["10000", "20001"]
+
+
+class TimePyramidTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(4)
+        # The month axis starts and ends inside a quarter and a year
+        self.monthly = {geo: {month: {"construction": rng.randint(0, 9), "non_construction": rng.randint(0, 9)}
+                              for month in month_axis("2019-05", "2022-08")} for geo in GEOS}
+        self.index = PrefixSumIndex.from_monthly(self.monthly)
+
+    def month_sum(self, geo, sector, prefix):
+        return sum(values[sector] for month, values in self.monthly[geo].items() if month.startswith(prefix))
+
+    def test_levels_sum_the_months(self):
+        keys, levels = build_pyramid(self.index, GEOS)
+        first, partial, totals, _ = levels["year"]
+        self.assertEqual(period_label("year", first), "2019")
+        self.assertEqual(partial, [0, 3])
+        for j, (geo, sector) in enumerate(keys):
+            self.assertEqual([row[j] for row in totals],
+                             [self.month_sum(geo, sector, str(year)) for year in range(2019, 2023)])
+        first, partial, totals, _ = levels["quarter"]
+        self.assertEqual(period_label("quarter", first), "2019-Q2")
+        self.assertEqual(partial, [0, len(totals) - 1])
+        j = keys.index(("20001", "construction"))
+        self.assertEqual(totals[1][j], sum(self.monthly["20001"][f"2019-{m:02d}"]["construction"] for m in (7, 8, 9)))
+
+    def test_rolling_sums_skip_incomplete_windows(self):
+        keys, levels = build_pyramid(self.index, GEOS)
+        _, _, totals, rolling = levels["month"]
+        self.assertEqual(rolling[:11], [None] * 11)
+        self.assertEqual(rolling[11], [sum(row[j] for row in totals[:12]) for j in range(len(keys))])
+        # The first year is partial, so no 3-year window is complete before 2022, and 2022 is partial too
+        self.assertEqual(levels["year"][3], [None] * 4)
+
+    def test_undated_rows_count_in_the_year_level_only(self):
+        undated = {"10000": {2020: {"construction": 5}, 2017: {"non_construction": 2}}}
+        keys, levels = build_pyramid(self.index, GEOS, undated)
+        first, partial, totals, _ = levels["year"]
+        # 2017 has only undated rows, so it widens the year axis
+        self.assertEqual(period_label("year", first), "2017")
+        self.assertEqual(partial, [2, 5])
+        construction, non_construction = keys.index(("10000", "construction")), keys.index(("10000", "non_construction"))
+        self.assertEqual(totals[3][construction], self.month_sum("10000", "construction", "2020") + 5)
+        self.assertEqual(totals[0][non_construction], 2)
+        self.assertEqual(totals[1], [0] * len(keys))
+        # Months and quarters are unchanged
+        _, plain = build_pyramid(self.index, GEOS)
+        self.assertEqual(levels["month"], plain["month"])
+        self.assertEqual(levels["quarter"], plain["quarter"])
+
+
+if __name__ == "__main__":
+    unittest.main()